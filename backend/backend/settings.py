@@ -177,4 +177,37 @@ STATIC_URL = 'static/'
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Market data ingestion
+# Raw Yahoo Finance responses are cached on disk (stocks/services/response_cache.py)
+
+MARKET_DATA_CACHE_DIR = config('MARKET_DATA_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'market_data'))
+
+# Seconds before a cached response of each kind is fetched again
+MARKET_DATA_CACHE_TTL = {
+    'history': 60 * 60 * 6,
+    'info': 60 * 60 * 12,
+    'news': 60 * 60,
+}
+
+# Seconds cached responses are kept for --replay before the loader prunes them
+MARKET_DATA_CACHE_RETENTION = 60 * 60 * 24 * 30
+
+# Symbols whose cached responses are never pruned, so runs recorded for them can be replayed
+MARKET_DATA_CACHE_KEEP = []
+
+# Where market data comes from: 'yahoo', or 'synthetic' for deterministic offline data
+# (stocks/services/market_data.py); ingestion commands can override it with --provider
+MARKET_DATA_PROVIDER = config('MARKET_DATA_PROVIDER', default='yahoo')
+
+# Synthetic provider: random seed, seconds of latency per request and fraction of requests throttled
+MARKET_DATA_SYNTHETIC = {
+    'seed': config('MARKET_DATA_SYNTHETIC_SEED', default=0, cast=int),
+    'latency': config('MARKET_DATA_SYNTHETIC_LATENCY', default=0.0, cast=float),
+    'throttle_rate': config('MARKET_DATA_SYNTHETIC_THROTTLE_RATE', default=0.0, cast=float),
+}
+
+# JSON-lines run reports of ingestion and analysis commands (stocks/services/run_telemetry.py)
+INGEST_REPORT_DIR = config('INGEST_REPORT_DIR', default=str(BASE_DIR / 'reports' / 'ingest'))
@@ -1,22 +1,41 @@
 #!/usr/bin/env python
 """
 BIST Stock Market Portal (BORTAL) - Full Database Update Script
+
+Runs the nightly refresh as a dependency graph of management commands:
+
+    reference ─┬─ index_prices ──────────────┐
+               ├─ stock_data ─┬─ indicators   │
+               │              ├─ holdings ────┴─ performance
+               │              └─ correlations
+               └─ news
+    partitions ─── stock_data
+    user_defaults
+
+Each stage runs in its own process as soon as the stages it depends on have
+succeeded, so independent stages overlap and the refresh takes about as
+long as its critical path. The stages that call Yahoo Finance (index_prices,
+stock_data, news) each rate limit their own requests, so they run one after
+another instead: side by side they would each use the full rate and
+multiply the load on Yahoo. A failure in one does not skip the next.
 """
 
 import os
 import sys
 import argparse
 import logging
+import subprocess
+import tempfile
 import time
 import datetime
 
 # Add the parent directory to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
 
-# Setup Django environment
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
-
-from django.core.management import call_command
+from stocks.services.stage_graph import (
+    DEFAULT_MAX_PARALLEL, Stage, critical_path, run_stage_graph, validate_stages
+)
 
 # Configure logging
 logging.basicConfig(
@@ -29,11 +48,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+STATUS_ICONS = {'succeeded': '✅', 'failed': '❌', 'skipped': '⏭️', 'cancelled': '🛑'}
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Update all BORTAL database data')
     parser.add_argument(
         '--days',
-        type=int, 
+        type=int,
         default=365,
         help='Number of days of historical data to fetch (default: 365)'
     )
@@ -52,84 +74,135 @@ def parse_arguments():
         action='store_true',
         help='Skip analytical calculations (correlations, etc.)'
     )
+    parser.add_argument(
+        '--max-parallel',
+        type=int,
+        default=DEFAULT_MAX_PARALLEL,
+        help=f'Maximum number of stages running at once (default: {DEFAULT_MAX_PARALLEL})'
+    )
+    parser.add_argument(
+        '--policy',
+        choices=['continue', 'fail-fast'],
+        default='continue',
+        help='On a failed stage, skip only its dependents (continue) or stop everything (fail-fast)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Print the stages and their dependencies without running them'
+    )
     return parser.parse_args()
 
-def run_command(command_name, *args, **kwargs):
-    """Run a Django management command and log the result"""
-    start_time = time.time()
-    logger.info(f"Starting {command_name}...")
-    
-    try:
-        call_command(command_name, *args, **kwargs)
-        elapsed = time.time() - start_time
-        logger.info(f"✅ {command_name} completed successfully in {elapsed:.2f} seconds")
-        return True
-    except Exception as e:
-        elapsed = time.time() - start_time
-        logger.error(f"❌ {command_name} failed after {elapsed:.2f} seconds: {str(e)}")
-        return False
+
+def build_stages(args):
+    """The refresh pipeline: real management commands and their dependency edges"""
+    days = 30 if args.limit else args.days
+    news_days = 7 if args.limit else 30
+    analysis_days = 30 if args.limit else 90
+
+    # The Yahoo Finance stages run one after another (after=), so their rate limits do not add up
+    stages = [
+        Stage('reference', 'load_indices_stock_data',
+              ['--load-basic', '--load-indices', '--skip-indices', '--skip-stocks']),
+        Stage('index_prices', 'load_indices_stock_data',
+              ['--skip-reference', '--skip-stocks', '--incremental', '--days', str(days)],
+              depends_on=['reference']),
+        # Next year's price and indicator partitions exist before rows for it arrive (PostgreSQL only)
+        Stage('partitions', 'partition_tables', ['--ensure']),
+        Stage('stock_data', 'load_indices_stock_data',
+              ['--skip-reference', '--skip-indices', '--skip-technicals', '--incremental', '--days', str(days)],
+              depends_on=['reference', 'partitions'], after=['index_prices']),
+        Stage('indicators', 'calculate_technical_indicators', depends_on=['stock_data']),
+        Stage('user_defaults', 'setup_user_defaults', ['--all']),
+    ]
+
+    if not args.skip_news:
+        stages.append(Stage('news', 'fetch_news', ['--days', str(news_days)],
+                            depends_on=['reference'], after=['stock_data']))
+
+    if not args.skip_analysis:
+        stages += [
+            Stage('holdings', 'calculate_portfolio_holdings', ['--all'], depends_on=['stock_data']),
+            Stage('performance', 'portfolio_performance', ['--days', str(analysis_days)],
+                  depends_on=['holdings', 'index_prices']),
+            Stage('correlations', 'stock_correlations', ['--days', str(analysis_days)],
+                  depends_on=['stock_data']),
+        ]
+
+    return stages
+
+
+def run_stage(stage, stop):
+    """Run one management command in its own process; terminated if stop is set"""
+    command = [sys.executable, os.path.join(BASE_DIR, 'manage.py'), stage.command, *stage.args]
+
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(command, cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+        while process.poll() is None:
+            if stop.wait(0.5):
+                process.terminate()
+                process.wait()
+
+        log.seek(0)
+        output = log.read().decode('utf-8', errors='replace')
+
+    return process.returncode == 0, output
+
+
+def log_event(event, stage, result):
+    """Log stage starts and, once finished, the stage's timing and output"""
+    if event == 'start':
+        logger.info(f"Starting {stage.name}: {stage.command} {' '.join(stage.args)}".rstrip())
+        return
+
+    for line in result.output.splitlines():
+        logger.info(f"[{stage.name}] {line}")
+
+    message = f"{STATUS_ICONS[result.status]} {stage.name} {result.status} in {result.elapsed:.2f} seconds"
+    if result.status == 'succeeded':
+        logger.info(message)
+    else:
+        logger.error(message)
+
 
 def main():
     """Main execution function"""
     start_time = time.time()
+    args = parse_arguments()
+    stages = build_stages(args)
+    validate_stages(stages)
+
+    if args.dry_run:
+        for stage in stages:
+            after = f" (after {', '.join(stage.depends_on)})" if stage.depends_on else ""
+            ordered = f" (once {', '.join(stage.after)} finished)" if stage.after else ""
+            print(f"{stage.name}: {stage.command} {' '.join(stage.args)}{after}{ordered}")
+        return 0
+
     logger.info("=" * 80)
     logger.info(f"BORTAL Database Update - Started at {datetime.datetime.now()}")
     logger.info("=" * 80)
-    
-    args = parse_arguments()
-    
-    # Step 1: Load basic stock and index data
-    run_command('load_data')
-    run_command('load_indices')
-    
-    # Step 2: Update index price data
-    if args.limit:
-        run_command('load_index_prices', days=30)
-    else:
-        run_command('load_index_prices', days=args.days)
-    
-    # Step 3: Update comprehensive stock data
-    if args.limit:
-        # For testing, just update BIST30 stocks
-        try:
-            from stocks.models import Stock, Index
-            bist30_stocks = Stock.objects.filter(indices__name='BIST30')
-            for stock in bist30_stocks[:5]:  # First 5 stocks only
-                run_command('load_stock_data', symbol=stock.symbol, days=30)
-        except Exception as e:
-            logger.error(f"Error limiting stock updates: {str(e)}")
-            # Fallback to a very limited update
-            run_command('load_stock_data', days=7)
-    else:
-        # Full update of all stocks
-        run_command('load_stock_data', days=args.days)
-    
-    # Step 4: Update news data (if not skipped)
-    if not args.skip_news:
-        news_days = 7 if args.limit else 30
-        run_command('fetch_news', days=news_days)
-    
-    # Step 5: Run analysis commands (if not skipped)
-    if not args.skip_analysis:
-        # Update portfolio holdings
-        run_command('calculate_portfolio_holdings', all=True)
-        
-        # Calculate portfolio performance
-        performance_days = 30 if args.limit else 90
-        run_command('portfolio_performance', days=performance_days)
-        
-        # Calculate stock correlations
-        correlation_days = 30 if args.limit else 90
-        run_command('stock_correlations', days=correlation_days)
-    
-    # Step 6: Ensure all users have default watchlists and portfolios
-    run_command('setup_user_defaults', all=True)
-    
-    # Complete
+
+    results = run_stage_graph(
+        stages, run_stage,
+        max_parallel=args.max_parallel,
+        fail_fast=args.policy == 'fail-fast',
+        on_event=log_event,
+    )
+
+    # Summary
     total_time = time.time() - start_time
+    path_time, path = critical_path(stages, results)
     logger.info("=" * 80)
+    for stage in stages:
+        result = results[stage.name]
+        logger.info(f"{STATUS_ICONS[result.status]} {stage.name:<15} {result.status:<10} {result.elapsed:8.2f}s")
+    logger.info(f"Critical path: {' → '.join(path)} ({path_time:.2f} seconds)")
     logger.info(f"BORTAL Database Update - Completed in {total_time:.2f} seconds")
     logger.info("=" * 80)
 
+    return 0 if all(result.status == 'succeeded' for result in results.values()) else 1
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
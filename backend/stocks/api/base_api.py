@@ -5,11 +5,15 @@ from django.http import Http404
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.views.decorators.vary import vary_on_cookie
+from django.utils.cache import patch_vary_headers
 from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 import logging
 from functools import partial
 
+from .renderers import COLUMNAR_RENDERERS, FastJSONRenderer
+
 logger = logging.getLogger(__name__)
 
 class BaseAPIView(APIView):
@@ -21,6 +25,7 @@ class BaseAPIView(APIView):
     - Error handling and logging
     - Optional caching
     - Transaction support
+    - Optional columnar time-series formats
     """
     
     # Set to True to enforce authentication
@@ -32,6 +37,9 @@ class BaseAPIView(APIView):
     # Set to True to use atomic transactions
     use_transactions = False
     
+    # Keys leading to the time series in the response, e.g. ('data',); offers the columnar renderers
+    columnar_series = None
+    
     def dispatch(self, request, *args, **kwargs):
         """Override dispatch to add caching and permissions"""
 
@@ -51,6 +59,27 @@ class BaseAPIView(APIView):
 
         return super().dispatch(request, *args, **kwargs)
         
+    def get_renderers(self):
+        """Render views with a time series with the fast JSON encoder and add the columnar renderers"""
+        renderers = super().get_renderers()
+        if self.columnar_series:
+            renderers = [
+                FastJSONRenderer() if type(renderer) is JSONRenderer else renderer for renderer in renderers
+            ] + [renderer() for renderer in COLUMNAR_RENDERERS]
+        return renderers
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Cache responses of views with columnar formats per Accept header"""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.columnar_series:
+            patch_vary_headers(response, ['Accept'])
+        return response
+    
+    @property
+    def columnar(self):
+        """True when the negotiated format wants the series as parallel arrays"""
+        return getattr(getattr(self.request, 'accepted_renderer', None), 'columnar', False)
+    
     def initial(self, request, *args, **kwargs):
         """Handle authentication requirements"""
         super().initial(request, *args, **kwargs)
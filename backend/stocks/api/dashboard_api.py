@@ -1,14 +1,16 @@
-from django.db.models import Count, Avg, Max, Min, F, Q, Sum
+from django.db.models import Count, Avg, Max, Min, F, Q, Subquery, Sum
 from rest_framework import serializers, status
 from rest_framework.response import Response
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
 from .base_api import BaseAPIView
 from stocks.models import (
-    Stock, Index, StockPrice, News, Watchlist, Portfolio,
-    PortfolioHolding, SystemSetting, UserActivity
+    Stock, Index, News, Watchlist, Portfolio,
+    PortfolioHolding, SystemSetting, UserActivity, MarketSnapshot
 )
+from stocks.services.market_movers import DEFAULT_MOVERS_LIMIT, market_movers
+from stocks.services.quotes import quote_of
 
 
 class DashboardAPIView(BaseAPIView):
@@ -94,75 +96,43 @@ class DashboardAPIView(BaseAPIView):
             )
     
     def _get_market_overview(self):
-        """Get market overview data"""
+        """Get market overview data (movers can be narrowed with ?index=, ?sector= and ?limit=)"""
         # Get main indices
         indices_data = []
         main_indices = ['BIST100', 'BIST30', 'BIST50']
+        indices = {
+            index.name: index for index in Index.objects.filter(name__in=main_indices).select_related('quote')
+        }
         
         for index_name in main_indices:
-            try:
-                index = Index.objects.get(name=index_name)
-                latest_price = index.prices.order_by('-date').first()
-                prev_price = index.prices.filter(date__lt=latest_price.date).order_by('-date').first() if latest_price else None
-                
-                if latest_price and prev_price:
-                    change = float(latest_price.close - prev_price.close)
-                    change_percent = float((latest_price.close - prev_price.close) / prev_price.close * 100)
-                    
-                    indices_data.append({
-                        'name': index.name,
-                        'display_name': index.display_name or index.name,
-                        'last_price': float(latest_price.close),
-                        'change': change,
-                        'change_percent': change_percent,
-                        'date': latest_price.date.isoformat()
-                    })
-            except (Index.DoesNotExist, AttributeError):
-                continue
-        
-        # Get top gainers and losers
-        today = datetime.now().date()
-        yesterday = today - timedelta(days=1)
-        
-        # Get stocks with prices on both days
-        stocks_with_prices = StockPrice.objects.filter(
-            date__gte=yesterday,
-            date__lte=today
-        ).values('stock').annotate(count=Count('id')).filter(count__gte=2)
-        
-        stock_ids = [item['stock'] for item in stocks_with_prices]
-        stocks = Stock.objects.filter(id__in=stock_ids)
-        
-        # Calculate price changes
-        stock_changes = []
-        
-        for stock in stocks:
-            latest = StockPrice.objects.filter(stock=stock).order_by('-date').first()
-            prev = StockPrice.objects.filter(stock=stock, date__lt=latest.date).order_by('-date').first()
-            
-            if latest and prev and prev.close > 0:
-                change_percent = float((latest.close - prev.close) / prev.close * 100)
-                
-                stock_changes.append({
-                    'symbol': stock.symbol,
-                    'name': stock.name,
-                    'price': float(latest.close),
-                    'change_percent': change_percent
+            index = indices.get(index_name)
+            quote = quote_of(index) if index else None
+            if quote and quote.change_percent is not None:
+                indices_data.append({
+                    'name': index.name,
+                    'display_name': index.display_name or index.name,
+                    'last_price': float(quote.close),
+                    'change': float(quote.change),
+                    'change_percent': float(quote.change_percent),
+                    'date': quote.date.isoformat()
                 })
         
-        # Sort to get top gainers and losers
-        stock_changes.sort(key=lambda x: x['change_percent'], reverse=True)
-        top_gainers = stock_changes[:5]  # Top 5 gainers
-        top_losers = stock_changes[-5:]  # Top 5 losers (reverse to show biggest losers first)
-        top_losers.reverse()
+        # Get top gainers and losers with the market breadth, in one query
+        movers = market_movers(
+            limit=self._movers_limit(),
+            index=self.request.query_params.get('index'),
+            sector=self.request.query_params.get('sector')
+        )
+        top_gainers = [self._mover_data(mover) for mover in movers.gainers] if movers else []
+        top_losers = [self._mover_data(mover) for mover in movers.losers] if movers else []
         
         # Get market statistics
-        advancing = sum(1 for stock in stock_changes if stock['change_percent'] > 0)
-        declining = sum(1 for stock in stock_changes if stock['change_percent'] < 0)
-        unchanged = sum(1 for stock in stock_changes if stock['change_percent'] == 0)
+        advancing = movers.advancing if movers else 0
+        declining = movers.declining if movers else 0
+        unchanged = movers.unchanged if movers else 0
         
-        # Get sector performance
-        sector_performance = []
+        # Get sector performance from the latest daily snapshot
+        sector_performance = self._get_sector_performance()
         
         # Return market overview data
         return {
@@ -173,11 +143,50 @@ class DashboardAPIView(BaseAPIView):
                 'advancing': advancing,
                 'declining': declining,
                 'unchanged': unchanged,
-                'total_stocks': len(stock_changes)
+                'total_stocks': advancing + declining + unchanged
             },
+            'sector_performance': sector_performance,
+            'session': movers.session.isoformat() if movers else None,
             'as_of': datetime.now().isoformat()
         }
     
+    def _get_sector_performance(self):
+        """Sector breadth and changes of the latest snapshot day, best sector first"""
+        latest_day = MarketSnapshot.objects.filter(scope='sector').order_by('-date').values('date')[:1]
+        snapshots = MarketSnapshot.objects.filter(
+            scope='sector', date=Subquery(latest_day)
+        ).order_by(F('equal_weighted_change').desc(nulls_last=True))
+        
+        return [
+            {
+                'sector': snapshot.name,
+                'date': snapshot.date.isoformat(),
+                'change_percent': snapshot.equal_weighted_change,
+                'cap_weighted_change_percent': snapshot.cap_weighted_change,
+                'advancing': snapshot.advancing,
+                'declining': snapshot.declining,
+                'unchanged': snapshot.unchanged,
+                'new_highs': snapshot.new_highs,
+                'new_lows': snapshot.new_lows
+            }
+            for snapshot in snapshots
+        ]
+    
+    def _movers_limit(self):
+        """Number of top gainers and losers (?limit=, default 5, at most 50)"""
+        try:
+            return min(max(int(self.request.query_params.get('limit', DEFAULT_MOVERS_LIMIT)), 1), 50)
+        except ValueError:
+            return DEFAULT_MOVERS_LIMIT
+    
+    def _mover_data(self, mover):
+        return {
+            'symbol': mover.symbol,
+            'name': mover.name,
+            'price': mover.price,
+            'change_percent': mover.change_percent
+        }
+    
     def _get_user_watchlists(self, user):
         """Get user's watchlists summary"""
         watchlists = Watchlist.objects.filter(user=user)
@@ -185,21 +194,18 @@ class DashboardAPIView(BaseAPIView):
         
         for watchlist in watchlists:
             # Get top performing stocks in watchlist
-            items = watchlist.stocks.all()[:5]  # Limit to 5 stocks
+            items = watchlist.stocks.select_related('quote')[:5]  # Limit to 5 stocks
             stocks_data = []
             
             for stock in items:
-                latest_price = StockPrice.objects.filter(stock=stock).order_by('-date').first()
-                prev_price = StockPrice.objects.filter(stock=stock, date__lt=latest_price.date).order_by('-date').first() if latest_price else None
+                quote = quote_of(stock)
                 
-                if latest_price and prev_price and prev_price.close > 0:
-                    change_percent = float((latest_price.close - prev_price.close) / prev_price.close * 100)
-                    
+                if quote and quote.change_percent is not None:
                     stocks_data.append({
                         'symbol': stock.symbol,
                         'name': stock.name,
-                        'price': float(latest_price.close),
-                        'change_percent': change_percent
+                        'price': float(quote.close),
+                        'change_percent': float(quote.change_percent)
                     })
             
             # Sort by performance
@@ -224,12 +230,12 @@ class DashboardAPIView(BaseAPIView):
             # Calculate portfolio value
             total_value = 0
             total_cost = 0
-            holdings = PortfolioHolding.objects.filter(portfolio=portfolio)
+            holdings = list(PortfolioHolding.objects.filter(portfolio=portfolio).select_related('stock__quote'))
             
             for holding in holdings:
-                latest_price = StockPrice.objects.filter(stock=holding.stock).order_by('-date').first()
-                if latest_price:
-                    holding_value = float(holding.quantity * latest_price.close)
+                quote = quote_of(holding.stock)
+                if quote:
+                    holding_value = float(holding.quantity * quote.close)
                     holding_cost = float(holding.quantity * holding.average_cost)
                     total_value += holding_value
                     total_cost += holding_cost
@@ -241,9 +247,9 @@ class DashboardAPIView(BaseAPIView):
             # Get top holdings
             top_holdings = []
             for holding in holdings[:5]:  # Limit to top 5
-                latest_price = StockPrice.objects.filter(stock=holding.stock).order_by('-date').first()
-                if latest_price:
-                    holding_value = float(holding.quantity * latest_price.close)
+                quote = quote_of(holding.stock)
+                if quote:
+                    holding_value = float(holding.quantity * quote.close)
                     weight = (holding_value / total_value * 100) if total_value > 0 else 0
                     
                     top_holdings.append({
@@ -265,7 +271,7 @@ class DashboardAPIView(BaseAPIView):
                 'total_value': total_value,
                 'profit_loss': profit_loss,
                 'profit_loss_percent': profit_loss_percent,
-                'holding_count': holdings.count(),
+                'holding_count': len(holdings),
                 'top_holdings': top_holdings
             })
         
@@ -327,31 +333,21 @@ class DashboardAPIView(BaseAPIView):
                 pass
         
         # Get stock data
+        stocks = Stock.objects.filter(id__in=viewed_stock_ids[:10]).select_related('sector', 'quote')  # Limit to 10
+        stocks_by_id = {str(stock.id): stock for stock in stocks}
         viewed_stocks = []
-        for stock_id in viewed_stock_ids[:10]:  # Limit to 10
-            try:
-                stock = Stock.objects.get(id=stock_id)
-                latest_price = StockPrice.objects.filter(stock=stock).order_by('-date').first()
-                
-                if latest_price:
-                    prev_price = StockPrice.objects.filter(
-                        stock=stock, 
-                        date__lt=latest_price.date
-                    ).order_by('-date').first()
-                    
-                    change_percent = 0
-                    if prev_price and prev_price.close > 0:
-                        change_percent = float((latest_price.close - prev_price.close) / prev_price.close * 100)
-                    
-                    viewed_stocks.append({
-                        'symbol': stock.symbol,
-                        'name': stock.name,
-                        'sector': stock.sector.name if stock.sector else None,
-                        'price': float(latest_price.close),
-                        'change_percent': change_percent,
-                        'date': latest_price.date.isoformat()
-                    })
-            except (Stock.DoesNotExist, AttributeError):
-                continue
+        for stock_id in viewed_stock_ids[:10]:
+            stock = stocks_by_id.get(str(stock_id))
+            quote = quote_of(stock) if stock else None
+            
+            if quote:
+                viewed_stocks.append({
+                    'symbol': stock.symbol,
+                    'name': stock.name,
+                    'sector': stock.sector.name if stock.sector else None,
+                    'price': float(quote.close),
+                    'change_percent': float(quote.change_percent) if quote.change_percent is not None else 0,
+                    'date': quote.date.isoformat()
+                })
         
         return viewed_stocks
\ No newline at end of file
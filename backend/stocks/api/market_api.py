@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from .base_api import BaseAPIView
+from ..models import MarketSnapshot
+from ..services.market_snapshots import SNAPSHOT_FIELDS
+
+
+class MarketBreadthAPIView(BaseAPIView):
+    """API endpoint for the daily breadth and performance history of the market, a sector or an index"""
+    cache_timeout = 900  # Cache for 15 minutes
+    
+    def get(self, request):
+        scope = request.query_params.get('scope', 'market')
+        name = request.query_params.get('name', '')
+        
+        if scope not in dict(MarketSnapshot.SCOPES):
+            return self.error_response("Invalid scope. Use one of: market, sector, index")
+        if scope == 'market':
+            name = ''
+        elif not name:
+            return self.error_response(f"A {scope} name is required")
+        
+        # Parse date range parameters
+        try:
+            days = int(request.query_params.get('days', 365))
+            end_date = request.query_params.get('end_date')
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+            start_date = request.query_params.get('start_date')
+            start_date = (
+                datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end_date - timedelta(days=days)
+            )
+        except ValueError:
+            return self.error_response("Invalid date range. Use days=N or start_date/end_date as YYYY-MM-DD")
+        
+        # One range read of the (scope, name, date) index
+        snapshots = list(
+            MarketSnapshot.objects
+            .filter(scope=scope, name=name, date__gte=start_date, date__lte=end_date)
+            .order_by('date')
+            .values('date', *SNAPSHOT_FIELDS)
+        )
+        
+        return self.success_response(
+            snapshots,
+            scope=scope,
+            name=name or None,
+            start_date=start_date.isoformat(),
+            end_date=end_date.isoformat()
+        )
@@ -8,7 +8,9 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 
 from .base_api import BaseAPIView
-from ..models import Portfolio, PortfolioTransaction, PortfolioHolding, Stock, StockPrice, User
+from ..models import Portfolio, PortfolioTransaction, PortfolioHolding, Stock, User
+from ..services.columnar import record_columns
+from ..services.quotes import quote_of
 from ..serializers.portfolio_serializers import (
     PortfolioSerializer, PortfolioTransactionSerializer, 
     PortfolioHoldingSerializer, PortfolioCreateUpdateSerializer,
@@ -22,24 +24,21 @@ class PortfolioListAPIView(BaseAPIView):
     
     def get(self, request):
         """Get all portfolios for the current user"""
-        portfolios = Portfolio.objects.filter(user=request.user)
+        portfolios = list(Portfolio.objects.filter(user=request.user).prefetch_related('holdings__stock__quote'))
         serializer = PortfolioSerializer(portfolios, many=True)
         
         # Add summary data for each portfolio
         data = []
-        for portfolio_data in serializer.data:
-            portfolio_id = portfolio_data['id']
-            portfolio = Portfolio.objects.get(id=portfolio_id)
-            
+        for portfolio, portfolio_data in zip(portfolios, serializer.data):
             # Calculate portfolio value
             total_value = Decimal('0')
             total_cost = Decimal('0')
-            holdings = PortfolioHolding.objects.filter(portfolio=portfolio)
+            holdings = list(portfolio.holdings.all())
             
             for holding in holdings:
-                latest_price = StockPrice.objects.filter(stock=holding.stock).order_by('-date').first()
-                if latest_price:
-                    holding_value = holding.quantity * latest_price.close
+                quote = quote_of(holding.stock)
+                if quote:
+                    holding_value = holding.quantity * quote.close
                     holding_cost = holding.quantity * holding.average_cost
                     total_value += holding_value
                     total_cost += holding_cost
@@ -54,7 +53,7 @@ class PortfolioListAPIView(BaseAPIView):
                 'total_cost': float(total_cost),
                 'profit_loss': float(profit_loss),
                 'profit_loss_percent': float(profit_loss_percent),
-                'holding_count': holdings.count()
+                'holding_count': len(holdings)
             }
             
             data.append(portfolio_data)
@@ -107,7 +106,7 @@ class PortfolioDetailAPIView(BaseAPIView):
         portfolio_data = serializer.data
         
         # Get holdings
-        holdings = PortfolioHolding.objects.filter(portfolio=portfolio)
+        holdings = list(PortfolioHolding.objects.filter(portfolio=portfolio).select_related('stock__quote'))
         holdings_serializer = PortfolioHoldingSerializer(holdings, many=True)
         portfolio_data['holdings'] = holdings_serializer.data
         
@@ -116,9 +115,9 @@ class PortfolioDetailAPIView(BaseAPIView):
         total_cost = Decimal('0')
         
         for holding in holdings:
-            latest_price = StockPrice.objects.filter(stock=holding.stock).order_by('-date').first()
-            if latest_price:
-                holding_value = holding.quantity * latest_price.close
+            quote = quote_of(holding.stock)
+            if quote:
+                holding_value = holding.quantity * quote.close
                 holding_cost = holding.quantity * holding.average_cost
                 total_value += holding_value
                 total_cost += holding_cost
@@ -133,7 +132,7 @@ class PortfolioDetailAPIView(BaseAPIView):
             'total_cost': float(total_cost),
             'profit_loss': float(profit_loss),
             'profit_loss_percent': float(profit_loss_percent),
-            'holding_count': holdings.count()
+            'holding_count': len(holdings)
         }
         
         # Get recent transactions
@@ -400,6 +399,7 @@ class PortfolioPerformanceAPIView(BaseAPIView):
     """API endpoint for retrieving portfolio performance data"""
     authentication_required = True
     cache_timeout = 900  # Cache for 15 minutes
+    columnar_series = ('data', 'daily_performance')
     
     def get(self, request, portfolio_id):
         """Get performance data for a portfolio"""
@@ -427,6 +427,13 @@ class PortfolioPerformanceAPIView(BaseAPIView):
                     "No performance data available for this portfolio"
                 )
             
+            if self.columnar:
+                # Each day's holdings have no flat encoding and stay nested
+                performance = dict(performance)
+                performance['daily_performance'] = record_columns(
+                    performance.get('daily_performance', []), passthrough={'holdings'}
+                )
+            
             return self.success_response(performance)
             
         except (AttributeError, KeyError):
@@ -1,16 +1,17 @@
 # /Users/barispome/Desktop/Project/BORTAL/backend/stocks/api/stock_api.py
 
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, F, Avg, Max, Min
+from django.db.models import Q, F
 from rest_framework import status
 from datetime import datetime, timedelta
 
 from .base_api import BaseAPIView
-from ..models import Stock, StockPrice, TechnicalIndicator
-from ..serializers.stock_serializers import (
-    StockListSerializer, StockDetailSerializer, 
-    StockPriceSerializer, StockTechnicalSerializer
-)
+from ..models import Stock, TechnicalIndicator
+from ..serializers.stock_serializers import StockListSerializer, StockDetailSerializer
+from ..serializers.series_serializers import StockPriceRowSerializer, StockTechnicalRowSerializer
+from ..services.downsampling import DEFAULT_POINTS, DOWNSAMPLE_MODES, MIN_POINTS, downsample_prices, price_stats
+from ..services.price_rollups import INTERVALS, SERIES_COLUMNS, auto_interval, load_price_series
+from ..services.columnar import frame_columns, record_columns
 
 from rest_framework.exceptions import ValidationError
 
@@ -69,9 +70,10 @@ class StockListAPIView(BaseAPIView):
 class StockDetailAPIView(BaseAPIView):
     """API endpoint for retrieving detailed stock information"""
     cache_timeout = 900  # 15 min cache
+    columnar_series = ('data', 'price_history')
 
     def get(self, request, symbol):
-        stock = get_object_or_404(Stock, symbol__iexact=symbol)
+        stock = get_object_or_404(Stock.objects.select_related('sector', 'quote'), symbol__iexact=symbol)
         serializer = StockDetailSerializer(stock)
         stock_data = serializer.data
 
@@ -91,16 +93,23 @@ class StockDetailAPIView(BaseAPIView):
         days = range_days[range_param]
         min_date = datetime.now().date() - timedelta(days=days)
 
-        # Get price history
-        prices = (
-            StockPrice.objects
-            .filter(stock=stock, date__gte=min_date)
-            .order_by('date')
-        )
+        # Long ranges come from the weekly rollups unless an interval is asked for
+        interval = request.query_params.get("interval", "auto").lower()
+        if interval == "auto":
+            interval = auto_interval(min_date, datetime.now().date())
+        elif interval not in INTERVALS:
+            raise ValidationError(f"Invalid interval. Use one of: auto, {', '.join(INTERVALS)}")
 
-        price_data = StockPriceSerializer(prices, many=True).data
-        stock_data['price_history'] = price_data
+        # Get price history; split and dividend adjusted unless the traded bars are asked for
+        adjusted = request.query_params.get("adjusted", "true").lower() in ('1', 'true', 'yes')
+        frame = load_price_series(stock, interval, start=min_date, adjusted=adjusted)
+        if self.columnar:
+            stock_data['price_history'] = frame_columns(frame, SERIES_COLUMNS)
+        else:
+            stock_data['price_history'] = StockPriceRowSerializer(frame).data
         stock_data['price_range'] = range_param
+        stock_data['price_interval'] = interval
+        stock_data['price_adjusted'] = adjusted
 
         return self.success_response(stock_data)
     
@@ -108,6 +117,7 @@ class StockDetailAPIView(BaseAPIView):
 class StockPriceAPIView(BaseAPIView):
     """API endpoint for retrieving stock price history"""
     cache_timeout = 1800  # Cache for 30 minutes
+    columnar_series = ('data',)
     
     def get(self, request, symbol):
         stock = get_object_or_404(Stock, symbol=symbol)
@@ -117,57 +127,69 @@ class StockPriceAPIView(BaseAPIView):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        # Build the queryset based on parameters
-        queryset = StockPrice.objects.filter(stock=stock)
+        # Resolve the requested date range
+        start = end = None
         
         if days:
             try:
                 days = int(days)
-                min_date = datetime.now().date() - timedelta(days=days)
-                queryset = queryset.filter(date__gte=min_date)
+                start = datetime.now().date() - timedelta(days=days)
             except ValueError:
                 return self.error_response("Invalid 'days' parameter")
         
         if start_date:
             try:
-                start = datetime.strptime(start_date, '%Y-%m-%d').date()
-                queryset = queryset.filter(date__gte=start)
+                start = max(filter(None, [start, datetime.strptime(start_date, '%Y-%m-%d').date()]))
             except ValueError:
                 return self.error_response("Invalid 'start_date' format, use YYYY-MM-DD")
         
         if end_date:
             try:
                 end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                queryset = queryset.filter(date__lte=end)
             except ValueError:
                 return self.error_response("Invalid 'end_date' format, use YYYY-MM-DD")
         
-        # Order by date
-        prices = queryset.order_by('date')
-        
-        # Calculate intervals for large date ranges (reduce data points)
-        if prices.count() > 500:
-            # For example, return weekly data instead of daily
-            interval = max(1, prices.count() // 500)
-            prices = prices[::interval]
-        
-        serializer = StockPriceSerializer(prices, many=True)
-        
-        # Include some stats
-        if prices.exists():
-            stats = {
-                'min_price': float(prices.aggregate(min=Min('low'))['min']),
-                'max_price': float(prices.aggregate(max=Max('high'))['max']),
-                'avg_volume': float(prices.aggregate(avg=Avg('volume'))['avg']),
-                'start_date': prices.first().date.isoformat(),
-                'end_date': prices.last().date.isoformat(),
-                'data_points': len(serializer.data)
-            }
+        # Daily bars, or weekly/monthly rollups picked by the span of a bounded range
+        interval = request.query_params.get('interval', 'auto').lower()
+        if interval == 'auto':
+            interval = auto_interval(start, end or datetime.now().date()) if start else '1d'
+        elif interval not in INTERVALS:
+            return self.error_response(f"Invalid 'interval' parameter, use one of: auto, {', '.join(INTERVALS)}")
+        
+        # Split and dividend adjusted OHLCV by default, so splits are not cliffs; ?adjusted=false for the traded bars
+        adjusted = request.query_params.get('adjusted', 'true').lower() in ('1', 'true', 'yes')
+        
+        # Chart downsampling: mode and target number of points
+        mode = request.query_params.get('downsample', 'lttb').lower()
+        if mode not in DOWNSAMPLE_MODES:
+            return self.error_response(f"Invalid 'downsample' parameter, use one of: {', '.join(DOWNSAMPLE_MODES)}")
+        try:
+            points = max(int(request.query_params.get('points', DEFAULT_POINTS)), MIN_POINTS)
+        except ValueError:
+            return self.error_response("Invalid 'points' parameter")
+        
+        # One query over the columns of the (stock, date) covering index; stats come from the same rows
+        frame = load_price_series(stock, interval, start, end, adjusted)
+        stats = price_stats(frame)
+        total = len(frame)
+        frame = downsample_prices(frame, points, mode)
+        
+        if self.columnar:
+            data = frame_columns(frame, SERIES_COLUMNS)
         else:
-            stats = {}
+            data = StockPriceRowSerializer(frame).data
+        
+        if stats:
+            stats.update({
+                'data_points': len(frame),
+                'total_points': total,
+                'interval': interval,
+                'downsample': mode if len(frame) < total else 'none',
+                'adjusted': adjusted
+            })
         
         return self.success_response(
-            serializer.data,
+            data,
             symbol=stock.symbol,
             name=stock.name,
             stats=stats
@@ -177,6 +199,7 @@ class StockPriceAPIView(BaseAPIView):
 class StockTechnicalAPIView(BaseAPIView):
     """API endpoint for retrieving technical indicators"""
     cache_timeout = 1800  # Cache for 30 minutes
+    columnar_series = ('data',)
     
     def get(self, request, symbol):
         stock = get_object_or_404(Stock, symbol=symbol)
@@ -202,24 +225,23 @@ class StockTechnicalAPIView(BaseAPIView):
         # If no data, return empty with message
         if not queryset.exists():
             return self.success_response(
-                [],
+                {} if self.columnar else [],
                 message="No technical indicator data available for this stock"
             )
         
-        # Serialize data
-        serializer = StockTechnicalSerializer(queryset, many=True)
-        data = serializer.data
-        
-        # Filter to only requested indicators if specified
-        if indicators:
-            filtered_data = []
-            for item in data:
-                filtered_item = {'date': item['date'], 'stock': item['stock']}
-                for ind in indicators:
-                    if ind in item:
-                        filtered_item[ind] = item[ind]
-                filtered_data.append(filtered_item)
-            data = filtered_data
+        if self.columnar:
+            # The stock is the same on every row, so only dates and indicator values are sent
+            fields = [
+                field.name for field in TechnicalIndicator._meta.fields if field.name not in ('id', 'stock', 'date')
+            ]
+            if indicators:
+                fields = [field for field in fields if field in indicators]
+            rows = list(queryset.values('date', *fields))
+            return self.success_response(record_columns(rows, ['date'] + fields), symbol=stock.symbol, name=stock.name)
+        
+        # Serialize data, only the requested indicators if specified
+        fields = ['date', 'stock'] + indicators if indicators else None
+        data = StockTechnicalRowSerializer(queryset, fields=fields).data
         
         return self.success_response(
             data,
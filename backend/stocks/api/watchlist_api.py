@@ -3,7 +3,8 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from .base_api import BaseAPIView
-from ..models import Watchlist, WatchlistItem, Stock, StockPrice
+from ..models import Watchlist, WatchlistItem, Stock
+from ..services.quotes import quote_of
 
 class WatchlistAPIView(BaseAPIView):
     """API endpoint for managing watchlists"""
@@ -27,13 +28,11 @@ class WatchlistAPIView(BaseAPIView):
 
             items = WatchlistItem.objects.filter(
                 watchlist=watchlist
-            ).select_related('stock')
+            ).select_related('stock__quote')
 
             for item in items:
                 stock = item.stock
-                latest_price = StockPrice.objects.filter(
-                    stock=stock
-                ).order_by('-date').first()
+                quote = quote_of(stock)
 
                 stock_data = {
                     'id': stock.id,
@@ -43,29 +42,15 @@ class WatchlistAPIView(BaseAPIView):
                     'added_at': item.added_at,
                 }
 
-                if latest_price:
+                if quote:
                     # Convert Decimal to float for JSON
-                    latest_close = float(latest_price.close)
                     stock_data['latest_price'] = {
-                        'date': latest_price.date,
-                        'price': latest_close,
-                        'change': None,
-                        'change_percent': None
+                        'date': quote.date,
+                        'price': float(quote.close),
+                        'change': float(quote.change) if quote.change is not None else None,
+                        'change_percent': float(quote.change_percent) if quote.change_percent is not None else None
                     }
 
-                    prev_price = StockPrice.objects.filter(
-                        stock=stock,
-                        date__lt=latest_price.date
-                    ).order_by('-date').first()
-
-                    if prev_price:
-                        prev_close = float(prev_price.close)
-                        change = latest_close - prev_close
-                        change_percent = (change / prev_close) * 100
-
-                        stock_data['latest_price']['change'] = change
-                        stock_data['latest_price']['change_percent'] = change_percent
-
                 watchlist_data['stocks'].append(stock_data)
 
             data.append(watchlist_data)
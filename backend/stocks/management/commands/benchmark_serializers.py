@@ -0,0 +1,108 @@
+"""
+Benchmark the per-row cost of the bulk time-series serializers.
+
+Compares StockPriceSerializer and StockTechnicalSerializer (ModelSerializer)
+with the values_list based StockPriceRowSerializer and
+StockTechnicalRowSerializer, and DRF's JSONRenderer with FastJSONRenderer.
+Synthetic rows are written in a transaction that is rolled back afterwards,
+so the command leaves the database unchanged.
+
+Examples:
+    # 5,000 rows, best of 5 runs
+    python manage.py benchmark_serializers
+
+    # A 20-year daily history
+    python manage.py benchmark_serializers --rows 5000 --repeat 10
+"""
+
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from stocks.api.renderers import FastJSONRenderer
+from stocks.models import Stock, StockPrice, TechnicalIndicator
+from stocks.serializers.series_serializers import StockPriceRowSerializer, StockTechnicalRowSerializer
+from stocks.serializers.stock_serializers import StockPriceSerializer, StockTechnicalSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare the per-row serialization and rendering cost of ModelSerializer and the fast-path serializers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=5000,
+            help='Rows per series (default: 5000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement; the fastest is reported (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows < 1 or repeat < 1:
+            self.stderr.write("❌ --rows and --repeat must be positive")
+            return
+
+        with transaction.atomic():
+            stock = self._create_rows(rows)
+            prices = StockPrice.objects.filter(stock=stock).order_by('date')
+            technicals = TechnicalIndicator.objects.filter(stock=stock).order_by('date')
+
+            self.stdout.write(f"🧪 {rows} rows, best of {repeat} runs (µs per row)")
+            self.stdout.write(f"  {'':<12}{'serializer':>14}{'fast path':>14}{'speedup':>10}")
+            self._compare('prices', rows, repeat,
+                          lambda: StockPriceSerializer(prices, many=True).data,
+                          lambda: StockPriceRowSerializer(prices).data)
+            self._compare('technicals', rows, repeat,
+                          lambda: StockTechnicalSerializer(technicals, many=True).data,
+                          lambda: StockTechnicalRowSerializer(technicals).data)
+
+            data = {'status': 'success', 'data': StockPriceRowSerializer(prices).data}
+            self._compare('render', rows, repeat,
+                          lambda: JSONRenderer().render(data),
+                          lambda: FastJSONRenderer().render(data))
+
+            transaction.set_rollback(True)
+
+    def _compare(self, label, rows, repeat, baseline, fast):
+        if baseline() != fast():
+            self.stderr.write(f"  ⚠️ {label}: the fast path output differs from the serializer's")
+        slow_us = self._best(baseline, repeat) / rows * 1e6
+        fast_us = self._best(fast, repeat) / rows * 1e6
+        self.stdout.write(f"  {label:<12}{slow_us:>14.2f}{fast_us:>14.2f}{slow_us / fast_us:>9.1f}x")
+
+    def _best(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def _create_rows(self, rows):
+        """A stock with ``rows`` daily prices and indicator rows, some indicators left empty"""
+        stock = Stock.objects.create(symbol='BENCH', name='Serializer benchmark')
+        start = date(2000, 1, 3)
+        prices, indicators = [], []
+        for i in range(rows):
+            day = start + timedelta(days=i)
+            close = Decimal(100 + (i % 250)) + Decimal(i % 10000) / 10000
+            prices.append(StockPrice(
+                stock=stock, date=day, open=close, high=close + 1, low=close - 1, close=close,
+                adjusted_close=close if i % 2 else None, volume=1000000 + i
+            ))
+            indicators.append(TechnicalIndicator(
+                stock=stock, date=day, rsi_14=Decimal('55.1234'), macd=Decimal('-1.5'), ma_20=close,
+                ma_200=close if i >= 199 else None
+            ))
+        StockPrice.objects.bulk_create(prices, batch_size=1000)
+        TechnicalIndicator.objects.bulk_create(indicators, batch_size=1000)
+        return stock
@@ -0,0 +1,78 @@
+import time
+from django.core.management.base import BaseCommand
+from stocks.models import Stock
+from stocks.services.technical_indicators import (
+    DEFAULT_WRITE_BATCH_SIZE, recalculate_indicators, update_indicators
+)
+from stocks.services.run_telemetry import RunTelemetry
+from stocks.services.copy_backfill import copy_supported
+
+
+class Command(BaseCommand):
+    help = "Calculate technical indicators from stored prices for all stocks in one vectorized pass"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            action='append',
+            help='Only recalculate the given stock symbol (can be repeated)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute the full history instead of only bars added since the last run'
+        )
+        parser.add_argument(
+            '--write-batch-size',
+            type=int,
+            default=DEFAULT_WRITE_BATCH_SIZE,
+            help=f'Rows per bulk upsert statement (default: {DEFAULT_WRITE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='PostgreSQL only: write rows through a COPY staging table and one merge statement'
+        )
+        parser.add_argument(
+            '--no-report',
+            action='store_true',
+            help='Do not write the JSON-lines run report (see the ingest_report command)'
+        )
+
+    def handle(self, *args, **options):
+        symbols = options.get('symbol')
+
+        stocks = Stock.objects.filter(is_active=True)
+        if symbols:
+            stocks = Stock.objects.filter(symbol__in=symbols)
+            if not stocks.exists():
+                self.stderr.write(f"❌ No stocks found for symbols: {', '.join(symbols)}")
+                return
+
+        stock_ids = list(stocks.values_list('id', flat=True))
+        self.stdout.write(f"📊 Calculating technical indicators for {len(stock_ids)} stocks...")
+
+        use_copy = options.get('backfill', False)
+        if use_copy and not copy_supported():
+            self.stderr.write("⚠️ --backfill needs PostgreSQL; using bulk upserts instead")
+            use_copy = False
+
+        calculate = recalculate_indicators if options.get('full') else update_indicators
+        telemetry = RunTelemetry('calculate_technical_indicators', options, enabled=not options.get('no_report'))
+        started = time.monotonic()
+        try:
+            with telemetry.stage('technicals', stocks=len(stock_ids)) as stage:
+                processed, created_count, updated_count = calculate(
+                    stock_ids, batch_size=options['write_batch_size'], use_copy=use_copy
+                )
+                stage['rows'] = {'inserted': created_count, 'updated': updated_count}
+        except BaseException:
+            telemetry.close('failed')
+            raise
+        telemetry.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Technical indicators for {processed} stocks: Added {created_count}, "
+            f"Updated {updated_count} records in {time.monotonic() - started:.1f}s"
+        ))
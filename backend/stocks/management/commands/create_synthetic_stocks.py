@@ -0,0 +1,64 @@
+"""
+Create a universe of synthetic stocks for offline ingest benchmarks.
+
+Example: a 5,000-symbol x 20-year ingest without network access
+    python manage.py create_synthetic_stocks --count 5000
+    python manage.py load_indices_stock_data --provider synthetic --skip-indices --days 7300 --batch-download --workers 8 --rate-limit 1000 --no-cache
+
+Latency and throttling of the synthetic provider are set with the
+MARKET_DATA_SYNTHETIC_* environment variables (see settings.py).
+"""
+
+import re
+from django.core.management.base import BaseCommand
+from stocks.models import Stock
+
+
+class Command(BaseCommand):
+    help = "Create synthetic stocks (SYN00001, SYN00002, ...) for use with the synthetic market data provider"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=1000,
+            help='Number of synthetic stocks to create (default: 1000)'
+        )
+        parser.add_argument(
+            '--prefix',
+            type=str,
+            default='SYN',
+            help='Symbol prefix (default: SYN)'
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete the synthetic stocks with this prefix, and all their data, instead'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        count = options['count']
+
+        if options['delete']:
+            deleted, _ = Stock.objects.filter(symbol__regex=rf'^{re.escape(prefix)}[0-9]+$').delete()
+            self.stdout.write(self.style.SUCCESS(f"✅ Deleted {deleted} synthetic rows"))
+            return
+
+        width = max(5, len(str(count)))
+        if len(prefix) + width > Stock._meta.get_field('symbol').max_length:
+            self.stderr.write(f"❌ Symbols with prefix '{prefix}' would be too long for {count} stocks")
+            return
+
+        symbols = [f"{prefix}{number:0{width}d}" for number in range(1, count + 1)]
+        existing = set(Stock.objects.filter(symbol__in=symbols).values_list('symbol', flat=True))
+        Stock.objects.bulk_create(
+            [
+                Stock(symbol=symbol, name=f"Synthetic {symbol}", exchange='IST', currency='TRY', country='Turkey')
+                for symbol in symbols if symbol not in existing
+            ],
+            batch_size=1000,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Synthetic stocks: Added {len(symbols) - len(existing)}, Existing {len(existing)}"
+        ))
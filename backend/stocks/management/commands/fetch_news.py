@@ -2,11 +2,15 @@ import os
 import re
 import json
 import requests
-import yfinance as yf
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from stocks.models import Stock, News, NewsStock
+from stocks.services.rate_limiter import DEFAULT_REQUESTS_PER_SECOND, TokenBucket, call_with_backoff
+from stocks.services.ingest_workers import run_pipeline
+from stocks.services.response_cache import ResponseCache
+from stocks.services.run_telemetry import RunTelemetry
+from stocks.services.market_data import PROVIDERS, get_provider
 
 
 class Command(BaseCommand):
@@ -30,11 +34,51 @@ class Command(BaseCommand):
             default=20,
             help='Maximum number of news articles to fetch per stock (default: 20)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of threads fetching news; database writes stay serial (default: 1)'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=DEFAULT_REQUESTS_PER_SECOND,
+            help=f'Requests per second shared by all workers (default: {DEFAULT_REQUESTS_PER_SECOND})'
+        )
+        parser.add_argument(
+            '--provider',
+            choices=list(PROVIDERS),
+            help='Market data provider; synthetic generates deterministic offline data '
+                 '(default: the MARKET_DATA_PROVIDER setting)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always fetch from Yahoo Finance and do not record responses in the local cache'
+        )
+        parser.add_argument(
+            '--replay',
+            action='store_true',
+            help='Serve news from the local response cache without network calls'
+        )
+        parser.add_argument(
+            '--no-report',
+            action='store_true',
+            help='Do not write the JSON-lines run report (see the ingest_report command)'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
         specific_symbol = options.get('symbol')
         limit = options.get('limit', 20)
+        workers = max(1, options.get('workers') or 1)
+        limiter = TokenBucket(options.get('rate_limit') or DEFAULT_REQUESTS_PER_SECOND)
+        provider = get_provider(options.get('provider'))
+        cache = None
+        if options.get('replay') or not options.get('no_cache'):
+            cache = ResponseCache(replay=options.get('replay', False), namespace=provider.cache_namespace)
+        telemetry = RunTelemetry('fetch_news', options, enabled=not options.get('no_report'))
         
         # Get stocks to process
         if specific_symbol:
@@ -61,86 +105,118 @@ class Command(BaseCommand):
         # Calculate the date from which to fetch news
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        for stock in stocks:
+        def fetch(stock):
+            # For Turkish stocks, append '.IS' to the symbol for Yahoo Finance
+            yahoo_symbol = f"{stock.symbol}.IS"
+            yf_stock = provider.ticker(yahoo_symbol)
+            metrics = telemetry.item('stock', stock.symbol)
+            request = lambda: call_with_backoff(lambda: yf_stock.news, limiter, metrics=metrics)
+            with metrics.time('network'):
+                if cache is None:
+                    return request()
+                return cache.news(yahoo_symbol, request)
+        
+        def store(stock, news_items, error):
             self.stdout.write(f"\n📰 Fetching news for {stock.symbol} - {stock.name}")
+            metrics = telemetry.item('stock', stock.symbol)
+            if error is not None:
+                self.stderr.write(f"  ❌ Error fetching news for {stock.symbol}: {str(error)}")
+                telemetry.finish_item(metrics, error)
+                return
+            
+            if not news_items:
+                self.stdout.write(f"  ℹ️ No news found for {stock.symbol}")
+                telemetry.finish_item(metrics)
+                return
             
-            # Use yfinance to get news
             try:
-                # For Turkish stocks, append '.IS' to the symbol for Yahoo Finance
-                yahoo_symbol = f"{stock.symbol}.IS"
-                
-                yf_stock = yf.Ticker(yahoo_symbol)
-                news_items = yf_stock.news
-                
-                if not news_items:
-                    self.stdout.write(f"  ℹ️ No news found for {stock.symbol}")
-                    continue
-                
-                # Process news items
-                count_added = 0
-                for item in news_items[:limit]:  # Limit the number of news items per stock
-                    # Extract data from the news item
-                    title = item.get('title', '').strip()
-                    if not title:  # Skip items without a title
-                        continue
-                    
-                    # Parse the timestamp (usually in Unix epoch format)
-                    try:
-                        if 'providerPublishTime' in item:
-                            pub_time = datetime.fromtimestamp(item['providerPublishTime'])
-                        else:
-                            # Skip if we don't have a publication time
-                            continue
-                    except Exception:
-                        # Skip if we can't parse the time
-                        continue
-                    
-                    # Skip news older than our cutoff date
-                    if pub_time < cutoff_date:
-                        continue
-                    
-                    # Extract other news data
-                    url = item.get('link', '')
-                    source = item.get('publisher', '')
-                    if isinstance(source, dict):
-                        source = source.get('name', 'Unknown')
-                    
-                    # Get content/summary
-                    content = item.get('summary', '')
-                    if not content:
-                        content = title  # Use title as content if no summary
-                    
-                    # Get image URL if available
-                    image_url = None
-                    if 'thumbnail' in item and isinstance(item['thumbnail'], dict):
-                        image_url = item['thumbnail'].get('resolutions', [{}])[0].get('url', None)
-                    
-                    # Create or update news record
-                    news, created = News.objects.update_or_create(
-                        title=title,
-                        publication_date=pub_time,
-                        defaults={
-                            'content': content,
-                            'source': source or 'Yahoo Finance',
-                            'url': url,
-                            'image_url': image_url,
-                        }
-                    )
-                    
-                    # Associate the news with the stock
-                    NewsStock.objects.get_or_create(news=news, stock=stock)
-                    
-                    if created:
-                        count_added += 1
-                
+                with metrics.time('db'):
+                    count_added = self._store_news(stock, news_items[:limit], cutoff_date, metrics)
                 self.stdout.write(f"  ✅ Added {count_added} new articles for {stock.symbol}")
-                
             except Exception as e:
                 self.stderr.write(f"  ❌ Error fetching news for {stock.symbol}: {str(e)}")
+                error = e
+            telemetry.finish_item(metrics, error)
+        
+        # Network calls run on the worker pool, database writes stay on this thread
+        try:
+            run_pipeline(stocks, fetch, store, workers=workers)
+        except BaseException:
+            telemetry.close('failed')
+            raise
+        telemetry.close()
         
         self.stdout.write(self.style.SUCCESS("\n✅ News fetching completed!"))
 
 
+    def _store_news(self, stock, news_items, cutoff_date, metrics=None):
+        """Store fetched news items for a stock; returns the number of new articles"""
+        # Process news items
+        count_added = 0
+        count_updated = 0
+        for item in news_items:
+            # Extract data from the news item
+            title = item.get('title', '').strip()
+            if not title:  # Skip items without a title
+                continue
+
+            # Parse the timestamp (usually in Unix epoch format)
+            try:
+                if 'providerPublishTime' in item:
+                    pub_time = datetime.fromtimestamp(item['providerPublishTime'])
+                else:
+                    # Skip if we don't have a publication time
+                    continue
+            except Exception:
+                # Skip if we can't parse the time
+                continue
+
+            # Skip news older than our cutoff date
+            if pub_time < cutoff_date:
+                continue
+
+            # Extract other news data
+            url = item.get('link', '')
+            source = item.get('publisher', '')
+            if isinstance(source, dict):
+                source = source.get('name', 'Unknown')
+
+            # Get content/summary
+            content = item.get('summary', '')
+            if not content:
+                content = title  # Use title as content if no summary
+
+            # Get image URL if available
+            image_url = None
+            if 'thumbnail' in item and isinstance(item['thumbnail'], dict):
+                image_url = item['thumbnail'].get('resolutions', [{}])[0].get('url', None)
+
+            # Create or update news record
+            news, created = News.objects.update_or_create(
+                title=title,
+                publication_date=pub_time,
+                defaults={
+                    'content': content,
+                    'source': source or 'Yahoo Finance',
+                    'url': url,
+                    'image_url': image_url,
+                }
+            )
+
+            # Associate the news with the stock
+            NewsStock.objects.get_or_create(news=news, stock=stock)
+
+            if created:
+                count_added += 1
+            else:
+                count_updated += 1
+
+        if metrics is not None:
+            metrics.add_rows(
+                inserted=count_added, updated=count_updated, skipped=len(news_items) - count_added - count_updated
+            )
+        return count_added
+
     def _clean_html(self, text):
         """Remove HTML tags from text"""
         if not text:
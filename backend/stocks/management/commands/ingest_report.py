@@ -0,0 +1,77 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from stocks.services.run_telemetry import (
+    DEFAULT_REGRESSION_THRESHOLD, describe_workload, find_regressions, load_run_reports, workload
+)
+
+
+class Command(BaseCommand):
+    help = "Compare the JSON-lines run reports of recent ingestion and analysis runs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--last',
+            type=int,
+            default=5,
+            help='Number of most recent runs to compare per command and workload (default: 5)'
+        )
+        parser.add_argument(
+            '--command',
+            type=str,
+            help='Only report runs of this management command'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_REGRESSION_THRESHOLD,
+            help=f'Flag runs whose rows/second is this fraction below the median of earlier runs '
+                 f'(default: {DEFAULT_REGRESSION_THRESHOLD})'
+        )
+        parser.add_argument(
+            '--dir',
+            type=str,
+            help='Directory holding the run reports (default: the INGEST_REPORT_DIR setting)'
+        )
+
+    def handle(self, *args, **options):
+        runs = load_run_reports(options.get('dir'), options.get('command'))
+        if not runs:
+            self.stderr.write("❌ No run reports found.")
+            return
+
+        # Runs doing different work (e.g. --skip-stocks vs a full load) are not comparable
+        by_workload = defaultdict(list)
+        for run in runs:
+            by_workload[workload(run)].append(run)
+
+        for (command, _), command_runs in sorted(by_workload.items()):
+            command_runs = command_runs[-max(1, options['last']):]
+            label = describe_workload(command_runs[-1])
+            self.stdout.write(f"\n📊 {command}{f' ({label})' if label else ''}: last {len(command_runs)} runs")
+
+            for run in command_runs:
+                rows = run['rows']
+                elapsed = f"{run['elapsed']:.1f}s" if run['elapsed'] is not None else '-'
+                rate = f"{run['rows_per_second']:.1f}" if run['rows_per_second'] is not None else '-'
+                self.stdout.write(
+                    f"  {run['started_at'][:19]}  {run['status']:<11} {elapsed:>9}  "
+                    f"items {run['items']} ({run['failed_items']} failed)  "
+                    f"rows +{rows['inserted']} ~{rows['updated']} ={rows['skipped']}  {rate} rows/s  "
+                    f"retries {run['retries']}  throttle {run['throttle_wait']:.1f}s"
+                )
+                for phase, (p50, p95) in run['phase_latency'].items():
+                    self.stdout.write(f"      {phase:<8} p50 {p50 * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+                for stage, seconds in run['stages'].items():
+                    self.stdout.write(f"      {stage:<8} {seconds:.2f}s")
+                if run['quarantined']:
+                    reasons = ', '.join(f"{reason} {count}" for reason, count in run['quarantined'].items())
+                    self.stdout.write(f"      🧪 quarantined {sum(run['quarantined'].values())} rows: {reasons}")
+
+            regressions = find_regressions(command_runs, options['threshold'])
+            for run, baseline in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f"  ⚠️ Throughput regression in run {run['run_id']} ({run['started_at'][:19]}): "
+                    f"{run['rows_per_second']:.1f} rows/s vs median {baseline:.1f} rows/s of earlier runs"
+                ))
+            if not regressions and len(command_runs) > 1:
+                self.stdout.write(self.style.SUCCESS("  ✅ No throughput regressions"))
@@ -32,9 +32,51 @@ Usage Examples:
     
     # Update only recent data
     python manage.py load_indices_stock_data --days 30
+
+    # Daily refresh: fetch only bars after the last stored date (plus gaps)
+    python manage.py load_indices_stock_data --incremental
+
+    # Download price history for 50 symbols per request
+    python manage.py load_indices_stock_data --batch-download --batch-size 50
+
+    # Fetch with 8 workers sharing a 4 requests/second limit
+    python manage.py load_indices_stock_data --workers 8 --rate-limit 4
+
+    # Finish an interrupted run, retrying only its failed or missing stages
+    python manage.py load_indices_stock_data --resume <run_id>
+
+    # Refresh index prices only, without touching the reference data or stocks
+    python manage.py load_indices_stock_data --skip-reference --skip-stocks --incremental
+
+    # Load deterministic synthetic data instead of calling Yahoo Finance (see create_synthetic_stocks)
+    python manage.py load_indices_stock_data --provider synthetic
+
+    # Re-run from cached Yahoo Finance responses only (no network calls)
+    python manage.py load_indices_stock_data --replay
     
     # Recalculate technical indicators
-    python manage.py load_indices_stock_data --skip-historical --skip-fundamentals --skip-indices
+    python manage.py calculate_technical_indicators
+
+    # Refresh names, sectors and descriptions regardless of when they were last fetched
+    python manage.py load_indices_stock_data --metadata-max-age 0
+
+    # Seed a fresh PostgreSQL database from cached responses through COPY staging tables
+    python manage.py load_indices_stock_data --replay --batch-download --backfill
+
+    # Store bars that fail the data quality checks too, or allow larger daily moves
+    python manage.py load_indices_stock_data --skip-validation
+    python manage.py load_indices_stock_data --max-daily-move 0.4
+
+    # Fall back to the legacy per-row update_or_create writer
+    python manage.py load_indices_stock_data --row-by-row
+
+    # Calculate technical indicators stock by stock instead of in one panel pass
+    python manage.py load_indices_stock_data --per-stock-technicals
+
+Stock prices are stored as traded, with splits and dividends kept in CorporateAction. Stocks
+whose prices were stored before that (marked by migration 0011, Stock.prices_as_traded=False)
+have their whole stored history refetched by the next price load, incremental or not, which also
+stores their corporate actions; they are then marked as traded.
 
 The command includes comprehensive error handling and progress logging to make data loading
 operations transparent and debuggable.
@@ -46,20 +88,71 @@ operations transparent and debuggable.
 import os
 import json
 import time
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
 from stocks.models import (
     Stock, Sector, Index, StockPrice, StockFundamental,
-    TechnicalIndicator, IndexPrice
+    TechnicalIndicator, IndexPrice, IngestRun
+)
+from stocks.services.price_storage import (
+    DEFAULT_WRITE_BATCH_SIZE, upsert_stock_prices, upsert_index_prices,
+    stock_price_stager, index_price_stager, stage_prices, merge_staged_prices
+)
+from stocks.services.copy_backfill import copy_supported
+from stocks.services.fetch_plan import (
+    DEFAULT_OVERLAP_DAYS, DEFAULT_MAX_GAP_DAYS, plan_fetch_starts
+)
+from stocks.services.history_download import DEFAULT_DOWNLOAD_BATCH_SIZE, download_histories
+from stocks.services.rate_limiter import DEFAULT_REQUESTS_PER_SECOND, TokenBucket, call_with_backoff
+from stocks.services.ingest_workers import run_pipeline
+from stocks.services.response_cache import ResponseCache
+from stocks.services.technical_indicators import invalidate_indicator_state, update_indicators
+from stocks.services.job_ledger import JobLedger
+from stocks.services.reference_sync import read_stock_list, sync_stocks, sync_index_memberships
+from stocks.services.ticker_metadata import DEFAULT_METADATA_MAX_AGE_DAYS, TickerMetadata, is_fresh
+from stocks.services.run_telemetry import RunTelemetry, timed
+from stocks.services.corporate_actions import adjust_prices, store_corporate_actions, unadjust_splits
+from stocks.services.price_validation import (
+    DEFAULT_MAX_DAILY_MOVE, quarantine_issues, reason_counts, validate_histories, validate_history
 )
+from stocks.services.market_data import PROVIDERS, get_provider
+from stocks.services.quotes import refresh_index_quotes, refresh_stock_quotes
+from stocks.services.market_snapshots import refresh_market_snapshots
+from stocks.services.price_rollups import refresh_rollups
 
 
 class Command(BaseCommand):
     help = "Load comprehensive stock and index data from CSV/JSON files and Yahoo Finance API"
 
+    # Storage defaults, overridden from the command options in handle()
+    row_by_row = False
+    backfill = False
+    price_stager = None
+    staged_symbols = None
+    write_batch_size = DEFAULT_WRITE_BATCH_SIZE
+    incremental = False
+    overlap_days = DEFAULT_OVERLAP_DAYS
+    max_gap_days = DEFAULT_MAX_GAP_DAYS
+    batch_download = False
+    batch_size = DEFAULT_DOWNLOAD_BATCH_SIZE
+    workers = 1
+    queue_size = None
+    provider = None
+    limiter = None
+    cache = None
+    metadata = None
+    metadata_max_age = DEFAULT_METADATA_MAX_AGE_DAYS
+    ledger = None
+    telemetry = None
+    per_stock_technicals = False
+    validate = True
+    max_daily_move = DEFAULT_MAX_DAILY_MOVE
+
     def add_arguments(self, parser):
         # Basic data loading options
         parser.add_argument(
@@ -112,8 +205,161 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip loading index price data'
         )
+        parser.add_argument(
+            '--skip-stocks',
+            action='store_true',
+            help='Skip loading stock data from Yahoo Finance'
+        )
+        parser.add_argument(
+            '--skip-reference',
+            action='store_true',
+            help='Do not sync the CSV/JSON reference data when no load option is given '
+                 '(never synced by default for the synthetic provider)'
+        )
+
+        # Incremental fetching options
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Fetch only bars after the latest stored date, plus interior gaps within --days'
+        )
+        parser.add_argument(
+            '--overlap-days',
+            type=int,
+            default=DEFAULT_OVERLAP_DAYS,
+            help=f'Days re-fetched before the latest stored bar in incremental mode (default: {DEFAULT_OVERLAP_DAYS})'
+        )
+        parser.add_argument(
+            '--max-gap-days',
+            type=int,
+            default=DEFAULT_MAX_GAP_DAYS,
+            help=f'Calendar days between bars treated as a gap to backfill (default: {DEFAULT_MAX_GAP_DAYS})'
+        )
+
+        # Batched download options
+        parser.add_argument(
+            '--batch-download',
+            action='store_true',
+            help='Download price history for groups of symbols with one multi-ticker request'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_DOWNLOAD_BATCH_SIZE,
+            help=f'Symbols per multi-ticker history request (default: {DEFAULT_DOWNLOAD_BATCH_SIZE})'
+        )
+
+        # Concurrency options
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of threads fetching from Yahoo Finance; database writes stay serial (default: 1)'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            help=f'Requests per second shared by all workers (default with --workers: {DEFAULT_REQUESTS_PER_SECOND})'
+        )
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            help='Fetched symbols buffered for the database writer (default: 2 x workers)'
+        )
+
+        # Provider and response cache options
+        parser.add_argument(
+            '--provider',
+            choices=list(PROVIDERS),
+            help='Market data provider; synthetic generates deterministic offline data '
+                 '(default: the MARKET_DATA_PROVIDER setting)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Always fetch from Yahoo Finance and do not record responses in the local cache'
+        )
+        parser.add_argument(
+            '--replay',
+            action='store_true',
+            help='Serve all provider data from the local response cache without network calls'
+        )
+
+        parser.add_argument(
+            '--metadata-max-age',
+            type=int,
+            default=DEFAULT_METADATA_MAX_AGE_DAYS,
+            help=f'Days before names, sectors and descriptions are refreshed from Yahoo Finance '
+                 f'(0: every run, default: {DEFAULT_METADATA_MAX_AGE_DAYS})'
+        )
+
+        # Checkpoint options
+        parser.add_argument(
+            '--resume',
+            type=str,
+            metavar='RUN_ID',
+            help='Resume an earlier run with its original options, skipping stages it completed'
+        )
+        parser.add_argument(
+            '--no-report',
+            action='store_true',
+            help='Do not write the JSON-lines run report (see the ingest_report command)'
+        )
+
+        # Storage options
+        parser.add_argument(
+            '--row-by-row',
+            action='store_true',
+            help='Store prices with one update_or_create per row instead of bulk upserts'
+        )
+        parser.add_argument(
+            '--write-batch-size',
+            type=int,
+            default=DEFAULT_WRITE_BATCH_SIZE,
+            help=f'Rows per bulk upsert statement (default: {DEFAULT_WRITE_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--per-stock-technicals',
+            action='store_true',
+            help='Legacy per-stock indicator calculation (does not fill stochastic, CCI and ATR)'
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='PostgreSQL only: stream prices and indicators through COPY into staging tables and merge '
+                 'each table with one statement (for first-time or very large loads)'
+        )
+
+        # Validation options
+        parser.add_argument(
+            '--skip-validation',
+            action='store_true',
+            help='Store fetched bars without the data quality checks (see QuarantinedPrice)'
+        )
+        parser.add_argument(
+            '--max-daily-move',
+            type=float,
+            default=DEFAULT_MAX_DAILY_MOVE,
+            help=f'Quarantine closes moving more than this fraction in a day (default: {DEFAULT_MAX_DAILY_MOVE})'
+        )
 
     def handle(self, *args, **options):
+        # Open the job ledger, or reopen it with the original options when resuming
+        resume_id = options.get('resume')
+        if resume_id:
+            try:
+                self.ledger = JobLedger.resume(resume_id, 'load_indices_stock_data')
+            except (IngestRun.DoesNotExist, ValidationError):
+                self.stderr.write(f"❌ Run '{resume_id}' not found.")
+                return
+            options.update(self.ledger.run.options)
+            self.stdout.write(
+                f"🔁 Resuming run {resume_id}: {len(self.ledger.completed)} completed stages will be skipped"
+            )
+        else:
+            self.ledger = JobLedger.start('load_indices_stock_data', options)
+            self.stdout.write(f"🧾 Run id: {self.ledger.run_id} (resume with --resume {self.ledger.run_id})")
+        
         # Extract options
         load_basic = options.get('load_basic', False)
         load_indices = options.get('load_indices', False)
@@ -124,36 +370,100 @@ class Command(BaseCommand):
         skip_fundamentals = options.get('skip_fundamentals', False)
         skip_technicals = options.get('skip_technicals', False)
         skip_indices = options.get('skip_indices', False)
+        skip_stocks = options.get('skip_stocks', False)
+        skip_reference = options.get('skip_reference', False)
+        self.row_by_row = options.get('row_by_row', False)
+        self.backfill = options.get('backfill', False)
+        if self.backfill and not copy_supported():
+            self.stderr.write("⚠️ --backfill needs PostgreSQL; using bulk upserts instead")
+            self.backfill = False
+        self.write_batch_size = options.get('write_batch_size', DEFAULT_WRITE_BATCH_SIZE)
+        self.per_stock_technicals = options.get('per_stock_technicals', False)
+        self.validate = not options.get('skip_validation', False)
+        self.max_daily_move = options.get('max_daily_move', DEFAULT_MAX_DAILY_MOVE)
+        self.incremental = options.get('incremental', False)
+        self.overlap_days = options.get('overlap_days', DEFAULT_OVERLAP_DAYS)
+        self.max_gap_days = options.get('max_gap_days', DEFAULT_MAX_GAP_DAYS)
+        self.batch_download = options.get('batch_download', False)
+        self.batch_size = options.get('batch_size', DEFAULT_DOWNLOAD_BATCH_SIZE)
+        self.workers = max(1, options.get('workers') or 1)
+        self.queue_size = options.get('queue_size')
+        rate_limit = options.get('rate_limit')
+        if rate_limit or self.workers > 1:
+            self.limiter = TokenBucket(rate_limit or DEFAULT_REQUESTS_PER_SECOND)
+        self.provider = get_provider(options.get('provider'))
+        if not self.provider.remote:
+            self.stdout.write(f"🧪 Using the {self.provider.name} market data provider")
+        if options.get('replay') or not options.get('no_cache'):
+            self.cache = ResponseCache(replay=options.get('replay', False), namespace=self.provider.cache_namespace)
+        self.metadata = TickerMetadata()
+        self.metadata_max_age = options.get('metadata_max_age', DEFAULT_METADATA_MAX_AGE_DAYS)
+        self.telemetry = RunTelemetry(
+            'load_indices_stock_data', options, run_id=self.ledger.run_id, enabled=not options.get('no_report')
+        )
         
-        # If no specific load option is provided, assume we're loading everything
-        if not any([load_basic, load_indices, specific_symbol, specific_index]):
-            load_basic = True
-            load_indices = True
-        
-        # Step 1: Load basic stock data from CSV if requested
-        if load_basic:
-            self.load_basic_stock_data()
-        
-        # Step 2: Load index definitions from JSON if requested
-        if load_indices:
-            self.load_index_definitions()
-        
-        # Step 3: Load stock data from Yahoo Finance
-        if not skip_indices and not specific_symbol:
-            self.load_index_prices(days, specific_index)
-        
-        # Step 4: Load detailed stock data if not explicitly skipped
-        if not specific_index:
-            self.load_stock_data(
-                days, 
-                specific_symbol, 
-                skip_historical, 
-                skip_fundamentals, 
-                skip_technicals
-            )
+        # If no specific load option is provided, assume we're loading everything. The reference
+        # files list the real listings, so syncing them would deactivate the synthetic stocks
+        if not any([load_basic, load_indices, specific_symbol, specific_index, skip_reference]):
+            if self.provider.remote:
+                load_basic = True
+                load_indices = True
+            else:
+                self.stdout.write(f"🧪 Not syncing the reference data for the {self.provider.name} provider")
+        
+        try:
+            # Step 1: Load basic stock data from CSV if requested
+            if load_basic:
+                self.load_basic_stock_data()
+            
+            # Step 2: Load index definitions from JSON if requested
+            if load_indices:
+                self.load_index_definitions()
+            
+            # Step 3: Load stock data from Yahoo Finance
+            if not skip_indices and not specific_symbol:
+                self.load_index_prices(days, specific_index)
+            
+            # Step 4: Load detailed stock data if not explicitly skipped
+            if not specific_index and not skip_stocks:
+                self.load_stock_data(
+                    days, 
+                    specific_symbol, 
+                    skip_historical, 
+                    skip_fundamentals, 
+                    skip_technicals
+                )
+        except BaseException:
+            self._abandon_staged_prices()
+            self.ledger.finish(failed=True)
+            self.telemetry.close('failed')
+            raise
+        
+        if self.cache is not None and not self.cache.replay:
+            self._prune_cache()
         
+        status = self.ledger.finish()
+        self.telemetry.close(status)
+        self.stdout.write(
+            f"\n🧾 Run {self.ledger.run_id} {status}: {self.ledger.done_count} stages done, "
+            f"{self.ledger.failed_count} failed"
+        )
+        if self.telemetry.path:
+            self.stdout.write(f"📊 Run report: {self.telemetry.path}")
+        self.stdout.write(f"\n📊 Ticker info requests this run: {self.metadata.requests}")
         self.stdout.write(self.style.SUCCESS("\n✅ All data loading operations completed!"))
 
+    def _prune_cache(self):
+        """Drop expired response cache entries so the cache does not grow without bound"""
+        with self.telemetry.stage('prune_cache') as stage:
+            result = self.cache.prune()
+            stage['cache'] = result._asdict()
+        if result.refs or result.objects:
+            self.stdout.write(
+                f"\n🧹 Response cache: pruned {result.refs} expired entries and {result.objects} objects "
+                f"({result.bytes / 1e6:.1f} MB)"
+            )
+
     def load_basic_stock_data(self):
         """Load basic stock data from CSV file"""
         self.stdout.write("\n🔄 Loading basic stock data from CSV...")
@@ -162,8 +472,7 @@ class Command(BaseCommand):
         csv_path = os.path.join(data_path, 'Şirketler.csv')
 
         try:
-            df = pd.read_csv(csv_path, header=None)
-            df.columns = ['ticker', 'name']
+            stock_names = read_stock_list(csv_path)
         except FileNotFoundError:
             self.stderr.write("❌ Error: 'Şirketler.csv' not found in /data directory.")
             return
@@ -171,25 +480,15 @@ class Command(BaseCommand):
             self.stderr.write(f"❌ Error reading CSV: {e}")
             return
 
-        created_count = 0
-        updated_count = 0
-        for _, row in df.iterrows():
-            symbol = str(row['ticker']).strip()
-            name = str(row['name']).strip()
-
-            stock, created = Stock.objects.get_or_create(
-                symbol=symbol,
-                defaults={'name': name, 'is_active': True}
-            )
-
-            if not created:
-                stock.name = name
-                stock.save()
-                updated_count += 1
-            else:
-                created_count += 1
-                
-        self.stdout.write(self.style.SUCCESS(f'✅ Basic stock data: Added {created_count}, Updated {updated_count} stocks'))
+        with self.telemetry.stage('sync_stocks') as stage:
+            result = sync_stocks(stock_names)
+            stage['rows'] = {
+                'inserted': result.created, 'updated': result.updated + result.deactivated, 'skipped': result.unchanged
+            }
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Basic stock data: Added {result.created}, Updated {result.updated}, '
+            f'Unchanged {result.unchanged}, Deactivated {result.deactivated} stocks'
+        ))
 
     def load_index_definitions(self):
         """Load index definitions and their constituent stocks from JSON file"""
@@ -211,36 +510,19 @@ class Command(BaseCommand):
             self.stderr.write(f"❌ Error reading JSON file: {e}")
             return
 
-        # Process each index and its stocks
-        for index_name, stock_symbols in indices_data.items():
-            # Create or get the index
-            index, created = Index.objects.get_or_create(
-                name=index_name,
-                defaults={
-                    'display_name': index_name.replace('_', ' '),
-                    'region': 'Turkey'
-                }
-            )
-            
-            status = "Created" if created else "Updated"
+        # Sync every index and its constituents in one pass
+        with self.telemetry.stage('sync_index_memberships'):
+            results = sync_index_memberships(indices_data)
+        for index_name, result in results.items():
+            status = "Created" if result.index_created else "Updated"
             self.stdout.write(f'📊 {status} index: {index_name}')
             
-            # Add stocks to the index
-            added_count = 0
-            not_found_count = 0
+            for symbol in result.missing:
+                self.stderr.write(f"⚠️ Stock with symbol '{symbol}' not found, skipping")
             
-            for symbol in stock_symbols:
-                try:
-                    stock = Stock.objects.get(symbol=symbol)
-                    stock.indices.add(index)
-                    added_count += 1
-                except Stock.DoesNotExist:
-                    self.stderr.write(f"⚠️ Stock with symbol '{symbol}' not found, skipping")
-                    not_found_count += 1
-            
-            self.stdout.write(f'  ✅ Added {added_count} stocks to {index_name} index')
-            if not_found_count > 0:
-                self.stdout.write(f'  ⚠️ {not_found_count} stocks from {index_name} index were not found in the database')
+            self.stdout.write(f'  ✅ Added {result.added}, Removed {result.removed} stocks in {index_name} index')
+            if result.missing:
+                self.stdout.write(f'  ⚠️ {len(result.missing)} stocks from {index_name} index were not found in the database')
 
     def load_index_prices(self, days, specific_index=None):
         """Load index price data from Yahoo Finance"""
@@ -312,83 +594,115 @@ class Command(BaseCommand):
         
         self.stdout.write(f"🔍 Processing {len(indices)} indices...")
         
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Process each index
+        # Skip indices already loaded earlier in this run
+        index_items = []
         for index in indices:
             if index.name not in INDEX_MAPPING:
                 self.stderr.write(f"⚠️ No Yahoo Finance symbol mapping for {index.name}, skipping")
                 continue
-                
-            yahoo_symbol = INDEX_MAPPING[index.name]
+            if self.ledger.is_done('index', index.name, 'prices'):
+                continue
+            index_items.append((index, INDEX_MAPPING[index.name]))
+        
+        completed_count = len([index for index in indices if self.ledger.is_done('index', index.name, 'prices')])
+        if completed_count:
+            self.stdout.write(f"⏭️ Skipping {completed_count} indices completed earlier in this run")
+        
+        # Calculate date range
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        fetch_starts = self._plan_fetch_starts(IndexPrice, 'index', [index for index, _ in index_items], start_date)
+        histories = self._download_histories(
+            {yahoo_symbol: fetch_starts.get(index.id, start_date) for index, yahoo_symbol in index_items},
+            end_date
+        )
+        histories = self._validate_histories(
+            'index', histories, {yahoo_symbol: index.name for index, yahoo_symbol in index_items}
+        )
+        
+        # Fetch (network) and store (database) each index
+        
+        def fetch(item):
+            index, yahoo_symbol = item
+            metrics = self.telemetry.item('index', index.name)
+            with metrics.time('network'):
+                return self._fetch_index_payload(
+                    yahoo_symbol, fetch_starts.get(index.id, start_date), end_date,
+                    hist=histories.get(yahoo_symbol, pd.DataFrame()) if histories is not None else None,
+                    fetch_info=not is_fresh(index.metadata_updated_at, self.metadata_max_age),
+                    metrics=metrics
+                )
+        
+        def store(item, payload, error):
+            index, yahoo_symbol = item
+            metrics = self.telemetry.item('index', index.name)
             self.stdout.write(f"\n📊 Processing {index.name} ({yahoo_symbol})")
-            
+            if error is not None:
+                self.stderr.write(f"❌ Error processing {index.name}: {str(error)}")
+                self.ledger.record('index', index.name, {'prices': error})
+                self.telemetry.finish_item(metrics, error)
+                return
             try:
-                # Fetch the index data from Yahoo Finance
-                yf_index = yf.Ticker(yahoo_symbol)
-                
-                # Get historical data
-                hist = yf_index.history(
-                    start=start_date.strftime('%Y-%m-%d'), 
-                    end=end_date.strftime('%Y-%m-%d')
-                )
-                
-                if hist.empty:
-                    self.stderr.write(f"  ⚠️ No historical data available for {index.name}")
-                    continue
-                
-                # Reset index to make date a column
-                hist.reset_index(inplace=True)
-                
-                # Store each day's data
-                created_count = 0
-                updated_count = 0
-                
-                for _, row in hist.iterrows():
-                    date = row['Date'].date()  # Convert timestamp to date
-                    
-                    # Skip if any essential data is missing
-                    if pd.isna(row['Open']) or pd.isna(row['Close']) or pd.isna(row['Volume']):
-                        continue
-                    
-                    # Create or update price record
-                    price, created = IndexPrice.objects.update_or_create(
-                        index=index,
-                        date=date,
-                        defaults={
-                            'open': row['Open'],
-                            'high': row['High'],
-                            'low': row['Low'],
-                            'close': row['Close'],
-                            'volume': int(row['Volume'])
-                        }
-                    )
-                    
-                    if created:
-                        created_count += 1
-                    else:
-                        updated_count += 1
-                
-                self.stdout.write(f"  ✅ Prices: Added {created_count}, Updated {updated_count} records")
-                
-                # Update index info if available
-                try:
-                    info = yf_index.info
-                    if 'longName' in info and info['longName']:
-                        index.display_name = info['longName']
-                        index.save()
-                        self.stdout.write(f"  ✅ Updated index display name to: {info['longName']}")
-                except Exception as e:
-                    self.stderr.write(f"  ⚠️ Could not update index info: {str(e)}")
-                
-                # Pause to avoid rate limiting
-                time.sleep(1)
-                
+                with metrics.time('db'):
+                    error = self._store_index_payload(index, payload, metrics)
             except Exception as e:
                 self.stderr.write(f"❌ Error processing {index.name}: {str(e)}")
-                continue
+                error = e
+            self.ledger.record('index', index.name, {'prices': error})
+            self.telemetry.finish_item(metrics, error)
+        
+        self._start_staging(index_price_stager)
+        self._run_stages(index_items, fetch, store)
+        self._merge_staged_prices('index')
+        self._refresh_quotes('index', [index.id for index, _ in index_items])
+        self._refresh_rollups(
+            'index', [index.id for index, _ in index_items],
+            min((fetch_starts.get(index.id, start_date.date()) for index, _ in index_items), default=None)
+        )
+
+    def _fetch_index_payload(self, yahoo_symbol, start_date, end_date, hist=None, fetch_info=True, metrics=None):
+        """Network stage for one index: price history and (unless fresh) info"""
+        yf_index = self.provider.ticker(yahoo_symbol)
+        payload = {'hist': hist, 'info': None, 'errors': {}}
+        
+        # Get historical data
+        if hist is None:
+            payload['hist'] = self._fetch_history(yf_index, yahoo_symbol, start_date, end_date, metrics)
+        
+        if payload['hist'].empty or not fetch_info:
+            return payload
+        
+        try:
+            payload['info'] = self._fetch_info(yf_index, yahoo_symbol, metrics)
+        except Exception as e:
+            payload['errors']['info'] = e
+        return payload
+
+    def _store_index_payload(self, index, payload, metrics=None):
+        """Database stage for one index; returns an error message if no prices were stored"""
+        hist = payload['hist']
+        if hist.empty:
+            self.stderr.write(f"  ⚠️ No historical data available for {index.name}")
+            return "No historical data available"
+        
+        # Store the price history
+        self._store_index_prices(index, hist, metrics)
+        
+        # Update index info if available
+        if 'info' in payload['errors']:
+            self.stderr.write(f"  ⚠️ Could not update index info: {str(payload['errors']['info'])}")
+            return None
+        
+        info = payload['info']
+        if info is None:
+            return None
+        
+        if 'longName' in info and info['longName']:
+            index.display_name = info['longName']
+            self.stdout.write(f"  ✅ Updated index display name to: {info['longName']}")
+        index.metadata_updated_at = timezone.now()
+        index.save()
+        return None
 
     def load_stock_data(self, days, specific_symbol=None, skip_historical=False, 
                         skip_fundamentals=False, skip_technicals=False):
@@ -404,46 +718,445 @@ class Command(BaseCommand):
         else:
             stocks = Stock.objects.filter(is_active=True)
         
-        self.stdout.write(f"🔍 Processing {stocks.count()} stocks...")
+        stocks = list(stocks)
+        self.stdout.write(f"🔍 Processing {len(stocks)} stocks...")
+        
+        # Stages still to do for each stock (all requested ones unless resuming)
+        stages = [
+            stage for stage, skipped in (
+                ('prices', skip_historical), ('fundamentals', skip_fundamentals), ('technicals', skip_technicals)
+            ) if not skipped
+        ]
+        pending = {stock.id: self.ledger.pending_stages('stock', stock.symbol, stages) for stock in stocks}
+        to_fetch = [stock for stock in stocks if set(pending[stock.id]) - {'technicals'}]
+        technicals_only = [stock for stock in stocks if pending[stock.id] == ['technicals']]
+        completed_count = len(stocks) - len(to_fetch) - len(technicals_only)
+        if completed_count:
+            self.stdout.write(f"⏭️ Skipping {completed_count} stocks completed earlier in this run")
+        
+        # Work out where each stock's history fetch should start
+        start_date = datetime.now() - timedelta(days=days)
+        price_stocks = [stock for stock in to_fetch if 'prices' in pending[stock.id]]
+        fetch_starts = {}
+        histories = None
+        if price_stocks:
+            fetch_starts = self._plan_fetch_starts(StockPrice, 'stock', price_stocks, start_date)
+            fetch_starts.update(self._plan_rebuilds(price_stocks, start_date))
+            histories = self._download_histories(
+                {f"{stock.symbol}.IS": fetch_starts.get(stock.id, start_date) for stock in price_stocks},
+                datetime.now()
+            )
+            histories = self._validate_histories(
+                'stock', histories, {f"{stock.symbol}.IS": stock.symbol for stock in price_stocks}
+            )
+        
+        # Stocks that already have today's fundamentals only need info when their metadata is stale
+        fundamentals_today = set()
+        if not skip_fundamentals:
+            fundamentals_today = set(
+                StockFundamental.objects.filter(date=datetime.now().date()).values_list('stock_id', flat=True)
+            )
         
-        # Process each stock
-        for stock in stocks:
+        # Stocks whose indicators are calculated together once loading is done
+        technicals_pending = list(technicals_only)
+        
+        # Fetch (network) and store (database) each stock
+        def fetch(stock):
+            yahoo_symbol = f"{stock.symbol}.IS"
+            stock_stages = pending[stock.id]
+            prefetched = None
+            if histories is not None and 'prices' in stock_stages:
+                prefetched = histories.get(yahoo_symbol, pd.DataFrame())
+            needs_info = (
+                not is_fresh(stock.metadata_updated_at, self.metadata_max_age)
+                or ('fundamentals' in stock_stages and stock.id not in fundamentals_today)
+            )
+            metrics = self.telemetry.item('stock', stock.symbol)
+            with metrics.time('network'):
+                return self._fetch_stock_payload(
+                    stock, fetch_starts.get(stock.id, start_date),
+                    fetch_history='prices' in stock_stages, hist=prefetched, fetch_info=needs_info,
+                    metrics=metrics
+                )
+        
+        def store(stock, payload, error):
             self.stdout.write(f"\n📈 Processing {stock.symbol} - {stock.name}")
-            
-            # Fetch the stock data from Yahoo Finance
-            # Note: For Turkish stocks, append '.IS' to the symbol for Yahoo Finance
-            yahoo_symbol = f"{stock.symbol}.IS" 
-            
+            stock_stages = pending[stock.id]
+            metrics = self.telemetry.item('stock', stock.symbol)
+            if error is not None:
+                self.stderr.write(f"❌ Error processing {stock.symbol}: {str(error)}")
+                self.ledger.record('stock', stock.symbol, {stage: error for stage in stock_stages})
+                self.telemetry.finish_item(metrics, error)
+                return
             try:
-                yf_stock = yf.Ticker(yahoo_symbol)
-                
-                # Update basic stock info
-                self._update_stock_info(stock, yf_stock)
-                
-                # Load historical prices if not skipped
-                if not skip_historical:
-                    self._load_historical_prices(stock, yf_stock, days)
-                
-                # Load fundamental data if not skipped
-                if not skip_fundamentals:
-                    self._load_fundamentals(stock, yf_stock)
-                
-                # Calculate technical indicators if not skipped and we have price data
-                if not skip_technicals and StockPrice.objects.filter(stock=stock).exists():
-                    self._calculate_technical_indicators(stock)
-                
-                # Pause to avoid rate limiting
-                time.sleep(1)
-                
+                with metrics.time('db'):
+                    outcomes = self._store_stock_payload(
+                        stock, payload, 'prices' not in stock_stages, 'fundamentals' not in stock_stages,
+                        'technicals' not in stock_stages or not self.per_stock_technicals, metrics=metrics
+                    )
             except Exception as e:
                 self.stderr.write(f"❌ Error processing {stock.symbol}: {str(e)}")
-                continue
+                self.ledger.record('stock', stock.symbol, {stage: e for stage in stock_stages})
+                self.telemetry.finish_item(metrics, e)
+                return
+            self.ledger.record('stock', stock.symbol, outcomes)
+            self.telemetry.finish_item(metrics, next((error for error in outcomes.values() if error), None))
+            if 'technicals' in stock_stages and not self.per_stock_technicals:
+                technicals_pending.append(stock)
+        
+        self._start_staging(stock_price_stager)
+        self._run_stages(to_fetch, fetch, store)
+        failed_merge = self._merge_staged_prices('stock')
+        self._finish_rebuilds([
+            stock for stock in price_stocks
+            if stock.symbol not in failed_merge and self.ledger.is_done('stock', stock.symbol, 'prices')
+        ])
+        self._refresh_quotes('stock', [stock.id for stock in price_stocks])
+        since = min((fetch_starts.get(stock.id, start_date.date()) for stock in price_stocks), default=None)
+        self._refresh_rollups('stock', [stock.id for stock in price_stocks], since)
+        if price_stocks:
+            self._refresh_market_snapshots(since)
+        technicals_pending = [stock for stock in technicals_pending if stock.symbol not in failed_merge]
+        
+        if not technicals_pending:
+            return
+        if self.per_stock_technicals:
+            for stock in technicals_pending:
+                self.stdout.write(f"\n📈 Processing {stock.symbol} - {stock.name}")
+                self.ledger.record('stock', stock.symbol, {'technicals': self._calculate_technical_indicators(stock)})
+        else:
+            error = self._calculate_panel_indicators([stock.id for stock in technicals_pending])
+            self.ledger.record_many('stock', {stock.symbol: {'technicals': error} for stock in technicals_pending})
+
+    def _calculate_panel_indicators(self, stock_ids):
+        """Calculate technical indicators for the new bars of all loaded stocks in one vectorized pass; returns an error message on failure"""
+        self.stdout.write(f"\n📊 Calculating technical indicators for {len(stock_ids)} stocks...")
+        try:
+            started = time.monotonic()
+            with self.telemetry.stage('technicals', stocks=len(stock_ids)) as stage:
+                processed, created_count, updated_count = update_indicators(
+                    stock_ids, batch_size=self.write_batch_size, use_copy=self.backfill
+                )
+                stage['rows'] = {'inserted': created_count, 'updated': updated_count}
+            self.stdout.write(
+                f"  ✅ Technical indicators for {processed} stocks: Added {created_count}, "
+                f"Updated {updated_count} records in {time.monotonic() - started:.1f}s"
+            )
+        except Exception as e:
+            self.stderr.write(f"  ⚠️ Could not calculate technical indicators: {str(e)}")
+            return str(e)
+        return None
+
+    def _start_staging(self, make_stager):
+        """In --backfill mode, stage fetched prices for one merge instead of upserting them"""
+        if self.backfill and not self.row_by_row:
+            self.price_stager = make_stager()
+            self.staged_symbols = {}
 
-    def _update_stock_info(self, stock, yf_stock):
-        """Update basic stock information"""
+    def _merge_staged_prices(self, item_type):
+        """Merge prices staged in --backfill mode; returns the symbols whose prices could not be merged"""
+        stager, symbols = self.price_stager, self.staged_symbols or {}
+        self.price_stager, self.staged_symbols = None, None
+        if stager is None:
+            return set()
+        
         try:
-            info = yf_stock.info
+            if not symbols:
+                return set()
+            self.stdout.write(f"\n📥 Merging {stager.staged} staged price rows for {len(symbols)} {item_type}s...")
+            started = time.monotonic()
+            with self.telemetry.stage(f'{item_type}_price_merge', staged=stager.staged) as stage:
+                results = merge_staged_prices(stager)
+                created = sum(result.created for result in results.values())
+                updated = sum(result.updated for result in results.values())
+                unchanged = sum(result.unchanged for result in results.values())
+                stage['rows'] = {'inserted': created, 'updated': updated, 'skipped': unchanged}
+            self.stdout.write(
+                f"  ✅ Prices: Added {created}, Updated {updated}, Unchanged {unchanged} records "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+            return set()
+        except Exception as e:
+            self.stderr.write(f"  ❌ Could not merge staged prices: {str(e)}")
+            self.ledger.record_many(item_type, {symbol: {'prices': e} for symbol in symbols.values()})
+            return set(symbols.values())
+        finally:
+            stager.close()
+
+    def _refresh_quotes(self, item_type, owner_ids):
+        """Rebuild the latest-quote snapshots of the stocks or indices whose prices were loaded"""
+        if not owner_ids:
+            return
+        refresh = refresh_stock_quotes if item_type == 'stock' else refresh_index_quotes
+        try:
+            with self.telemetry.stage(f'{item_type}_quotes', owners=len(owner_ids)) as stage:
+                stage['quotes'] = refresh(owner_ids)
+            self.stdout.write(f"💹 Refreshed {stage['quotes']} {item_type} quotes")
+        except Exception as e:
+            self.stderr.write(f"⚠️ Could not refresh {item_type} quotes: {str(e)}")
+
+    def _refresh_rollups(self, item_type, owner_ids, since):
+        """Rebuild the weekly and monthly candles of the periods the loaded prices fall in"""
+        if not owner_ids:
+            return
+        try:
+            with self.telemetry.stage(f'{item_type}_rollups', owners=len(owner_ids)) as stage:
+                stage['rollups'] = refresh_rollups(item_type, owner_ids, since)
+            self.stdout.write(f"🕯️ Refreshed {stage['rollups']} weekly and monthly {item_type} candles")
+        except Exception as e:
+            self.stderr.write(f"⚠️ Could not refresh {item_type} rollups: {str(e)}")
+
+    def _refresh_market_snapshots(self, since):
+        """Recompute the market, sector and index breadth snapshots of the days just loaded"""
+        try:
+            with self.telemetry.stage('market_snapshots') as stage:
+                stage['snapshots'] = refresh_market_snapshots(start=since)
+            self.stdout.write(f"📊 Refreshed {stage['snapshots']} market breadth snapshots")
+        except Exception as e:
+            self.stderr.write(f"⚠️ Could not refresh market snapshots: {str(e)}")
+
+    def _abandon_staged_prices(self):
+        """Mark prices staged but never merged as failed, so a resumed run fetches them again"""
+        if self.price_stager is None or not self.staged_symbols:
+            return
+        item_type = 'stock' if self.price_stager.model is StockPrice else 'index'
+        self.ledger.record_many(item_type, {
+            symbol: {'prices': 'Interrupted before the backfill merge'} for symbol in self.staged_symbols.values()
+        })
+        self.price_stager = None
+
+    def _run_stages(self, items, fetch, store):
+        """Run fetch/store for every item, serially or on the worker pool"""
+        if self.workers > 1:
+            run_pipeline(items, fetch, store, workers=self.workers, queue_size=self.queue_size)
+            return
+        
+        for item in items:
+            try:
+                payload, error = fetch(item), None
+            except Exception as e:
+                payload, error = None, e
+            store(item, payload, error)
             
+            # Pause to avoid rate limiting
+            if self.limiter is None and self.provider.remote and not (self.cache and self.cache.replay):
+                time.sleep(1)
+
+    def _fetch_stock_payload(self, stock, start_date, fetch_history=True, hist=None, fetch_info=True, metrics=None):
+        """Network stage for one stock: info (when needed) and price history"""
+        # Note: For Turkish stocks, append '.IS' to the symbol for Yahoo Finance
+        yahoo_symbol = f"{stock.symbol}.IS"
+        yf_stock = self.provider.ticker(yahoo_symbol)
+        payload = {'info': None, 'hist': hist, 'errors': {}}
+        
+        if fetch_info:
+            try:
+                payload['info'] = self._fetch_info(yf_stock, yahoo_symbol, metrics)
+            except Exception as e:
+                payload['errors']['info'] = e
+        
+        if fetch_history and hist is None:
+            try:
+                payload['hist'] = self._fetch_history(yf_stock, yahoo_symbol, start_date, datetime.now(), metrics)
+            except Exception as e:
+                payload['errors']['history'] = e
+        return payload
+
+    def _fetch_history(self, yf_ticker, yahoo_symbol, start_date, end_date, metrics=None):
+        """Price history for one ticker, through the response cache when enabled"""
+        def fetch():
+            return call_with_backoff(
+                lambda: yf_ticker.history(
+                    start=start_date.strftime('%Y-%m-%d'),
+                    end=end_date.strftime('%Y-%m-%d'),
+                    # Unadjusted closes and the split/dividend events, adjusted at read time
+                    auto_adjust=False,
+                    actions=True
+                ),
+                self.limiter,
+                metrics=metrics
+            )
+        
+        if self.cache is None:
+            return fetch()
+        return self.cache.history(yahoo_symbol, fetch, start=start_date, end=end_date)
+
+    def _fetch_info(self, yf_ticker, yahoo_symbol, metrics=None):
+        """Info dict for one ticker, requested once per run and through the response cache when enabled"""
+        def fetch():
+            request = lambda: call_with_backoff(lambda: yf_ticker.info, self.limiter, metrics=metrics)
+            if self.cache is None:
+                return request()
+            return self.cache.info(yahoo_symbol, request)
+        
+        if self.metadata is None:
+            return fetch()
+        return self.metadata.get(yahoo_symbol, fetch)
+
+    def _store_stock_payload(self, stock, payload, skip_historical=False,
+                             skip_fundamentals=False, skip_technicals=False, metrics=None):
+        """Database stage for one stock; returns {stage: error message or None} for the stages run"""
+        errors = payload['errors']
+        info = payload['info']
+        outcomes = {}
+        
+        # Update basic stock info unless it was refreshed recently
+        if 'info' in errors:
+            self.stderr.write(f"  ⚠️ Could not update basic info: {str(errors['info'])}")
+        elif info is None or is_fresh(stock.metadata_updated_at, self.metadata_max_age):
+            self.stdout.write("  ✅ Basic info is up to date")
+        else:
+            self._update_stock_info(stock, info)
+        
+        # Load historical prices if not skipped
+        if not skip_historical:
+            if 'history' in errors:
+                self.stderr.write(f"  ⚠️ Could not load historical prices: {str(errors['history'])}")
+                outcomes['prices'] = str(errors['history'])
+            else:
+                outcomes['prices'] = self._load_historical_prices(stock, payload['hist'], metrics)
+        
+        # Load fundamental data if not skipped
+        if not skip_fundamentals:
+            if 'info' in errors:
+                self.stderr.write(f"  ⚠️ Could not load fundamentals: {str(errors['info'])}")
+                outcomes['fundamentals'] = str(errors['info'])
+            elif info is None:
+                self.stdout.write("  ✅ Fundamental data already stored for today")
+                outcomes['fundamentals'] = None
+            else:
+                outcomes['fundamentals'] = self._load_fundamentals(stock, info)
+        
+        # Calculate technical indicators if not skipped and we have price data
+        if not skip_technicals:
+            outcomes['technicals'] = None
+            if StockPrice.objects.filter(stock=stock).exists():
+                outcomes['technicals'] = self._calculate_technical_indicators(stock)
+        
+        return outcomes
+
+    def _plan_fetch_starts(self, model, owner_field, owners, start_date):
+        """Return {owner_id: fetch start} for incremental mode, or {} for full fetches"""
+        if not self.incremental:
+            return {}
+        
+        fetch_starts = plan_fetch_starts(
+            model, owner_field, [owner.id for owner in owners], start_date.date(),
+            overlap_days=self.overlap_days, max_gap_days=self.max_gap_days
+        )
+        full_count = sum(1 for start in fetch_starts.values() if start <= start_date.date())
+        self.stdout.write(
+            f"⏩ Incremental mode: {len(fetch_starts) - full_count} delta fetches, "
+            f"{full_count} full-window fetches"
+        )
+        return fetch_starts
+
+    def _plan_rebuilds(self, stocks, start_date):
+        """Return {stock_id: fetch start} covering the whole stored history of stocks not yet stored as traded"""
+        rebuild = [stock.id for stock in stocks if not stock.prices_as_traded]
+        if not rebuild:
+            return {}
+        
+        first_dates = dict(
+            StockPrice.objects.filter(stock_id__in=rebuild)
+            .values('stock_id').annotate(first=Min('date')).values_list('stock_id', 'first')
+        )
+        self.stdout.write(
+            f"🔁 Refetching the full stored history of {len(rebuild)} stocks stored before corporate actions were kept"
+        )
+        return {stock_id: min(first_dates.get(stock_id, start_date.date()), start_date.date()) for stock_id in rebuild}
+
+    def _finish_rebuilds(self, stocks):
+        """Mark the stocks whose whole stored history was just refetched as traded"""
+        rebuilt = [stock.id for stock in stocks if not stock.prices_as_traded]
+        if rebuilt:
+            Stock.objects.filter(id__in=rebuilt).update(prices_as_traded=True)
+            self.stdout.write(f"🔁 {len(rebuilt)} stocks now store as-traded prices")
+
+    def _download_histories(self, starts, end_date):
+        """Prefetch {yahoo_symbol: history} in multi-ticker batches, or None when batching is off"""
+        if not self.batch_download:
+            return None
+        
+        # Serve what we can from the response cache
+        histories = {}
+        if self.cache is not None:
+            for symbol, start in starts.items():
+                cached = self.cache.cached_history(symbol, start=start, end=end_date)
+                if cached is not None:
+                    histories[symbol] = cached
+            starts = {symbol: start for symbol, start in starts.items() if symbol not in histories}
+            if histories:
+                self.stdout.write(f"💾 Using cached history for {len(histories)} symbols")
+        
+        if not starts:
+            return histories
+        if self.cache is not None and self.cache.replay:
+            self.stderr.write(f"  ⚠️ No cached history for: {', '.join(sorted(starts))}")
+            return histories
+        
+        self.stdout.write(
+            f"📦 Downloading history for {len(starts)} symbols in batches of {self.batch_size}..."
+        )
+        with self.telemetry.stage('batch_download', symbols=len(starts)):
+            downloaded, failed = download_histories(
+                starts, end_date, batch_size=self.batch_size, limiter=self.limiter,
+                provider=self.provider, pause=1.0 if self.provider.remote else 0.0
+            )
+        if self.cache is not None:
+            for symbol, hist in downloaded.items():
+                self.cache.store_history(symbol, hist, start=starts[symbol], end=end_date)
+        histories.update(downloaded)
+        self.stdout.write(f"  ✅ Downloaded history for {len(downloaded)} symbols")
+        if failed:
+            self.stderr.write(f"  ⚠️ No history after individual retries for: {', '.join(sorted(failed))}")
+        return histories
+
+    def _validate_histories(self, item_type, histories, names):
+        """Check prefetched {yahoo_symbol: history} frames in one vectorized pass and quarantine bad rows"""
+        if not histories or not self.validate:
+            return histories
+        
+        with self.telemetry.stage(f'{item_type}_price_validation', symbols=len(histories)) as stage:
+            result = validate_histories(
+                histories, max_daily_move=self.max_daily_move, zero_volume=item_type == 'stock'
+            )
+            stage['checked'] = result.checked
+            quarantine_issues(item_type, result.issues, names, run=self.ledger.run)
+        
+        for symbol, issues in result.issues.groupby('symbol'):
+            self.telemetry.item(item_type, names.get(symbol, symbol)).add_quarantined(reason_counts(issues))
+        counts = reason_counts(result.issues)
+        self.stdout.write(
+            f"🧪 Validated {result.checked} bars: quarantined {len(result.issues)}"
+            + (f" ({', '.join(f'{reason} {count}' for reason, count in counts.items())})" if counts else "")
+        )
+        return result.histories
+
+    def _validate_history(self, item_type, symbol, hist, metrics=None):
+        """Check one history frame unless it was validated with its batch; returns the frame to store"""
+        if not self.validate or hist.attrs.get('validated'):
+            return hist
+        
+        with timed(metrics, 'parse'):
+            hist, issues = validate_history(
+                hist, max_daily_move=self.max_daily_move, zero_volume=item_type == 'stock'
+            )
+        if issues.empty:
+            return hist
+        with timed(metrics, 'db'):
+            quarantine_issues(item_type, issues, {None: symbol}, run=self.ledger.run)
+        counts = reason_counts(issues)
+        if metrics is not None:
+            metrics.add_quarantined(counts)
+        self.stdout.write(
+            f"  🧪 Quarantined {len(issues)} bars: {', '.join(f'{reason} {count}' for reason, count in counts.items())}"
+        )
+        return hist
+
+    def _update_stock_info(self, stock, info):
+        """Update basic stock information from a Yahoo Finance info dict"""
+        try:
             # Update sector if available
             if 'sector' in info and info['sector']:
                 sector_name = info['sector']
@@ -469,68 +1182,125 @@ class Command(BaseCommand):
             if 'longBusinessSummary' in info and info['longBusinessSummary']:
                 stock.description = info['longBusinessSummary']
             
+            stock.metadata_updated_at = timezone.now()
             stock.save()
             self.stdout.write(f"  ✅ Updated basic info for {stock.symbol}")
             
         except Exception as e:
             self.stderr.write(f"  ⚠️ Could not update basic info: {str(e)}")
 
-    def _load_historical_prices(self, stock, yf_stock, days):
-        """Load historical price data"""
+    def _load_historical_prices(self, stock, hist, metrics=None):
+        """Store fetched historical price data; returns an error message on failure"""
         try:
-            # Calculate start date
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-            
-            # Get historical data
-            hist = yf_stock.history(start=start_date.strftime('%Y-%m-%d'), end=end_date.strftime('%Y-%m-%d'))
-            
-            if hist.empty:
+            if hist is None or hist.empty:
                 self.stderr.write(f"  ⚠️ No historical data available for {stock.symbol}")
-                return
+                return "No historical data available"
             
-            # Reset index to make date a column
-            hist.reset_index(inplace=True)
+            # Store the price history
+            self._store_stock_prices(stock, hist, metrics)
             
-            # Store each day's data
-            created_count = 0
-            updated_count = 0
+        except Exception as e:
+            self.stderr.write(f"  ⚠️ Could not load historical prices: {str(e)}")
+            return str(e)
+        return None
+
+    def _store_stock_prices(self, stock, hist, metrics=None):
+        """Write a stock's price history with the configured storage path"""
+        with timed(metrics, 'db'):
+            actions = store_corporate_actions(stock, hist)
+        if actions:
+            self.stdout.write(f"  📎 Corporate actions: Added or changed {actions} splits/dividends")
+        hist = self._validate_history('stock', stock.symbol, hist, metrics)
+        if hist.empty:
+            self.stderr.write("  ⚠️ No valid bars left to store")
+            return
+
+        if self.row_by_row:
+            created_count, updated_count = self._store_prices_row_by_row(
+                StockPrice.objects, {'stock': stock}, hist
+            )
+            invalidate_indicator_state(stock, hist.index.min().date())
+            if metrics is not None:
+                metrics.add_rows(inserted=created_count, updated=updated_count)
+            self.stdout.write(f"  ✅ Prices: Added {created_count}, Updated {updated_count} records")
+            return
+
+        if self.price_stager is not None:
+            staged = stage_prices(self.price_stager, stock, hist, metrics)
+            self.staged_symbols[stock.pk] = stock.symbol
+            self.stdout.write(f"  📥 Prices: Staged {staged} records")
+            return
+
+        result = upsert_stock_prices(stock, hist, batch_size=self.write_batch_size, metrics=metrics)
+        self.stdout.write(
+            f"  ✅ Prices: Added {result.created}, Updated {result.updated}, "
+            f"Unchanged {result.unchanged} records"
+        )
+
+    def _store_index_prices(self, index, hist, metrics=None):
+        """Write an index's price history with the configured storage path"""
+        hist = self._validate_history('index', index.name, hist, metrics)
+        if hist.empty:
+            self.stderr.write("  ⚠️ No valid bars left to store")
+            return
+        if self.row_by_row:
+            created_count, updated_count = self._store_prices_row_by_row(
+                IndexPrice.objects, {'index': index}, hist
+            )
+            if metrics is not None:
+                metrics.add_rows(inserted=created_count, updated=updated_count)
+            self.stdout.write(f"  ✅ Prices: Added {created_count}, Updated {updated_count} records")
+            return
+
+        if self.price_stager is not None:
+            staged = stage_prices(self.price_stager, index, hist, metrics)
+            self.staged_symbols[index.pk] = index.name
+            self.stdout.write(f"  📥 Prices: Staged {staged} records")
+            return
+
+        result = upsert_index_prices(index, hist, batch_size=self.write_batch_size, metrics=metrics)
+        self.stdout.write(
+            f"  ✅ Prices: Added {result.created}, Updated {result.updated}, "
+            f"Unchanged {result.unchanged} records"
+        )
+
+    def _store_prices_row_by_row(self, manager, lookup, hist):
+        """Legacy storage path: one update_or_create per history row"""
+        # Reset index to make date a column
+        hist = unadjust_splits(hist.reset_index())
+        
+        # Store each day's data
+        created_count = 0
+        updated_count = 0
+        
+        for _, row in hist.iterrows():
+            date = row['Date'].date()  # Convert timestamp to date
             
-            for _, row in hist.iterrows():
-                date = row['Date'].date()  # Convert timestamp to date
-                
-                # Skip if any essential data is missing
-                if pd.isna(row['Open']) or pd.isna(row['Close']) or pd.isna(row['Volume']):
-                    continue
-                
-                # Create or update price record
-                price, created = StockPrice.objects.update_or_create(
-                    stock=stock,
-                    date=date,
-                    defaults={
-                        'open': row['Open'],
-                        'high': row['High'],
-                        'low': row['Low'],
-                        'close': row['Close'],
-                        'volume': int(row['Volume']),
-                        'adjusted_close': row['Close'] if 'Adj Close' not in row else row['Adj Close']
-                    }
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+            # Skip if any essential data is missing
+            if pd.isna(row['Open']) or pd.isna(row['Close']) or pd.isna(row['Volume']):
+                continue
             
-            self.stdout.write(f"  ✅ Prices: Added {created_count}, Updated {updated_count} records")
+            defaults = {
+                'open': row['Open'],
+                'high': row['High'],
+                'low': row['Low'],
+                'close': row['Close'],
+                'volume': int(row['Volume']),
+            }
             
-        except Exception as e:
-            self.stderr.write(f"  ⚠️ Could not load historical prices: {str(e)}")
+            # Create or update price record
+            price, created = manager.update_or_create(date=date, defaults=defaults, **lookup)
+            
+            if created:
+                created_count += 1
+            else:
+                updated_count += 1
+        
+        return created_count, updated_count
 
-    def _load_fundamentals(self, stock, yf_stock):
-        """Load fundamental financial data"""
+    def _load_fundamentals(self, stock, info):
+        """Load fundamental financial data from a Yahoo Finance info dict; returns an error message on failure"""
         try:
-            info = yf_stock.info
             today = datetime.now().date()
             
             # Extract fundamental metrics
@@ -572,9 +1342,11 @@ class Command(BaseCommand):
             
         except Exception as e:
             self.stderr.write(f"  ⚠️ Could not load fundamentals: {str(e)}")
+            return str(e)
+        return None
 
     def _calculate_technical_indicators(self, stock):
-        """Calculate and store technical indicators"""
+        """Calculate and store technical indicators; returns an error message on failure"""
         try:
             # Get price data ordered by date
             prices = StockPrice.objects.filter(stock=stock).order_by('date')
@@ -586,6 +1358,9 @@ class Command(BaseCommand):
             # Create a pandas DataFrame from price data
             df = pd.DataFrame(list(prices.values('date', 'open', 'high', 'low', 'close', 'volume')))
             
+            # Split and dividend adjusted, as in the panel pass, so corporate actions are not price moves
+            df = adjust_prices(df.assign(stock_id=stock.pk)).drop(columns='stock_id')
+            
             # Calculate indicators
             # RSI - 14 day
             delta = df['close'].diff()
@@ -655,4 +1430,6 @@ class Command(BaseCommand):
             self.stdout.write(f"  ✅ Technical indicators: Added {created_count}, Updated {updated_count} records")
             
         except Exception as e:
-            self.stderr.write(f"  ⚠️ Could not calculate technical indicators: {str(e)}")
\ No newline at end of file
+            self.stderr.write(f"  ⚠️ Could not calculate technical indicators: {str(e)}")
+            return str(e)
+        return None
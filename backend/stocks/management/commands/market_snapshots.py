@@ -0,0 +1,53 @@
+"""
+Per trading day breadth and performance snapshots of the market, sectors and indices.
+
+The stock loader refreshes the latest days after loading prices; use this
+command to fill the history or to recompute a period.
+
+Examples:
+    # Days since the latest stored snapshot
+    python manage.py market_snapshots
+
+    # Every trading day with prices
+    python manage.py market_snapshots --rebuild
+
+    # A period
+    python manage.py market_snapshots --start 2024-01-01 --end 2024-06-30
+"""
+
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from stocks.models import StockPrice
+from stocks.services.market_snapshots import refresh_market_snapshots
+
+
+class Command(BaseCommand):
+    help = "Compute the daily market breadth and sector/index performance snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day to compute (YYYY-MM-DD; default: the latest stored snapshot)'
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day to compute (YYYY-MM-DD; default: the latest price date)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Compute every day from the first stored price'
+        )
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if options['rebuild']:
+            start = StockPrice.objects.aggregate(first=Min('date'))['first']
+
+        self.stdout.write("🔄 Computing market breadth snapshots...")
+        written = refresh_market_snapshots(start, end)
+        self.stdout.write(self.style.SUCCESS(f"✅ Stored {written} snapshots"))
+
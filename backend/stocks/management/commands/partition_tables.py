@@ -0,0 +1,135 @@
+"""
+Yearly partitions of the StockPrice and TechnicalIndicator tables (PostgreSQL).
+
+Examples:
+    # Show the partitions of both tables
+    python manage.py partition_tables
+
+    # One-time conversion of the existing tables (locks them while rows are copied)
+    python manage.py partition_tables --convert
+
+    # Create next year's partitions and split older history out of the default partition
+    # (run regularly; update_all_data.py does)
+    python manage.py partition_tables --ensure
+
+    # Move 2005 out of the live tables into the archive schema, and back
+    python manage.py partition_tables --detach 2005
+    python manage.py partition_tables --attach 2005
+"""
+
+from datetime import date
+from django.core.management.base import BaseCommand
+from stocks.services.partitioning import (
+    DEFAULT_ARCHIVE_SCHEMA, DEFAULT_YEARS_AHEAD, PARTITIONED_MODELS, attach_partition, convert_to_partitioned,
+    detach_partition, ensure_partitions, is_partitioned, list_partitions, partition_problem, partitioning_supported
+)
+
+
+class Command(BaseCommand):
+    help = "Convert, maintain and archive the yearly partitions of the price and indicator tables (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild unpartitioned tables as yearly range-partitioned tables'
+        )
+        action.add_argument(
+            '--ensure',
+            action='store_true',
+            help='Create the yearly partitions missing up to --years-ahead years from now, and one for every '
+                 'year with rows in the default partition'
+        )
+        action.add_argument(
+            '--detach',
+            type=int,
+            metavar='YEAR',
+            help='Detach the partitions of a year and move them to --archive-schema'
+        )
+        action.add_argument(
+            '--attach',
+            type=int,
+            metavar='YEAR',
+            help='Attach the archived partitions of a year again'
+        )
+        parser.add_argument(
+            '--tables',
+            choices=['all'] + list(PARTITIONED_MODELS),
+            default='all',
+            help='Tables to work on (default: all)'
+        )
+        parser.add_argument(
+            '--years-ahead',
+            type=int,
+            default=DEFAULT_YEARS_AHEAD,
+            help=f'Years past the current one to create partitions for (default: {DEFAULT_YEARS_AHEAD})'
+        )
+        parser.add_argument(
+            '--archive-schema',
+            type=str,
+            default=DEFAULT_ARCHIVE_SCHEMA,
+            help=f'Schema detached partitions are moved to; empty to leave them in place '
+                 f'(default: {DEFAULT_ARCHIVE_SCHEMA})'
+        )
+
+    def handle(self, *args, **options):
+        if not partitioning_supported():
+            self.stdout.write("⏭️ Table partitioning needs PostgreSQL; nothing to do")
+            return
+
+        tables = options['tables']
+        models = PARTITIONED_MODELS.values() if tables == 'all' else [PARTITIONED_MODELS[tables]]
+        archive_schema = options['archive_schema'] or None
+
+        # Detach or attach a year on every table or on none, so the tables stay consistent
+        year = options['detach'] or options['attach']
+        if year:
+            problems = [
+                partition_problem(model, year, bool(options['detach']), archive_schema)
+                for model in models if is_partitioned(model)
+            ]
+            problems = [problem for problem in problems if problem]
+            if problems:
+                for problem in problems:
+                    self.stderr.write(f"❌ {problem}")
+                self.stderr.write("   Nothing was changed; pick the tables with --tables")
+                return
+
+        for model in models:
+            table = model._meta.db_table
+            partitioned = is_partitioned(model)
+
+            if options['convert']:
+                if partitioned:
+                    self.stdout.write(f"⏭️ {table} is already partitioned")
+                    continue
+                self.stdout.write(f"🔄 Partitioning {table} by year...")
+                copied = convert_to_partitioned(model, years_ahead=options['years_ahead'])
+                self.stdout.write(self.style.SUCCESS(f"  ✅ Copied {copied} rows into yearly partitions"))
+                partitioned = True
+            elif not partitioned:
+                self.stdout.write(f"⏭️ {table} is not partitioned (run with --convert first)")
+                continue
+            elif options['ensure']:
+                created = ensure_partitions(model, date.today().year + options['years_ahead'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {table}: created {', '.join(created)}" if created else f"✅ {table}: partitions up to date"
+                ))
+            elif options['detach']:
+                name = detach_partition(model, options['detach'], archive_schema)
+                self.stdout.write(self.style.SUCCESS(f"✅ Detached {options['detach']} of {table} as {name}"))
+            elif options['attach']:
+                name = attach_partition(model, options['attach'], archive_schema)
+                self.stdout.write(self.style.SUCCESS(f"✅ Attached {name} to {table}"))
+
+            self._show_partitions(model)
+
+    def _show_partitions(self, model):
+        partitions = list_partitions(model)
+        self.stdout.write(f"\n📊 {model._meta.db_table}: {len(partitions)} partitions")
+        for partition in partitions:
+            label = partition.year or 'default'
+            self.stdout.write(
+                f"  {label:<8} {partition.name:<40} ~{partition.rows:>12,} rows  {partition.size / 2 ** 20:>9.1f} MB"
+            )
@@ -9,6 +9,7 @@ from stocks.models import (
     Portfolio, PortfolioHolding, Stock, StockPrice,
     PortfolioTransaction, User
 )
+from stocks.services.run_telemetry import RunTelemetry
 
 
 class Command(BaseCommand):
@@ -31,6 +32,11 @@ class Command(BaseCommand):
             type=str,
             help='Calculate performance for a specific portfolio UUID only'
         )
+        parser.add_argument(
+            '--no-report',
+            action='store_true',
+            help='Do not write the JSON-lines run report (see the ingest_report command)'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
@@ -81,7 +87,8 @@ class Command(BaseCommand):
             current_date += timedelta(days=1)
         
         # Process each portfolio
-        for portfolio in portfolios:
+        telemetry = RunTelemetry('portfolio_performance', options, enabled=not options.get('no_report'))
+        for portfolio in telemetry.track('portfolio', portfolios, symbol=lambda portfolio: str(portfolio.id)):
             self.stdout.write(f"\n💼 Analyzing portfolio: {portfolio.name} (Owner: {portfolio.user.username})")
             
             # Get all transactions for this portfolio
@@ -273,4 +280,5 @@ class Command(BaseCommand):
                 for holding in bottom_performers:
                     self.stdout.write(f"      {holding['symbol']}: {holding['pl_percent']:.2f}%")
         
+        telemetry.close()
         self.stdout.write(self.style.SUCCESS("\n✅ Portfolio performance analysis completed!"))
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Rebuild the weekly and monthly OHLCV rollups of stocks and indices.
+
+Ingestion rebuilds the candles of the periods it loads prices for; this
+command fills them for whole histories, e.g. after the tables are first
+created or after prices were changed outside the loader.
+
+Examples:
+    # Every candle of every stock and index
+    python manage.py price_rollups
+
+    # A single stock
+    python manage.py price_rollups --symbol THYAO
+
+    # Only the periods from a date on
+    python manage.py price_rollups --since 2024-01-01
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from stocks.models import Stock
+from stocks.services.price_rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the weekly and monthly price candles read by long-range charts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Only rebuild this stock'
+        )
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='Only rebuild the periods from this date (YYYY-MM-DD) on'
+        )
+        parser.add_argument(
+            '--skip-indices',
+            action='store_true',
+            help='Do not rebuild index candles'
+        )
+
+    def handle(self, *args, **options):
+        stock_ids = None
+        if options['symbol']:
+            stock_ids = list(Stock.objects.filter(symbol=options['symbol']).values_list('id', flat=True))
+            if not stock_ids:
+                self.stderr.write(f"❌ Stock with symbol '{options['symbol']}' not found.")
+                return
+
+        self.stdout.write("🔄 Rebuilding stock candles...")
+        written = refresh_rollups('stock', stock_ids, options['since'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written} weekly and monthly stock candles"))
+
+        if options['symbol'] or options['skip_indices']:
+            return
+        self.stdout.write("🔄 Rebuilding index candles...")
+        written = refresh_rollups('index', since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written} weekly and monthly index candles"))
@@ -0,0 +1,50 @@
+"""
+Rebuild the latest-quote snapshots of stocks and indices.
+
+Ingestion refreshes the quotes of the symbols it loads; this command fills
+them for every stock and index, e.g. after the tables are first created or
+after prices were changed outside the loader.
+
+Examples:
+    # All stocks and indices
+    python manage.py refresh_quotes
+
+    # A single stock
+    python manage.py refresh_quotes --symbol THYAO
+"""
+
+from django.core.management.base import BaseCommand
+from stocks.models import Stock
+from stocks.services.quotes import refresh_index_quotes, refresh_stock_quotes
+
+
+class Command(BaseCommand):
+    help = "Rebuild the latest-quote snapshots read by the dashboard, watchlist and portfolio endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Only refresh this stock'
+        )
+        parser.add_argument(
+            '--skip-indices',
+            action='store_true',
+            help='Do not refresh index quotes'
+        )
+
+    def handle(self, *args, **options):
+        stock_ids = None
+        if options['symbol']:
+            stock_ids = list(Stock.objects.filter(symbol=options['symbol']).values_list('id', flat=True))
+            if not stock_ids:
+                self.stderr.write(f"❌ Stock with symbol '{options['symbol']}' not found.")
+                return
+
+        self.stdout.write("🔄 Refreshing stock quotes...")
+        self.stdout.write(self.style.SUCCESS(f"✅ Refreshed {refresh_stock_quotes(stock_ids)} stock quotes"))
+
+        if options['symbol'] or options['skip_indices']:
+            return
+        self.stdout.write("🔄 Refreshing index quotes...")
+        self.stdout.write(self.style.SUCCESS(f"✅ Refreshed {refresh_index_quotes()} index quotes"))
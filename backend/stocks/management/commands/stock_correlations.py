@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.db.models import Min, Max
 from stocks.models import Stock, StockPrice, Index, SystemSetting
+from stocks.services.run_telemetry import RunTelemetry
+from stocks.services.corporate_actions import adjust_prices, load_adjustment_factors
 
 
 class Command(BaseCommand):
@@ -34,6 +36,11 @@ class Command(BaseCommand):
             type=str,
             help='Optional path to save correlation matrix as CSV'
         )
+        parser.add_argument(
+            '--no-report',
+            action='store_true',
+            help='Do not write the JSON-lines run report (see the ingest_report command)'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
@@ -63,11 +70,13 @@ class Command(BaseCommand):
         start_date = end_date - timedelta(days=days)
         
         self.stdout.write(f"📅 Analyzing price correlations from {start_date} to {end_date}")
+        telemetry = RunTelemetry('stock_correlations', options, enabled=not options.get('no_report'))
         
-        # Collect closing prices for each stock
+        # Collect split and dividend adjusted closing prices for each stock
         stock_prices = {}
+        factors = load_adjustment_factors()
         
-        for stock in stocks:
+        for stock in telemetry.track('stock', stocks, symbol=lambda stock: stock.symbol, phase='db'):
             # Get all prices for this stock in the date range
             prices = StockPrice.objects.filter(
                 stock=stock,
@@ -80,13 +89,17 @@ class Command(BaseCommand):
                 continue
             
             # Add to our dictionary
+            closes = adjust_prices(pd.DataFrame.from_records(
+                list(prices.values_list('stock_id', 'date', 'close')), columns=['stock_id', 'date', 'close']
+            ), factors)
             stock_prices[stock.symbol] = {
-                price.date.isoformat(): float(price.close)
-                for price in prices
+                day.isoformat(): float(close)
+                for day, close in zip(closes['date'], closes['close'])
             }
         
         if len(stock_prices) < 2:
             self.stderr.write(f"❌ Not enough stocks with sufficient price data to calculate correlations.")
+            telemetry.close('failed')
             return
         
         self.stdout.write(f"📈 Calculating correlations for {len(stock_prices)} stocks")
@@ -106,7 +119,8 @@ class Command(BaseCommand):
             df[symbol] = pd.Series(prices)
         
         # Calculate correlation matrix
-        correlation_matrix = df.corr(min_periods=min_pairs)
+        with telemetry.stage('correlate', stocks=len(stock_prices)):
+            correlation_matrix = df.corr(min_periods=min_pairs)
         
         # Store results
         results = {}
@@ -205,4 +219,5 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stderr.write(f"❌ Error saving correlation matrix: {str(e)}")
         
+        telemetry.close()
         self.stdout.write(self.style.SUCCESS("\n✅ Correlation analysis completed!"))
\ No newline at end of file
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_date', models.DateField()),
+                ('ema_12', models.FloatField(blank=True, null=True)),
+                ('ema_26', models.FloatField(blank=True, null=True)),
+                ('macd_signal', models.FloatField(blank=True, null=True)),
+                ('window', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_state', to='stocks.stock')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0002_indicatorstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='index',
+            name='metadata_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='metadata_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:54
+
+from django.db import migrations, models
+
+
+# BRIN indexes on date: a few pages summarize millions of rows appended in date order
+BRIN_INDEXES = [
+    ('stocks_stockprice', 'stockprice_date_brin'),
+    ('stocks_technicalindicator', 'technicalindicator_date_brin'),
+]
+
+
+def create_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, name in BRIN_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING brin ("date")')
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, name in BRIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_ingest_ledger'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stockprice',
+            name='stocks_stoc_stock_i_86bebf_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stockprice',
+            index=models.Index(fields=['stock', '-date'], include=('id', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume'), name='stockprice_latest_bar_idx'),
+        ),
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
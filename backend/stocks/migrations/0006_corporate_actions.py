@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_price_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorporateAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action_type', models.CharField(choices=[('split', 'Split'), ('dividend', 'Dividend')], max_length=10)),
+                ('value', models.DecimalField(decimal_places=6, max_digits=16)),
+                ('factor', models.FloatField()),
+                ('price_factor', models.FloatField(default=1.0)),
+                ('volume_factor', models.FloatField(default=1.0)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='corporate_actions', to='stocks.stock')),
+            ],
+            options={
+                'unique_together': {('stock', 'date', 'action_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0006_corporate_actions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(max_length=10)),
+                ('symbol', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('reasons', models.CharField(max_length=200)),
+                ('values', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quarantined_prices', to='stocks.ingestrun')),
+            ],
+            options={
+                'unique_together': {('item_type', 'symbol', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0007_quarantined_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexQuote',
+            fields=[
+                ('date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('volume', models.BigIntegerField()),
+                ('previous_close', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('change', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('change_percent', models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('index', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quote', serialize=False, to='stocks.index')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StockQuote',
+            fields=[
+                ('date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('volume', models.BigIntegerField()),
+                ('previous_close', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('change', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('change_percent', models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quote', serialize=False, to='stocks.stock')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
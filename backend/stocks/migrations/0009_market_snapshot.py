@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_quotes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('market', 'Market'), ('sector', 'Sector'), ('index', 'Index')], max_length=10)),
+                ('name', models.CharField(blank=True, default='', max_length=50)),
+                ('date', models.DateField()),
+                ('members', models.IntegerField(default=0)),
+                ('advancing', models.IntegerField(default=0)),
+                ('declining', models.IntegerField(default=0)),
+                ('unchanged', models.IntegerField(default=0)),
+                ('new_highs', models.IntegerField(default=0)),
+                ('new_lows', models.IntegerField(default=0)),
+                ('up_volume', models.BigIntegerField(default=0)),
+                ('down_volume', models.BigIntegerField(default=0)),
+                ('equal_weighted_change', models.FloatField(blank=True, null=True)),
+                ('cap_weighted_change', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('scope', 'name', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_market_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexPriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('1w', 'Weekly'), ('1mo', 'Monthly')], max_length=3)),
+                ('date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('volume', models.BigIntegerField()),
+                ('bars', models.IntegerField()),
+                ('index', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='stocks.index')),
+            ],
+            options={
+                'unique_together': {('index', 'interval', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StockPriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('1w', 'Weekly'), ('1mo', 'Monthly')], max_length=3)),
+                ('date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('volume', models.BigIntegerField()),
+                ('bars', models.IntegerField()),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='stocks.stock')),
+            ],
+            options={
+                'unique_together': {('stock', 'interval', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+def mark_adjusted_histories(apps, schema_editor):
+    # Prices stored before 0006 are Yahoo's split and dividend adjusted bars; the loader
+    # refetches these stocks' whole history as traded, with their corporate actions
+    Stock = apps.get_model('stocks', 'Stock')
+    StockPrice = apps.get_model('stocks', 'StockPrice')
+    Stock.objects.filter(
+        id__in=StockPrice.objects.values('stock_id').distinct()
+    ).update(prices_as_traded=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0010_price_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='prices_as_traded',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(mark_adjusted_histories, migrations.RunPython.noop),
+    ]
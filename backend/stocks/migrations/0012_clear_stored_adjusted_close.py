@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:07
+
+from django.db import migrations
+
+
+def clear_adjusted_close(apps, schema_editor):
+    # Yahoo's 'Adj Close' as of each fetch went stale with every later split or dividend;
+    # adjusted prices are computed from the CorporateAction factors when read
+    StockPrice = apps.get_model('stocks', 'StockPrice')
+    StockPrice.objects.filter(adjusted_close__isnull=False).update(adjusted_close=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0011_stock_prices_as_traded'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_adjusted_close, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0012_clear_stored_adjusted_close'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='technicalindicator',
+            index=models.Index(fields=['stock', '-date'], name='technicalindicator_latest_idx'),
+        ),
+    ]
@@ -18,6 +18,7 @@ class Index(models.Model):
     display_name = models.CharField(max_length=100, default="")
     description = models.TextField(blank=True, null=True)
     region = models.CharField(max_length=50, blank=True, null=True)
+    metadata_updated_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, null=True)
     
@@ -48,6 +49,10 @@ class Stock(models.Model):
     currency = models.CharField(max_length=10, blank=True, null=True)
     is_active = models.BooleanField(default=True)
     indices = models.ManyToManyField(Index, through='StockIndex', related_name='stocks')
+    metadata_updated_at = models.DateTimeField(blank=True, null=True)
+    # False while stored prices are still Yahoo's adjusted bars from before corporate actions were
+    # kept; the loader then refetches the whole stored history as traded
+    prices_as_traded = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, null=True)
     
@@ -71,19 +76,49 @@ class StockPrice(models.Model):
     high = models.DecimalField(max_digits=12, decimal_places=4)
     low = models.DecimalField(max_digits=12, decimal_places=4)
     close = models.DecimalField(max_digits=12, decimal_places=4)
+    # No longer written: adjusted prices are computed from CorporateAction factors when read
     adjusted_close = models.DecimalField(max_digits=12, decimal_places=4, blank=True, null=True)
     volume = models.BigIntegerField()
     
     class Meta:
         unique_together = ('stock', 'date')
         indexes = [
-            models.Index(fields=['stock', 'date']),
+            # Latest-bar lookups per stock read the whole row from the index (PostgreSQL)
+            models.Index(
+                fields=['stock', '-date'], name='stockprice_latest_bar_idx',
+                include=['id', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume'],
+            ),
         ]
     
     def __str__(self):
         return f"{self.stock.symbol} - {self.date} - {self.close}"
 
 
+class CorporateAction(models.Model):
+    # Splits and cash dividends; stored prices are as traded and adjusted at read time with these factors
+    ACTION_TYPES = [
+        ('split', 'Split'),
+        ('dividend', 'Dividend'),
+    ]
+    
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='corporate_actions')
+    date = models.DateField()  # Ex-date
+    action_type = models.CharField(max_length=10, choices=ACTION_TYPES)
+    # New shares per old share for splits, cash per share for dividends
+    value = models.DecimalField(max_digits=16, decimal_places=6)
+    # Price factor of this action for bars before its date
+    factor = models.FloatField()
+    # Products over this and all later actions of the stock, applied to bars before the date
+    price_factor = models.FloatField(default=1.0)
+    volume_factor = models.FloatField(default=1.0)
+    
+    class Meta:
+        unique_together = ('stock', 'date', 'action_type')
+    
+    def __str__(self):
+        return f"{self.stock.symbol} - {self.date} - {self.action_type} {self.value}"
+
+
 class IndexPrice(models.Model):
     index = models.ForeignKey(Index, on_delete=models.CASCADE, related_name='prices')
     date = models.DateField()
@@ -100,6 +135,111 @@ class IndexPrice(models.Model):
         return f"{self.index.name} - {self.date} - {self.close}"
 
 
+class PriceRollup(models.Model):
+    # Weekly or monthly candle of the daily bars, on the split and dividend basis of its last bar
+    INTERVALS = [
+        ('1w', 'Weekly'),
+        ('1mo', 'Monthly'),
+    ]
+    
+    interval = models.CharField(max_length=3, choices=INTERVALS)
+    date = models.DateField()  # First day of the week (Monday) or month
+    last_date = models.DateField()  # Date of the period's last bar
+    open = models.DecimalField(max_digits=12, decimal_places=4)
+    high = models.DecimalField(max_digits=12, decimal_places=4)
+    low = models.DecimalField(max_digits=12, decimal_places=4)
+    close = models.DecimalField(max_digits=12, decimal_places=4)
+    volume = models.BigIntegerField()
+    bars = models.IntegerField()  # Daily bars in the period
+    
+    class Meta:
+        abstract = True
+
+
+class StockPriceRollup(PriceRollup):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='price_rollups')
+    
+    class Meta:
+        unique_together = ('stock', 'interval', 'date')
+    
+    def __str__(self):
+        return f"{self.stock_id} - {self.interval} {self.date} - {self.close}"
+
+
+class IndexPriceRollup(PriceRollup):
+    index = models.ForeignKey(Index, on_delete=models.CASCADE, related_name='price_rollups')
+    
+    class Meta:
+        unique_together = ('index', 'interval', 'date')
+    
+    def __str__(self):
+        return f"{self.index_id} - {self.interval} {self.date} - {self.close}"
+
+
+class Quote(models.Model):
+    # Latest bar and change against the previous one, maintained by ingestion for read paths
+    date = models.DateField()
+    open = models.DecimalField(max_digits=12, decimal_places=4)
+    high = models.DecimalField(max_digits=12, decimal_places=4)
+    low = models.DecimalField(max_digits=12, decimal_places=4)
+    close = models.DecimalField(max_digits=12, decimal_places=4)
+    volume = models.BigIntegerField()
+    # Previous bar's close on the latest bar's split and dividend basis
+    previous_close = models.DecimalField(max_digits=12, decimal_places=4, blank=True, null=True)
+    change = models.DecimalField(max_digits=12, decimal_places=4, blank=True, null=True)
+    change_percent = models.DecimalField(max_digits=10, decimal_places=4, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+
+
+class StockQuote(Quote):
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, primary_key=True, related_name='quote')
+    
+    def __str__(self):
+        return f"{self.stock_id} - {self.date} - {self.close}"
+
+
+class IndexQuote(Quote):
+    index = models.OneToOneField(Index, on_delete=models.CASCADE, primary_key=True, related_name='quote')
+    
+    def __str__(self):
+        return f"{self.index_id} - {self.date} - {self.close}"
+
+
+class MarketSnapshot(models.Model):
+    # Breadth and performance of the whole market, a sector or an index on one trading day
+    SCOPES = [
+        ('market', 'Market'),
+        ('sector', 'Sector'),
+        ('index', 'Index'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPES)
+    name = models.CharField(max_length=50, blank=True, default='')  # Sector or index name, empty for the market
+    date = models.DateField()
+    members = models.IntegerField(default=0)  # Stocks with a change on this day
+    advancing = models.IntegerField(default=0)
+    declining = models.IntegerField(default=0)
+    unchanged = models.IntegerField(default=0)
+    new_highs = models.IntegerField(default=0)  # 52-week highs
+    new_lows = models.IntegerField(default=0)
+    up_volume = models.BigIntegerField(default=0)
+    down_volume = models.BigIntegerField(default=0)
+    # Percent changes; cap-weighted is null when no member has a market cap
+    equal_weighted_change = models.FloatField(blank=True, null=True)
+    cap_weighted_change = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        # Also the index for history range reads of one scope and name
+        unique_together = ('scope', 'name', 'date')
+    
+    def __str__(self):
+        return f"{self.scope} {self.name} - {self.date}"
+
+
 class StockFundamental(models.Model):
     stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name='fundamentals')
     date = models.DateField()
@@ -196,11 +336,90 @@ class TechnicalIndicator(models.Model):
     
     class Meta:
         unique_together = ('stock', 'date')
+        indexes = [
+            # Latest and recent indicator rows per stock, newest first like stockprice_latest_bar_idx
+            models.Index(fields=['stock', '-date'], name='technicalindicator_latest_idx'),
+        ]
     
     def __str__(self):
         return f"{self.stock.symbol} - {self.date} - Technical Indicators"
 
 
+class IndicatorState(models.Model):
+    # Carry state of the last indicator run, so later runs only process new bars
+    stock = models.OneToOneField(Stock, on_delete=models.CASCADE, related_name='indicator_state')
+    last_date = models.DateField()
+    ema_12 = models.FloatField(blank=True, null=True)
+    ema_26 = models.FloatField(blank=True, null=True)
+    macd_signal = models.FloatField(blank=True, null=True)
+    # Trailing bars ({'close': [...], 'high': [...], 'low': [...]}) for the rolling windows
+    window = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    def __str__(self):
+        return f"{self.stock.symbol} - Indicator state at {self.last_date}"
+
+
+class IngestRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    command = models.CharField(max_length=100)
+    options = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.command} - {self.started_at} - {self.status}"
+
+
+class IngestJob(models.Model):
+    STATUS_CHOICES = [
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    run = models.ForeignKey(IngestRun, on_delete=models.CASCADE, related_name='jobs')
+    item_type = models.CharField(max_length=10)  # 'stock' or 'index'
+    symbol = models.CharField(max_length=50)
+    stage = models.CharField(max_length=20)  # 'prices', 'fundamentals' or 'technicals'
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('run', 'item_type', 'symbol', 'stage')
+    
+    def __str__(self):
+        return f"{self.item_type} {self.symbol} - {self.stage} - {self.status}"
+
+
+class QuarantinedPrice(models.Model):
+    # Fetched bars rejected by price validation, kept with the reasons instead of being stored
+    item_type = models.CharField(max_length=10)  # 'stock' or 'index'
+    symbol = models.CharField(max_length=50)
+    date = models.DateField()
+    reasons = models.CharField(max_length=200)  # Comma separated rule names
+    values = models.JSONField(default=dict)  # The rejected bar's open, high, low, close and volume
+    run = models.ForeignKey(IngestRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='quarantined_prices')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('item_type', 'symbol', 'date')
+    
+    def __str__(self):
+        return f"{self.symbol} - {self.date} - {self.reasons}"
+
+
 class News(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from ..models import Portfolio, PortfolioTransaction, PortfolioHolding
+from ..services.quotes import quote_of
 from decimal import Decimal
 
 class PortfolioSerializer(serializers.ModelSerializer):
@@ -50,33 +51,29 @@ class PortfolioHoldingSerializer(serializers.ModelSerializer):
         }
     
     def get_current_price(self, obj):
-        from ..models import StockPrice
-        latest_price = StockPrice.objects.filter(stock=obj.stock).order_by('-date').first()
-        if latest_price:
-            return float(latest_price.close)
+        quote = quote_of(obj.stock)
+        if quote:
+            return float(quote.close)
         return None
     
     def get_market_value(self, obj):
-        from ..models import StockPrice
-        latest_price = StockPrice.objects.filter(stock=obj.stock).order_by('-date').first()
-        if latest_price:
-            return float(obj.quantity * latest_price.close)
+        quote = quote_of(obj.stock)
+        if quote:
+            return float(obj.quantity * quote.close)
         return None
     
     def get_profit_loss(self, obj):
-        from ..models import StockPrice
-        latest_price = StockPrice.objects.filter(stock=obj.stock).order_by('-date').first()
-        if latest_price:
+        quote = quote_of(obj.stock)
+        if quote:
             cost_basis = obj.quantity * obj.average_cost
-            market_value = obj.quantity * latest_price.close
+            market_value = obj.quantity * quote.close
             return float(market_value - cost_basis)
         return None
     
     def get_profit_loss_percent(self, obj):
-        from ..models import StockPrice
-        latest_price = StockPrice.objects.filter(stock=obj.stock).order_by('-date').first()
-        if latest_price and obj.average_cost > 0:
-            return float((latest_price.close - obj.average_cost) / obj.average_cost * 100)
+        quote = quote_of(obj.stock)
+        if quote and obj.average_cost > 0:
+            return float((quote.close - obj.average_cost) / obj.average_cost * 100)
         return None
 
 
@@ -0,0 +1,162 @@
+"""
+Fast read-only serializers for bulk time-series rows.
+
+ModelSerializer builds a model instance per row and sends every value
+through a DRF field object. For thousands of bars that dominates the
+request, so the bulk endpoints use these instead: rows are read with
+values_list, skipping the ORM's per-value conversion (or taken from a price
+frame), each column is converted at once by a converter compiled from the
+model field, and the rows are zipped back into the dicts the matching
+ModelSerializer would produce.
+
+    StockPriceRowSerializer      same output as StockPriceSerializer
+    StockTechnicalRowSerializer  same output as StockTechnicalSerializer
+
+``manage.py benchmark_serializers`` compares the per-row cost of both.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models
+
+from ..models import StockPrice, TechnicalIndicator
+
+
+class SeriesSerializer:
+    """
+    Serialize a QuerySet or DataFrame of ``model`` rows to a list of dicts.
+
+    Subclasses set ``model`` and ``fields`` (all concrete fields when
+    '__all__'); ``fields`` passed to the constructor picks a subset, kept in
+    the order given.
+    """
+    model = None
+    fields = '__all__'
+
+    def __init__(self, instance, fields=None):
+        self.instance = instance
+        converters = self.converters()
+        if fields:
+            self.field_names = [name for name in dict.fromkeys(fields) if name in converters]
+        else:
+            self.field_names = list(converters)
+
+    @classmethod
+    def converters(cls):
+        """Field name to (values_list column, raw database column converter, frame column converter)"""
+        if '_converters' not in cls.__dict__:
+            if cls.fields == '__all__':
+                model_fields = cls.model._meta.concrete_fields
+            else:
+                model_fields = [cls.model._meta.get_field(name) for name in cls.fields]
+            cls._converters = {field.name: _compile(field) for field in model_fields}
+        return cls._converters
+
+    @property
+    def data(self):
+        converters = self.converters()
+        if isinstance(self.instance, pd.DataFrame):
+            columns = [converters[name][2](self.instance[name]) for name in self.field_names]
+        else:
+            raw = list(zip(*_fetch_raw(self.instance, [converters[name][0] for name in self.field_names])))
+            raw = raw or [()] * len(self.field_names)
+            columns = [converters[name][1](values) for name, values in zip(self.field_names, raw)]
+        names = self.field_names
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+class StockPriceRowSerializer(SeriesSerializer):
+    model = StockPrice
+    fields = ['date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume']
+
+
+class StockTechnicalRowSerializer(SeriesSerializer):
+    model = TechnicalIndicator
+
+
+# Internals
+
+def _fetch_raw(queryset, columns):
+    """Rows of a values_list query as the database driver returns them"""
+    try:
+        sql, params = queryset.values_list(*columns).query.sql_with_params()
+    except EmptyResultSet:
+        return []
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _compile(field):
+    """Converters of one model field, matching the DRF field a ModelSerializer would use"""
+    column = field.attname
+    if isinstance(field, models.DecimalField):
+        return column, _decimal_values(field.decimal_places), _decimal_frame(field.decimal_places)
+    if isinstance(field, models.DateField) and not isinstance(field, models.DateTimeField):
+        return column, _date_values, _date_frame
+    if isinstance(field, models.IntegerField):
+        return column, list, _integer_frame
+    return column, _python_values(field), lambda values: values.tolist()
+
+
+def _decimal_values(places):
+    # DRF's DecimalField: quantized with ROUND_HALF_UP, rendered without exponent. SQLite
+    # returns floats (or ints for whole values) already rounded to the column's places
+    template = f'%.{places}f'
+    quantum = Decimal(1).scaleb(-places)
+
+    def convert(values):
+        return [
+            None if value is None
+            else template % value if isinstance(value, (float, int))
+            else format(Decimal(value).quantize(quantum, ROUND_HALF_UP), 'f')
+            for value in values
+        ]
+    return convert
+
+
+def _decimal_frame(places):
+    template = f'%.{places}f'
+
+    def convert(values):
+        numbers = values.to_numpy(dtype='float64', na_value=np.nan)
+        return _with_nulls(np.char.mod(template, numbers).tolist(), np.isnan(numbers))
+    return convert
+
+
+def _date_values(values):
+    # SQLite returns ISO strings, other backends dates
+    return [value if value is None or isinstance(value, str) else value.isoformat() for value in values]
+
+
+def _python_values(field):
+    # Other fields (e.g. the stock's UUID) go through to_python once per distinct value
+    to_python = (field.target_field if field.is_relation else field).to_python
+
+    def convert(values):
+        converted = {}
+        return [
+            converted[value] if value in converted else converted.setdefault(value, to_python(value))
+            for value in values
+        ]
+    return convert
+
+
+def _date_frame(values):
+    days = pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+    return _with_nulls(np.datetime_as_string(days).tolist(), np.isnat(days))
+
+
+def _integer_frame(values):
+    numbers = values.to_numpy(dtype='float64', na_value=np.nan)
+    missing = np.isnan(numbers)
+    return _with_nulls(np.round(np.where(missing, 0, numbers)).astype('int64').tolist(), missing)
+
+
+def _with_nulls(values, missing):
+    for position in np.flatnonzero(missing):
+        values[position] = None
+    return values
@@ -1,7 +1,8 @@
 from rest_framework import serializers
-from ..models import Stock, StockPrice, StockFundamental, TechnicalIndicator
+from ..models import Stock, StockPrice, StockQuote, StockFundamental, TechnicalIndicator
 from .sector_serializers import SectorSerializer
 from .index_serializers import IndexSerializer  # bu yeterli
+from ..services.quotes import quote_of
 
 class StockListSerializer(serializers.ModelSerializer):
     sector_name = serializers.CharField(source='sector.display_name', read_only=True, allow_null=True)
@@ -17,6 +18,15 @@ class StockPriceSerializer(serializers.ModelSerializer):
         fields = ['date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume']
 
 
+class StockQuotePriceSerializer(serializers.ModelSerializer):
+    # The latest bar in the shape of StockPriceSerializer; adjustments are relative to it
+    adjusted_close = serializers.DecimalField(source='close', max_digits=12, decimal_places=4, read_only=True)
+
+    class Meta:
+        model = StockQuote
+        fields = ['date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume']
+
+
 class StockDetailSerializer(serializers.ModelSerializer):
     sector = SectorSerializer(read_only=True)
     indices = IndexSerializer(many=True, read_only=True)
@@ -34,21 +44,21 @@ class StockDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_latest_price(self, obj):
-        latest_price = obj.prices.order_by('-date').first()
-        if latest_price:
-            return StockPriceSerializer(latest_price).data
+        quote = quote_of(obj)
+        if quote:
+            return StockQuotePriceSerializer(quote).data
         return None
 
     def get_price_change(self, obj):
-        prices = obj.prices.order_by('-date')[:2]
-        if len(prices) >= 2:
-            return float(prices[0].close - prices[1].close)
+        quote = quote_of(obj)
+        if quote and quote.change is not None:
+            return float(quote.change)
         return None
 
     def get_price_change_percent(self, obj):
-        prices = obj.prices.order_by('-date')[:2]
-        if len(prices) >= 2 and prices[1].close > 0:
-            return float((prices[0].close - prices[1].close) / prices[1].close * 100)
+        quote = quote_of(obj)
+        if quote and quote.change_percent is not None:
+            return float(quote.change_percent)
         return None
 
     def get_fundamentals(self, obj):
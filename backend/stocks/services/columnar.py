@@ -0,0 +1,84 @@
+"""
+Columnar layout of time series for compact API responses.
+
+A series of N rows becomes one array of N values per field instead of N
+objects repeating every key: dates as epoch days (days since 1970-01-01),
+prices and indicators as floats and missing values as null. The renderers
+in stocks/api/renderers.py encode it as JSON, MessagePack or Arrow IPC.
+
+    rows     [{"date": "2024-01-02", "close": "10.5000"}, ...]
+    columns  {"date": [19724, ...], "close": [10.5, ...]}
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+EPOCH = date(1970, 1, 1)
+
+DATE_FIELDS = {'date'}
+
+# Fields that stay integers instead of becoming floats
+INTEGER_FIELDS = {'volume'}
+
+
+def epoch_days(values):
+    """Days since 1970-01-01 of dates, datetimes or ISO date strings"""
+    days = pd.to_datetime(pd.Series(values), errors='coerce').to_numpy().astype('datetime64[D]')
+    return _nullable(days.astype('int64'), np.isnat(days))
+
+
+def float_column(values):
+    """Floats of numbers, Decimals or numeric strings; NaN and None become None"""
+    numbers = pd.to_numeric(pd.Series(values, dtype='object'), errors='coerce').to_numpy(dtype='float64')
+    return _nullable(numbers, np.isnan(numbers))
+
+
+def integer_column(values):
+    """Rounded integers of numeric values; NaN and None become None"""
+    numbers = pd.to_numeric(pd.Series(values, dtype='object'), errors='coerce').to_numpy(dtype='float64')
+    missing = np.isnan(numbers)
+    return _nullable(np.round(np.where(missing, 0, numbers)).astype('int64'), missing)
+
+
+def convert_column(name, values):
+    """One field's values in the columnar encoding for its name"""
+    if name in DATE_FIELDS:
+        return epoch_days(values)
+    if name in INTEGER_FIELDS:
+        return integer_column(values)
+    return float_column(values)
+
+
+def frame_columns(frame, fields=None):
+    """Columns of a DataFrame (``fields`` in order, all by default)"""
+    fields = list(frame.columns) if fields is None else fields
+    return {name: convert_column(name, frame[name]) for name in fields}
+
+
+def record_columns(records, fields=None, passthrough=()):
+    """
+    Columns of a list of dicts (``fields`` in order, the first record's keys by default).
+
+    Fields in ``passthrough`` keep their values as they are, e.g. nested
+    lists that have no flat encoding.
+    """
+    if fields is None:
+        fields = list(records[0]) if records else []
+    columns = {}
+    for name in fields:
+        values = [record.get(name) for record in records]
+        columns[name] = values if name in passthrough else convert_column(name, values)
+    return columns
+
+
+# Internals
+
+def _nullable(values, missing):
+    values = values.tolist()
+    if missing.any():
+        for position in np.flatnonzero(missing):
+            values[position] = None
+    return values
@@ -0,0 +1,218 @@
+"""
+PostgreSQL COPY path for large backfills.
+
+Frames are streamed with ``COPY ... FROM STDIN`` into a temporary staging
+table shaped like the target, then merged with a single
+``INSERT ... SELECT ... ON CONFLICT DO UPDATE`` that leaves rows whose values
+did not change untouched. When the staged rows are large next to the target
+table, its secondary indexes (those not backing a constraint) are dropped
+for the merge and rebuilt once afterwards instead of being maintained row by
+row; the unique constraint the merge relies on always stays.
+
+Only PostgreSQL supports this path. Callers check ``copy_supported()`` and
+fall back to the ORM bulk upserts on other databases.
+"""
+
+import io
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from stocks.services.partitioning import index_definition
+
+
+# Rows per COPY data chunk, bounding the size of the CSV buffer
+COPY_CHUNK_ROWS = 50000
+
+# Rebuild secondary indexes when at least this many rows are staged per existing target row
+DEFAULT_INDEX_REBUILD_RATIO = 0.5
+
+INDEX_BUILD_MEMORY = '512MB'
+
+# Per owner (stock or index) outcome of a merge; first_written is the earliest inserted or changed date
+MergeResult = namedtuple('MergeResult', ['created', 'updated', 'unchanged', 'first_written'])
+
+
+def copy_supported(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'postgresql'
+
+
+def csv_chunks(frame, chunk_rows=COPY_CHUNK_ROWS):
+    """Yield a frame as CSV text (no header, empty field for NULL) in bounded chunks"""
+    for start in range(0, len(frame), chunk_rows):
+        buffer = io.StringIO()
+        frame.iloc[start:start + chunk_rows].to_csv(buffer, header=False, index=False, na_rep='')
+        yield buffer.getvalue()
+
+
+class CopyStager:
+    """
+    Staging table for one target model, keyed by (owner, date).
+
+    ``add()`` streams frames with columns [owner column, 'date', *fields]
+    into a temporary table on the current connection; ``merge()`` writes
+    everything staged so far to the target in one statement and empties the
+    staging table.
+    """
+
+    def __init__(self, model, owner_field, fields, using=DEFAULT_DB_ALIAS):
+        opts = model._meta
+        self.model = model
+        self.using = using
+        self.table = opts.db_table
+        self.staging_table = f'{opts.db_table}_staging'
+        self.owner_column = opts.get_field(owner_field).column
+        self.value_columns = [opts.get_field(field).column for field in fields]
+        self.columns = [self.owner_column, 'date'] + self.value_columns
+        self.staged = 0
+        self._table_created = False
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def add(self, frame):
+        """Stream rows into the staging table; returns the number of rows staged"""
+        if frame.empty:
+            return 0
+
+        quote = self.connection.ops.quote_name
+        copy_sql = (
+            f"COPY {quote(self.staging_table)} ({', '.join(quote(c) for c in self.columns)}) "
+            f"FROM STDIN WITH (FORMAT csv)"
+        )
+        with self.connection.cursor() as cursor:
+            self._create_table(cursor)
+            raw = cursor.cursor
+            if hasattr(raw, 'copy'):
+                # psycopg 3
+                with raw.copy(copy_sql) as copy:
+                    for chunk in csv_chunks(frame[self.columns]):
+                        copy.write(chunk)
+            else:
+                # psycopg2
+                for chunk in csv_chunks(frame[self.columns]):
+                    raw.copy_expert(copy_sql, io.StringIO(chunk))
+
+        self.staged += len(frame)
+        return len(frame)
+
+    def merge(self, rebuild_indexes=None):
+        """
+        Merge staged rows into the target table.
+
+        ``rebuild_indexes`` forces (True) or prevents (False) dropping and
+        rebuilding secondary indexes; by default it depends on the number of
+        staged rows relative to the table size. Returns {owner_id: MergeResult}.
+        """
+        if not self.staged:
+            return {}
+
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {self._q(self.owner_column)}, COUNT(DISTINCT date) "
+                f"FROM {self._q(self.staging_table)} GROUP BY 1"
+            )
+            staged = dict(cursor.fetchall())
+
+            if rebuild_indexes is None:
+                rebuild_indexes = self.staged >= DEFAULT_INDEX_REBUILD_RATIO * self._estimated_rows(cursor)
+            index_definitions = self._drop_secondary_indexes(cursor) if rebuild_indexes else []
+
+            cursor.execute(self.merge_sql())
+            merged = {owner: (created, updated, first) for owner, first, created, updated in cursor.fetchall()}
+
+            if index_definitions:
+                # The insert queued the deferred foreign key checks, and PostgreSQL will not build an
+                # index on a table with pending trigger events; run the checks now
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                cursor.execute(f"SET LOCAL maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+                for definition in index_definitions:
+                    cursor.execute(definition)
+
+            cursor.execute(f"TRUNCATE {self._q(self.staging_table)}")
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {self._q(self.table)}")
+        self.staged = 0
+
+        results = {}
+        for owner, count in staged.items():
+            created, updated, first_written = merged.get(owner, (0, 0, None))
+            results[owner] = MergeResult(created, updated, count - created - updated, first_written)
+        return results
+
+    def merge_sql(self):
+        """INSERT ... SELECT ... ON CONFLICT statement returning per-owner counts"""
+        q = self._q
+        owner, day = q(self.owner_column), q('date')
+        key = f"{owner}, {day}"
+        columns = ', '.join(q(c) for c in self.columns)
+        updates = ', '.join(f"{q(c)} = EXCLUDED.{q(c)}" for c in self.value_columns)
+        current = ', '.join(f"{q(self.table)}.{q(c)}" for c in self.value_columns)
+        incoming = ', '.join(f"EXCLUDED.{q(c)}" for c in self.value_columns)
+        # The last staged copy of a (owner, date) pair wins. Inserted and updated rows are told apart
+        # by the keys that existed before the insert (every part of the statement sees the same
+        # snapshot), as partitioned tables cannot return xmax
+        return (
+            f"WITH staged AS ("
+            f" SELECT DISTINCT ON ({key}) {columns} FROM {q(self.staging_table)} ORDER BY {key}, ctid DESC"
+            f"), existing AS ("
+            f" SELECT s.{owner}, s.{day} FROM staged s JOIN {q(self.table)} t"
+            f" ON t.{owner} = s.{owner} AND t.{day} = s.{day}"
+            f"), merged AS ("
+            f" INSERT INTO {q(self.table)} ({columns}) SELECT {columns} FROM staged"
+            f" ON CONFLICT ({key}) DO UPDATE SET {updates}"
+            f" WHERE ({current}) IS DISTINCT FROM ({incoming})"
+            f" RETURNING {key}"
+            f") "
+            f"SELECT m.{owner}, MIN(m.{day}), "
+            f"COUNT(*) FILTER (WHERE e.{day} IS NULL), COUNT(*) FILTER (WHERE e.{day} IS NOT NULL) "
+            f"FROM merged m LEFT JOIN existing e ON e.{owner} = m.{owner} AND e.{day} = m.{day} GROUP BY 1"
+        )
+
+    def close(self):
+        """Drop the staging table (it also disappears with the connection)"""
+        if self._table_created:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {self._q(self.staging_table)}")
+            self._table_created = False
+
+    # Internals
+
+    def _q(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def _create_table(self, cursor):
+        if self._table_created:
+            return
+        columns = ', '.join(self._q(c) for c in self.columns)
+        cursor.execute(f"DROP TABLE IF EXISTS {self._q(self.staging_table)}")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {self._q(self.staging_table)} AS "
+            f"SELECT {columns} FROM {self._q(self.table)} WITH NO DATA"
+        )
+        self._table_created = True
+
+    def _estimated_rows(self, cursor):
+        # A partitioned table has no rows of its own; count its partitions
+        cursor.execute(
+            "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0) FROM pg_class c "
+            "WHERE c.oid = %s::regclass OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)",
+            [self.table, self.table],
+        )
+        return cursor.fetchone()[0]
+
+    def _drop_secondary_indexes(self, cursor):
+        """Drop indexes that back neither the primary key nor a constraint; returns their definitions"""
+        cursor.execute(
+            "SELECT i.relname, pg_get_indexdef(i.oid) "
+            "FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+            "WHERE x.indrelid = %s::regclass AND NOT x.indisprimary "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)",
+            [self.table],
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {self._q(name)}")
+        return [index_definition(definition) for _, definition in indexes]
@@ -0,0 +1,238 @@
+"""
+Splits and dividends, and price adjustment at read time.
+
+Stored StockPrice bars are as traded. Yahoo Finance reports history
+adjusted for every split up to the request date, so fetched frames are
+un-adjusted with the splits they contain before they are stored, and the
+split and dividend events are kept in CorporateAction, one row per event.
+
+Every event has a price factor for the bars before its ex-date (1 / ratio
+for a split, 1 - dividend / previous close for a dividend) and carries the
+product of its own and all later factors of the stock. Adjusted bars are
+raw bars times the cumulative factors of the first event after them, looked
+up for whole frames at once, so a new split or dividend is a single new row
+instead of a rewrite of the stock's price history.
+"""
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from stocks.models import CorporateAction, IndicatorState, StockPrice
+
+
+SPLIT_COLUMN = 'Stock Splits'
+DIVIDEND_COLUMN = 'Dividends'
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# Decimal places of CorporateAction.value
+VALUE_DECIMALS = 6
+
+
+def later_split_ratio(splits):
+    """
+    Product of the split ratios strictly after each row of a date-ordered series.
+
+    Zero or missing ratios mean no split on that row.
+    """
+    ratios = splits.fillna(0).to_numpy(dtype='float64')
+    ratios = np.where(ratios > 0, ratios, 1.0)
+    # Reverse cumulative product, shifted so a split does not apply to its own ex-date
+    after = np.cumprod(ratios[::-1])[::-1]
+    return np.append(after[1:], 1.0)
+
+
+def unadjust_splits(frame):
+    """
+    Undo Yahoo's split adjustment on a history frame with a 'Date' column.
+
+    Prices and dividends are multiplied, and volumes divided, by the splits
+    after each bar; frames without splits are returned unchanged.
+    """
+    if SPLIT_COLUMN not in frame.columns or not (frame[SPLIT_COLUMN].fillna(0) > 0).any():
+        return frame
+
+    frame = frame.sort_values('Date', kind='stable')
+    ratio = later_split_ratio(frame[SPLIT_COLUMN])
+    frame = frame.copy()
+    for column in ('Open', 'High', 'Low', 'Close', DIVIDEND_COLUMN):
+        if column in frame.columns:
+            frame[column] = frame[column] * ratio
+    frame['Volume'] = (frame['Volume'] / ratio).round()
+    return frame
+
+
+def extract_actions(hist):
+    """
+    Split and dividend events in a yfinance history frame, in traded terms.
+
+    Returns a DataFrame with columns date, action_type, value and
+    previous_close (the close of the bar before the ex-date, NaN if the
+    frame starts on it).
+    """
+    columns = ['date', 'action_type', 'value', 'previous_close']
+    if hist is None or hist.empty or not {SPLIT_COLUMN, DIVIDEND_COLUMN} & set(hist.columns):
+        return pd.DataFrame(columns=columns)
+
+    frame = hist.reset_index() if 'Date' not in hist.columns else hist
+    frame = unadjust_splits(frame.dropna(subset=['Close'])).sort_values('Date', kind='stable')
+    dates = pd.to_datetime(frame['Date']).dt.date.to_numpy()
+    previous_close = frame['Close'].shift(1).to_numpy(dtype='float64')
+
+    events = []
+    for column, action_type in ((SPLIT_COLUMN, 'split'), (DIVIDEND_COLUMN, 'dividend')):
+        if column not in frame.columns:
+            continue
+        values = frame[column].fillna(0).to_numpy(dtype='float64')
+        rows = np.flatnonzero(values > 0)
+        events.append(pd.DataFrame({
+            'date': dates[rows],
+            'action_type': action_type,
+            'value': values[rows].round(VALUE_DECIMALS),
+            'previous_close': previous_close[rows],
+        }))
+    return pd.concat(events, ignore_index=True) if events else pd.DataFrame(columns=columns)
+
+
+def action_factor(action_type, value, previous_close):
+    """Price factor for the bars before an event; None if it cannot be computed yet"""
+    if action_type == 'split':
+        return 1.0 / value
+    if previous_close is None or np.isnan(previous_close) or previous_close <= value:
+        return None
+    return 1.0 - value / previous_close
+
+
+def store_corporate_actions(stock, hist):
+    """
+    Store new or changed split and dividend events of a stock's history frame.
+
+    Refreshes the stock's cumulative factors and drops its indicator state
+    when anything changed, since every adjusted bar before the event moves.
+    Returns the number of events added or changed.
+    """
+    events = extract_actions(hist)
+    if events.empty:
+        return 0
+
+    existing = {
+        (action.date, action.action_type): float(action.value)
+        for action in CorporateAction.objects.filter(stock=stock, date__in=list(events['date'].unique()))
+    }
+    changed = []
+    for event in events.itertuples(index=False):
+        if existing.get((event.date, event.action_type)) == event.value:
+            continue
+        previous_close = event.previous_close
+        if np.isnan(previous_close):
+            previous_close = _stored_close_before(stock, event.date)
+        factor = action_factor(event.action_type, event.value, previous_close)
+        if factor is None:
+            continue
+        changed.append(CorporateAction(
+            stock=stock, date=event.date, action_type=event.action_type, value=event.value, factor=factor
+        ))
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        CorporateAction.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['stock', 'date', 'action_type'],
+            update_fields=['value', 'factor'],
+        )
+        refresh_cumulative_factors(stock)
+        IndicatorState.objects.filter(stock=stock).delete()
+    return len(changed)
+
+
+def refresh_cumulative_factors(stock):
+    """Recompute the cumulative price and volume factors of a stock's events"""
+    actions = list(CorporateAction.objects.filter(stock=stock).order_by('-date', 'action_type'))
+    price_factor, volume_factor = 1.0, 1.0
+    for action in actions:
+        price_factor *= action.factor
+        if action.action_type == 'split':
+            volume_factor *= float(action.value)
+        action.price_factor, action.volume_factor = price_factor, volume_factor
+    CorporateAction.objects.bulk_update(actions, ['price_factor', 'volume_factor'])
+
+
+def load_adjustment_factors(stock_ids=None):
+    """Cumulative factors as a frame of stock_id, date, price_factor and volume_factor"""
+    queryset = CorporateAction.objects.all()
+    if stock_ids is not None:
+        queryset = queryset.filter(stock_id__in=list(stock_ids))
+    rows = queryset.order_by('stock_id', 'date', 'action_type').values_list(
+        'stock_id', 'date', 'price_factor', 'volume_factor'
+    )
+    factors = pd.DataFrame.from_records(list(rows), columns=['stock_id', 'date', 'price_factor', 'volume_factor'])
+    # Events sharing an ex-date apply together; the last one's products include the others
+    return factors.drop_duplicates(subset=['stock_id', 'date'], keep='last').reset_index(drop=True)
+
+
+def adjustment_for(prices, factors):
+    """
+    Price and volume factors for every row of a frame with stock_id and date columns.
+
+    Each bar takes the cumulative factors of the first event after its date;
+    bars after the last event are not adjusted. Returns two arrays aligned
+    with the rows of ``prices``.
+    """
+    price_factor = np.ones(len(prices))
+    volume_factor = np.ones(len(prices))
+    if factors is None or factors.empty or prices.empty:
+        return price_factor, volume_factor
+
+    left = pd.DataFrame({
+        'row': np.arange(len(prices)),
+        'stock_id': prices['stock_id'].to_numpy(),
+        'key': pd.to_datetime(prices['date']).to_numpy(),
+    }).sort_values('key', kind='stable')
+    right = pd.DataFrame({
+        'stock_id': factors['stock_id'].to_numpy(),
+        'key': pd.to_datetime(factors['date']).to_numpy(),
+        'price_factor': factors['price_factor'].to_numpy(dtype='float64'),
+        'volume_factor': factors['volume_factor'].to_numpy(dtype='float64'),
+    }).sort_values('key', kind='stable')
+    matched = pd.merge_asof(
+        left, right, on='key', by='stock_id', direction='forward', allow_exact_matches=False
+    ).sort_values('row')
+
+    price_factor = matched['price_factor'].fillna(1.0).to_numpy()
+    volume_factor = matched['volume_factor'].fillna(1.0).to_numpy()
+    return price_factor, volume_factor
+
+
+def adjust_prices(prices, factors=None, price_columns=PRICE_COLUMNS, volume_column='volume'):
+    """
+    Split and dividend adjusted copy of a long price frame (stock_id, date, prices...).
+
+    ``factors`` defaults to the stored factors of the frame's stocks. Only
+    the columns present in the frame are adjusted.
+    """
+    if prices.empty:
+        return prices
+    if factors is None:
+        factors = load_adjustment_factors(prices['stock_id'].unique().tolist())
+    if factors.empty:
+        return prices
+
+    price_factor, volume_factor = adjustment_for(prices, factors)
+    adjusted = prices.copy()
+    for column in price_columns:
+        if column in adjusted.columns:
+            adjusted[column] = adjusted[column].astype('float64') * price_factor
+    if volume_column in adjusted.columns:
+        adjusted[volume_column] = (adjusted[volume_column].astype('float64') * volume_factor).round()
+    return adjusted
+
+
+# Internals
+
+def _stored_close_before(stock, day):
+    price = StockPrice.objects.filter(stock=stock, date__lt=day).order_by('-date').values_list('close', flat=True)
+    close = price.first()
+    return np.nan if close is None else float(close)
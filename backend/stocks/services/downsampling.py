@@ -0,0 +1,103 @@
+"""
+Chart-oriented downsampling of daily price series.
+
+Long ranges are reduced to a fixed number of points on the server instead
+of shipping every bar:
+
+    lttb  Largest-Triangle-Three-Buckets on the close: keeps the bars that
+          shape the line (peaks, troughs, turns) instead of every n-th bar
+    ohlc  consecutive bars merged into candles: first open, highest high,
+          lowest low, last close, summed volume, so no extreme is lost
+    none  every bar
+
+Frames have one row per bar with columns date, open, high, low, close,
+adjusted_close and volume, oldest first.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+DOWNSAMPLE_MODES = ['lttb', 'ohlc', 'none']
+
+DEFAULT_POINTS = 500
+
+# Fewer points than this cannot keep a series' first and last bar and a shape
+MIN_POINTS = 3
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Positions of the ``threshold`` points LTTB keeps of the series (x, y).
+
+    The first and last points are always kept. Each bucket in between keeps
+    the point forming the largest triangle with the point kept before it and
+    the average of the next bucket.
+    """
+    n = len(y)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    every = (n - 2) / (threshold - 2)
+    bounds = (np.floor(np.arange(threshold - 1) * every) + 1).astype(int)
+    bounds[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        next_end = bounds[bucket + 2] if bucket + 2 < len(bounds) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[kept] - next_x) * (y[start:end] - y[kept]) - (x[kept] - x[start:end]) * (next_y - y[kept])
+        )
+        kept = start + int(np.argmax(area))
+        selected[bucket + 1] = kept
+    return selected
+
+
+def ohlc_buckets(frame, buckets):
+    """Merge consecutive bars into ``buckets`` candles dated by their first bar"""
+    n = len(frame)
+    if buckets >= n or buckets < 1:
+        return frame
+
+    starts = np.flatnonzero(np.diff(np.arange(n) * buckets // n, prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    values = {name: frame[name].to_numpy(dtype='float64') for name in ('open', 'high', 'low', 'close', 'volume')}
+    return pd.DataFrame({
+        'date': frame['date'].to_numpy()[starts],
+        'open': values['open'][starts],
+        'high': np.maximum.reduceat(values['high'], starts),
+        'low': np.minimum.reduceat(values['low'], starts),
+        'close': values['close'][ends],
+        'adjusted_close': frame['adjusted_close'].to_numpy(dtype='float64')[ends],
+        'volume': np.add.reduceat(values['volume'], starts),
+    })
+
+
+def downsample_prices(frame, points=DEFAULT_POINTS, mode='lttb'):
+    """Reduce a price frame to at most ``points`` rows with one of DOWNSAMPLE_MODES"""
+    if mode == 'none' or len(frame) <= points:
+        return frame
+    if mode == 'ohlc':
+        return ohlc_buckets(frame, points)
+
+    days = pd.to_datetime(frame['date']).to_numpy().astype('datetime64[D]').astype('int64')
+    return frame.iloc[lttb_indices(days, frame['close'].to_numpy(dtype='float64'), points)].reset_index(drop=True)
+
+
+def price_stats(frame):
+    """Range statistics of a full-resolution price frame, computed in one pass over its columns"""
+    if frame.empty:
+        return {}
+    return {
+        'min_price': round(float(frame['low'].min()), 4),
+        'max_price': round(float(frame['high'].max()), 4),
+        'avg_volume': float(frame['volume'].mean()),
+        'start_date': frame['date'].iloc[0].isoformat(),
+        'end_date': frame['date'].iloc[-1].isoformat(),
+    }
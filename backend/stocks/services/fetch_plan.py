@@ -0,0 +1,86 @@
+"""
+Incremental fetch planning for price history.
+
+Works out, per stock or index, the earliest date that actually needs to be
+requested from the provider: the latest stored bar minus a small overlap for
+late corrections, or earlier when an interior gap has to be backfilled.
+"""
+
+from datetime import timedelta
+
+from django.db.models import F, Max, Window
+from django.db.models.functions import Lag
+
+
+DEFAULT_OVERLAP_DAYS = 3
+
+# Calendar days between two stored bars before the hole counts as a gap.
+# Long BIST holidays (e.g. Kurban Bayrami with bridge days) stay below this.
+DEFAULT_MAX_GAP_DAYS = 10
+
+
+def latest_bar_dates(model, owner_field, owner_ids=None):
+    """Return {owner_id: latest stored date} using a single grouped query"""
+    owner_key = f'{owner_field}_id'
+    queryset = model.objects.all()
+    if owner_ids is not None:
+        queryset = queryset.filter(**{f'{owner_key}__in': owner_ids})
+
+    rows = queryset.values(owner_key).annotate(last_date=Max('date')).order_by()
+    return {row[owner_key]: row['last_date'] for row in rows}
+
+
+def interior_gap_starts(model, owner_field, since, owner_ids=None, max_gap_days=DEFAULT_MAX_GAP_DAYS):
+    """
+    Return {owner_id: first missing date} for owners with holes in their history.
+
+    Consecutive stored bars are compared with ``LAG(date)`` in the database,
+    so only the gaps themselves are transferred.
+    """
+    owner_key = f'{owner_field}_id'
+    queryset = model.objects.filter(date__gte=since)
+    if owner_ids is not None:
+        queryset = queryset.filter(**{f'{owner_key}__in': owner_ids})
+
+    gaps = (
+        queryset
+        .annotate(prev_date=Window(Lag('date'), partition_by=[F(owner_key)], order_by=F('date').asc()))
+        .annotate(gap=F('date') - F('prev_date'))
+        .filter(gap__gt=timedelta(days=max_gap_days))
+        .values_list(owner_key, 'prev_date')
+    )
+
+    starts = {}
+    for owner_id, prev_date in gaps:
+        first_missing = prev_date + timedelta(days=1)
+        if owner_id not in starts or first_missing < starts[owner_id]:
+            starts[owner_id] = first_missing
+    return starts
+
+
+def plan_fetch_starts(model, owner_field, owner_ids, default_start,
+                      overlap_days=DEFAULT_OVERLAP_DAYS, max_gap_days=DEFAULT_MAX_GAP_DAYS,
+                      detect_gaps=True):
+    """
+    Return {owner_id: start date} for an incremental history fetch.
+
+    Owners without stored bars start at ``default_start``. Everyone else starts
+    ``overlap_days`` before their latest bar, or at their earliest interior gap
+    inside the ``default_start`` window when that is earlier.
+    """
+    owner_ids = list(owner_ids)
+    latest = latest_bar_dates(model, owner_field, owner_ids)
+    gaps = interior_gap_starts(model, owner_field, default_start, owner_ids, max_gap_days) if detect_gaps else {}
+
+    starts = {}
+    for owner_id in owner_ids:
+        last_date = latest.get(owner_id)
+        if last_date is None:
+            starts[owner_id] = default_start
+            continue
+
+        start = max(last_date - timedelta(days=overlap_days), default_start)
+        if owner_id in gaps:
+            start = min(start, gaps[owner_id])
+        starts[owner_id] = start
+    return starts
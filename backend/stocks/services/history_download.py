@@ -0,0 +1,135 @@
+"""
+Multi-ticker history downloads from Yahoo Finance.
+
+Symbols are requested in groups with a single ``download`` call and the
+wide result is split back into one frame per symbol, shaped like the output
+of ``Ticker.history()`` so it can go through the normal storage stage.
+Symbols missing from a batch response are retried one by one.
+"""
+
+import time
+from collections import defaultdict
+from functools import partial
+
+import pandas as pd
+
+from stocks.services.market_data import get_provider
+from stocks.services.rate_limiter import call_with_backoff
+
+
+DEFAULT_DOWNLOAD_BATCH_SIZE = 50
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def split_download_frame(data, tickers):
+    """Split a ``group_by='ticker'`` download into {ticker: history frame}"""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if isinstance(data.columns, pd.MultiIndex):
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                frames[ticker] = data[ticker]
+    elif len(tickers) == 1:
+        frames[tickers[0]] = data
+
+    histories = {}
+    for ticker, frame in frames.items():
+        if not set(OHLCV_COLUMNS).issubset(frame.columns):
+            continue
+        frame = frame.dropna(how='all', subset=OHLCV_COLUMNS)
+        if frame.empty:
+            continue
+        frame = frame.copy()
+        frame.index.name = 'Date'
+        frame.columns.name = None
+        histories[ticker] = frame
+    return histories
+
+
+def download_history_batch(tickers, start, end, provider=None):
+    """Fetch daily history for several tickers with one request"""
+    provider = provider or get_provider()
+    data = provider.download(
+        tickers=list(tickers),
+        start=start.strftime('%Y-%m-%d'),
+        end=end.strftime('%Y-%m-%d'),
+        group_by='ticker',
+        # Raw closes plus the split and dividend columns, as in _fetch_history
+        auto_adjust=False,
+        actions=True,
+        threads=False,
+        progress=False,
+    )
+    return split_download_frame(data, list(tickers))
+
+
+def download_history_single(ticker, start, end, provider=None):
+    """Fetch daily history for one ticker, the per-symbol fallback"""
+    provider = provider or get_provider()
+    return provider.ticker(ticker).history(
+        start=start.strftime('%Y-%m-%d'),
+        end=end.strftime('%Y-%m-%d'),
+        auto_adjust=False,
+        actions=True
+    )
+
+
+def download_histories(starts, end, batch_size=DEFAULT_DOWNLOAD_BATCH_SIZE, pause=1.0, limiter=None,
+                       provider=None, download_batch=None, download_single=None):
+    """
+    Download history for many tickers.
+
+    Args:
+        starts: {ticker: start date}; tickers sharing a start date are batched together
+        end: end date (exclusive, as in yfinance)
+        batch_size: maximum number of tickers per multi-ticker request
+        pause: seconds to wait between requests when no limiter is given
+        limiter: optional shared TokenBucket; throttled requests are retried with backoff
+        provider: market data provider (default: the configured one)
+
+    Returns:
+        (histories, failed) where histories is {ticker: frame} and failed
+        lists tickers that returned nothing even when requested alone.
+    """
+    download_batch = download_batch or partial(download_history_batch, provider=provider)
+    download_single = download_single or partial(download_history_single, provider=provider)
+
+    def request(func):
+        if limiter is not None:
+            return call_with_backoff(func, limiter)
+        result = func()
+        time.sleep(pause)
+        return result
+
+    by_start = defaultdict(list)
+    for ticker, start in starts.items():
+        by_start[start].append(ticker)
+
+    histories = {}
+    missing = []
+    for start, tickers in sorted(by_start.items()):
+        for offset in range(0, len(tickers), batch_size):
+            batch = tickers[offset:offset + batch_size]
+            try:
+                batch_histories = request(lambda: download_batch(batch, start, end))
+            except Exception:
+                batch_histories = {}
+            histories.update(batch_histories)
+            missing.extend((ticker, start) for ticker in batch if ticker not in batch_histories)
+
+    failed = []
+    for ticker, start in missing:
+        try:
+            hist = request(lambda: download_single(ticker, start, end))
+        except Exception:
+            hist = None
+        if hist is None or hist.empty:
+            failed.append(ticker)
+        else:
+            histories[ticker] = hist
+
+    return histories, failed
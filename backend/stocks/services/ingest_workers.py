@@ -0,0 +1,57 @@
+"""
+Concurrent fetch / serial write pipeline for ingestion commands.
+
+Network calls run on a thread pool while database writes stay on the calling
+thread. Fetched payloads travel through a bounded queue, so fast fetchers
+block instead of piling results up in memory when the writer falls behind.
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+
+DEFAULT_WORKERS = 4
+
+
+def run_pipeline(items, fetch, store, workers=DEFAULT_WORKERS, queue_size=None):
+    """
+    Run ``fetch(item)`` on ``workers`` threads and ``store(item, payload, error)`` here.
+
+    ``fetch`` must only do network I/O. ``store`` is called on the calling
+    thread, once per item in completion order, with either the payload or
+    the exception raised by ``fetch``.
+    """
+    items = list(items)
+    results = queue.Queue(maxsize=queue_size or workers * 2)
+    stop = threading.Event()
+
+    def task(item):
+        try:
+            result = (item, fetch(item), None)
+        except Exception as exc:
+            result = (item, None, exc)
+        finally:
+            # Worker threads should not hold on to database connections
+            connection.close()
+
+        while not stop.is_set():
+            try:
+                results.put(result, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            pool.submit(task, item)
+
+        try:
+            for _ in range(len(items)):
+                item, payload, error = results.get()
+                store(item, payload, error)
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,97 @@
+"""
+Persisted ledger of ingest work, for checkpoint and resume.
+
+Every run gets an IngestRun row; the outcome of each stage of each symbol is
+written to IngestJob as soon as that symbol's database stage finishes. A
+resumed run reuses the run id and options of the original run and skips the
+stages already recorded as done, so only missing and failed work is repeated.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from stocks.models import IngestJob, IngestRun
+
+
+# Options that describe how a command was invoked rather than what it loads
+_IGNORED_OPTIONS = {
+    'resume', 'verbosity', 'settings', 'pythonpath', 'traceback', 'no_color', 'force_color', 'skip_checks',
+}
+
+
+class JobLedger:
+    """Stage outcomes of one ingest run, keyed by (item type, symbol, stage)"""
+
+    def __init__(self, run, completed=()):
+        self.run = run
+        self.completed = set(completed)
+        self.done_count = 0
+        self.failed_count = 0
+
+    @classmethod
+    def start(cls, command, options):
+        """Open a new run, recording the options needed to resume it"""
+        recorded = {
+            key: value for key, value in options.items()
+            if key not in _IGNORED_OPTIONS and isinstance(value, (str, int, float, bool, list, type(None)))
+        }
+        return cls(IngestRun.objects.create(command=command, options=recorded))
+
+    @classmethod
+    def resume(cls, run_id, command):
+        """Reopen an earlier run; raises IngestRun.DoesNotExist if there is none"""
+        run = IngestRun.objects.get(id=run_id, command=command)
+        run.status = 'running'
+        run.finished_at = None
+        run.save(update_fields=['status', 'finished_at'])
+        completed = run.jobs.filter(status='done').values_list('item_type', 'symbol', 'stage')
+        return cls(run, completed)
+
+    @property
+    def run_id(self):
+        return str(self.run.id)
+
+    def is_done(self, item_type, symbol, stage):
+        return (item_type, symbol, stage) in self.completed
+
+    def pending_stages(self, item_type, symbol, stages):
+        """The subset of stages not yet completed for a symbol"""
+        return [stage for stage in stages if not self.is_done(item_type, symbol, stage)]
+
+    def record(self, item_type, symbol, outcomes):
+        """Persist {stage: error message or None} for one symbol"""
+        self.record_many(item_type, {symbol: outcomes})
+
+    def record_many(self, item_type, outcomes_by_symbol):
+        """Persist {symbol: {stage: error message or None}} in one statement"""
+        jobs = []
+        for symbol, outcomes in outcomes_by_symbol.items():
+            for stage, error in outcomes.items():
+                jobs.append(IngestJob(
+                    run=self.run, item_type=item_type, symbol=symbol, stage=stage,
+                    status='failed' if error else 'done', error=str(error) if error else None,
+                ))
+                if error:
+                    self.failed_count += 1
+                    self.completed.discard((item_type, symbol, stage))
+                else:
+                    self.done_count += 1
+                    self.completed.add((item_type, symbol, stage))
+        if not jobs:
+            return
+
+        with transaction.atomic():
+            IngestJob.objects.bulk_create(
+                jobs,
+                update_conflicts=True,
+                unique_fields=['run', 'item_type', 'symbol', 'stage'],
+                update_fields=['status', 'error', 'updated_at'],
+            )
+
+    def finish(self, failed=False):
+        """Close the run; it is failed if it crashed or any stage is still failed"""
+        still_failed = self.run.jobs.filter(status='failed').exists()
+        self.run.status = 'failed' if failed or still_failed else 'completed'
+        self.run.finished_at = timezone.now()
+        self.run.save(update_fields=['status', 'finished_at'])
+        return self.run.status
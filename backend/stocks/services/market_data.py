@@ -0,0 +1,295 @@
+"""
+Market data providers.
+
+Ingestion code gets ticker objects (with the ``info``, ``news`` and
+``history()`` of ``yfinance.Ticker``) and multi-ticker ``download()`` frames
+from a provider instead of importing yfinance directly.
+
+``yahoo`` is the real Yahoo Finance API. ``synthetic`` generates
+deterministic OHLCV, info/fundamentals and news for any symbol and date
+range without network access, with optional per-request latency and
+injected throttling errors, so the pipeline can be tested and benchmarked
+offline at any scale.
+
+The provider is chosen with the MARKET_DATA_PROVIDER setting, or the
+``--provider`` option of the ingestion commands.
+"""
+
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from django.conf import settings
+
+
+# First bar of every synthetic series; bars are generated forward from here
+SYNTHETIC_EPOCH = date(2000, 1, 3)
+
+SYNTHETIC_SECTORS = [
+    'Financial Services', 'Industrials', 'Basic Materials', 'Consumer Cyclical', 'Consumer Defensive',
+    'Energy', 'Utilities', 'Technology', 'Communication Services', 'Real Estate', 'Healthcare',
+]
+
+SYNTHETIC_HEADLINES = [
+    '{name} announces quarterly results',
+    '{name} shares move on sector news',
+    'Analysts update price target for {name}',
+    '{name} signs new supply agreement',
+    '{name} board approves dividend proposal',
+    '{name} expands into new markets',
+]
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+
+
+class SyntheticRateLimitError(Exception):
+    """Injected throttling error; its message matches what Yahoo Finance returns"""
+
+
+class YahooProvider:
+    """Yahoo Finance through yfinance"""
+
+    name = 'yahoo'
+    remote = True
+    # Responses are cached at the root of the response cache
+    cache_namespace = None
+
+    def ticker(self, symbol):
+        return yf.Ticker(symbol)
+
+    def download(self, tickers, start=None, end=None, **kwargs):
+        return yf.download(tickers=list(tickers), start=start, end=end, **kwargs)
+
+
+class SyntheticProvider:
+    """
+    Deterministic stand-in for Yahoo Finance.
+
+    Every symbol gets its own random walk seeded from the symbol and
+    ``seed``, generated from a fixed epoch, so any date range of a symbol
+    returns the same bars no matter how it is requested. ``latency`` seconds
+    are spent on every request and a ``throttle_rate`` fraction of requests
+    fail with a rate limit error.
+    """
+
+    name = 'synthetic'
+    remote = False
+    cache_namespace = 'synthetic'
+
+    def __init__(self, seed=0, latency=0.0, throttle_rate=0.0):
+        self.seed = seed
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.requests = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def ticker(self, symbol):
+        return SyntheticTicker(self, symbol)
+
+    def download(self, tickers, start=None, end=None, **kwargs):
+        """Wide frame grouped by ticker, like ``yf.download(group_by='ticker')``"""
+        self._request()
+        columns = OHLCV_COLUMNS + (ACTION_COLUMNS if kwargs.get('actions') else [])
+        frames = {}
+        for ticker in tickers:
+            frame = self.bars(ticker, start, end)
+            if not frame.empty:
+                frames[ticker] = frame[columns]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    # Generated data
+
+    def bars(self, symbol, start=None, end=None, period=None):
+        """Daily OHLCV bars for start <= date < end (yfinance semantics)"""
+        end = _as_date(end) or date.today() + timedelta(days=1)
+        start = _as_date(start) or _period_start(period or '1mo', end)
+
+        dates = pd.bdate_range(SYNTHETIC_EPOCH, end - timedelta(days=1), name='Date')
+        count = len(dates)
+        if count == 0:
+            return pd.DataFrame(columns=OHLCV_COLUMNS + ACTION_COLUMNS)
+
+        key = self._key(symbol)
+
+        def draws(column):
+            # One generator per column keeps every column's prefix stable as the range grows
+            return np.random.default_rng([key, column])
+
+        base = 5.0 + (key % 20000) / 100.0
+        close = base * np.exp(np.cumsum(draws(0).normal(0.0003, 0.02, count)))
+        previous = np.concatenate([[base], close[:-1]])
+        open_ = previous * (1 + draws(1).normal(0.0, 0.005, count))
+        high = np.maximum(open_, close) * (1 + np.abs(draws(2).normal(0.0, 0.01, count)))
+        low = np.minimum(open_, close) * (1 - np.abs(draws(3).normal(0.0, 0.01, count)))
+        volume = draws(4).lognormal(13.0, 0.6, count).astype('int64')
+
+        frame = pd.DataFrame({
+            'Open': open_.round(2),
+            'High': high.round(2),
+            'Low': low.round(2),
+            'Close': close.round(2),
+            'Volume': volume,
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=dates)
+        return frame[frame.index >= pd.Timestamp(start)]
+
+    def info(self, symbol):
+        """Quote, profile and fundamentals in the shape of ``Ticker.info``"""
+        key = self._key(symbol)
+        rng = np.random.default_rng([key, 100])
+        name = _base_symbol(symbol)
+        recent = self.bars(symbol, period='3mo')
+        last = recent.iloc[-1] if not recent.empty else None
+        close = float(last['Close']) if last is not None else 0.0
+        shares = int(rng.integers(50_000_000, 5_000_000_000))
+        revenue = float(rng.uniform(0.2, 3.0)) * close * shares
+        net_margin = float(rng.uniform(-0.05, 0.25))
+        eps = revenue * net_margin / shares
+
+        return {
+            'symbol': symbol,
+            'longName': f"{name} Sentetik A.Ş.",
+            'shortName': name,
+            'sector': SYNTHETIC_SECTORS[key % len(SYNTHETIC_SECTORS)],
+            'country': 'Turkey',
+            'exchange': 'IST',
+            'currency': 'TRY',
+            'longBusinessSummary': f"{name} is a synthetic company generated for offline testing.",
+            'currentPrice': close,
+            'previousClose': float(recent['Close'].iloc[-2]) if len(recent) > 1 else close,
+            'open': float(last['Open']) if last is not None else 0.0,
+            'dayHigh': float(last['High']) if last is not None else 0.0,
+            'dayLow': float(last['Low']) if last is not None else 0.0,
+            'volume': int(last['Volume']) if last is not None else 0,
+            'averageVolume': int(recent['Volume'].mean()) if not recent.empty else 0,
+            'marketCap': int(close * shares),
+            'trailingPE': round(close / eps, 2) if eps > 0 else None,
+            'trailingEps': round(eps, 4),
+            'dividendYield': round(float(rng.uniform(0.0, 0.08)), 4),
+            'priceToBook': round(float(rng.uniform(0.4, 6.0)), 2),
+            'priceToSalesTrailing12Months': round(close * shares / revenue, 2),
+            'debtToEquity': round(float(rng.uniform(5.0, 250.0)), 2),
+            'returnOnEquity': round(float(rng.uniform(-0.1, 0.4)), 4),
+            'returnOnAssets': round(float(rng.uniform(-0.05, 0.15)), 4),
+            'totalRevenue': int(revenue),
+            'netIncomeToCommon': int(revenue * net_margin),
+            'grossMargins': round(float(rng.uniform(0.1, 0.6)), 4),
+            'operatingMargins': round(float(rng.uniform(0.0, 0.35)), 4),
+            'profitMargins': round(net_margin, 4),
+            'freeCashflow': int(revenue * float(rng.uniform(-0.05, 0.2))),
+        }
+
+    def news(self, symbol, today=None):
+        """A few articles per symbol and day, published over the previous week"""
+        today = today or date.today()
+        key = self._key(symbol)
+        rng = np.random.default_rng([key, today.toordinal()])
+        name = _base_symbol(symbol)
+        midnight = datetime.combine(today, datetime.min.time())
+
+        items = []
+        for number in range(int(rng.integers(2, 7))):
+            published = midnight - timedelta(minutes=int(rng.integers(0, 7 * 24 * 60)))
+            headline = SYNTHETIC_HEADLINES[int(rng.integers(len(SYNTHETIC_HEADLINES)))].format(name=name)
+            items.append({
+                'uuid': f"{name}-{today:%Y%m%d}-{number}",
+                'title': f"{headline} ({published:%d.%m.%Y})",
+                'publisher': 'Synthetic Wire',
+                'link': f"https://news.example.com/{name.lower()}/{today:%Y%m%d}/{number}",
+                'providerPublishTime': int(published.timestamp()),
+                'summary': f"{headline}. Generated for offline testing.",
+            })
+        return items
+
+    # Internals
+
+    def _key(self, symbol):
+        return zlib.crc32(f"{self.seed}:{symbol}".encode())
+
+    def _request(self):
+        """Account for one request: sleep the configured latency and maybe throttle"""
+        with self._lock:
+            self.requests += 1
+            throttled = self.throttle_rate > 0 and self._random.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise SyntheticRateLimitError("Too Many Requests. Rate limited. Try after a while.")
+
+
+class SyntheticTicker:
+    """``yfinance.Ticker`` look-alike backed by a SyntheticProvider"""
+
+    def __init__(self, provider, symbol):
+        self.provider = provider
+        self.ticker = symbol
+
+    @property
+    def info(self):
+        self.provider._request()
+        return self.provider.info(self.ticker)
+
+    @property
+    def news(self):
+        self.provider._request()
+        return self.provider.news(self.ticker)
+
+    def history(self, period=None, start=None, end=None, **kwargs):
+        self.provider._request()
+        return self.provider.bars(self.ticker, start=start, end=end, period=period)
+
+
+PROVIDERS = {
+    YahooProvider.name: YahooProvider,
+    SyntheticProvider.name: SyntheticProvider,
+}
+
+
+def get_provider(name=None):
+    """The named provider, or the one configured in settings.MARKET_DATA_PROVIDER"""
+    name = name or getattr(settings, 'MARKET_DATA_PROVIDER', YahooProvider.name)
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider '{name}' (choose from {', '.join(PROVIDERS)})")
+    if name == SyntheticProvider.name:
+        return SyntheticProvider(**getattr(settings, 'MARKET_DATA_SYNTHETIC', {}))
+    return PROVIDERS[name]()
+
+
+def _as_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _period_start(period, end):
+    """Start date of a yfinance period string such as '30d', '3mo', '5y' or 'max'"""
+    if period == 'max':
+        return SYNTHETIC_EPOCH
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unsupported period '{period}'")
+    count, unit = int(match.group(1)), match.group(2)
+    days = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}[unit] * count
+    return end - timedelta(days=days)
+
+
+def _base_symbol(symbol):
+    return symbol.split('.')[0]
@@ -0,0 +1,132 @@
+"""
+Top movers and market breadth in one window-function query.
+
+Each stock's change is its latest bar against the bar before it, taken with
+``LAG()`` over its recent bars, so weekends and holidays between the two
+trading days do not matter. Only stocks that traded in the latest session
+count. The ranking, the top-N cut and the advancing/declining/unchanged
+counts are all computed by the database in the same statement; only the
+rows that make one of the lists come back.
+
+The scan is bounded to the LOOKBACK_DAYS before the session, which the date
+indexes and yearly partitions prune to, and a split or dividend on the
+session's ex-date puts the previous close on the new basis. The SQL runs on
+PostgreSQL and SQLite.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max
+
+from stocks.models import CorporateAction, Index, Sector, Stock, StockIndex, StockPrice, StockQuote
+
+
+DEFAULT_MOVERS_LIMIT = 5
+
+# Calendar days searched for a stock's previous trading day (covers the longest holiday breaks)
+LOOKBACK_DAYS = 14
+
+Mover = namedtuple('Mover', ['symbol', 'name', 'price', 'change_percent', 'volume'])
+
+# ``gainers`` and ``losers`` are lists of Mover, best first and worst first
+MarketMovers = namedtuple('MarketMovers', ['session', 'gainers', 'losers', 'advancing', 'declining', 'unchanged'])
+
+
+def session_date(using=DEFAULT_DB_ALIAS):
+    """Date of the latest session, from the quote snapshots (or the prices before they exist)"""
+    latest = StockQuote.objects.using(using).aggregate(latest=Max('date'))['latest']
+    if latest is None:
+        latest = StockPrice.objects.using(using).aggregate(latest=Max('date'))['latest']
+    return latest
+
+
+def market_movers(limit=DEFAULT_MOVERS_LIMIT, index=None, sector=None, session=None, using=DEFAULT_DB_ALIAS):
+    """
+    Top ``limit`` gainers and losers of a session with its breadth.
+
+    ``index`` and ``sector`` (names) restrict the universe; ``session``
+    defaults to session_date(). Returns MarketMovers, or None when there
+    are no prices.
+    """
+    session = session or session_date(using)
+    if session is None:
+        return None
+
+    sql, params = movers_sql(connections[using], index=index, sector=sector)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [session - timedelta(days=LOOKBACK_DAYS), session, *params, session, limit, limit])
+        rows = cursor.fetchall()
+
+    gainers = sorted((row for row in rows if row[5] <= limit), key=lambda row: row[5])
+    losers = sorted((row for row in rows if row[6] <= limit), key=lambda row: row[6])
+    advancing, declining, unchanged = rows[0][7:10] if rows else (0, 0, 0)
+    return MarketMovers(
+        session, [_mover(row) for row in gainers], [_mover(row) for row in losers],
+        int(advancing), int(declining), int(unchanged),
+    )
+
+
+def movers_sql(connection, index=None, sector=None):
+    """
+    The movers statement and its universe parameters.
+
+    Placeholders in order: lookback start, session, the universe parameters,
+    session again, and the gainer and loser limits.
+    """
+    q = connection.ops.quote_name
+    prices, stocks = q(StockPrice._meta.db_table), q(Stock._meta.db_table)
+    actions = q(CorporateAction._meta.db_table)
+
+    universe, params = '', []
+    if index:
+        universe += (
+            f" AND p.stock_id IN (SELECT si.stock_id FROM {q(StockIndex._meta.db_table)} si"
+            f" JOIN {q(Index._meta.db_table)} i ON i.id = si.index_id WHERE i.name = %s)"
+        )
+        params.append(index)
+    if sector:
+        universe += (
+            f" AND p.stock_id IN (SELECT s.id FROM {stocks} s"
+            f" JOIN {q(Sector._meta.db_table)} sc ON sc.id = s.sector_id WHERE sc.name = %s)"
+        )
+        params.append(sector)
+
+    sql = (
+        f"WITH bars AS ("
+        f" SELECT p.stock_id, p.date, p.close, p.volume,"
+        f" LAG(p.close) OVER (PARTITION BY p.stock_id ORDER BY p.date) AS previous_close,"
+        f" ROW_NUMBER() OVER (PARTITION BY p.stock_id ORDER BY p.date DESC) AS recency"
+        f" FROM {prices} p WHERE p.date > %s AND p.date <= %s{universe}"
+        f"), changes AS ("
+        # A split and a dividend on the session's ex-date move the previous close onto today's basis
+        f" SELECT b.stock_id, b.close, b.volume,"
+        f" (b.close - b.previous_close * COALESCE(sp.factor, 1) * COALESCE(dv.factor, 1)) * 100.0"
+        f" / (b.previous_close * COALESCE(sp.factor, 1) * COALESCE(dv.factor, 1)) AS change_percent"
+        f" FROM bars b"
+        f" LEFT JOIN {actions} sp ON sp.stock_id = b.stock_id AND sp.date = b.date AND sp.action_type = 'split'"
+        f" LEFT JOIN {actions} dv ON dv.stock_id = b.stock_id AND dv.date = b.date AND dv.action_type = 'dividend'"
+        f" WHERE b.recency = 1 AND b.date = %s AND b.previous_close > 0"
+        f"), ranked AS ("
+        f" SELECT c.*,"
+        f" ROW_NUMBER() OVER (ORDER BY c.change_percent DESC, c.stock_id) AS gain_rank,"
+        f" ROW_NUMBER() OVER (ORDER BY c.change_percent ASC, c.stock_id) AS loss_rank,"
+        f" SUM(CASE WHEN c.change_percent > 0 THEN 1 ELSE 0 END) OVER () AS advancing,"
+        f" SUM(CASE WHEN c.change_percent < 0 THEN 1 ELSE 0 END) OVER () AS declining,"
+        f" SUM(CASE WHEN c.change_percent = 0 THEN 1 ELSE 0 END) OVER () AS unchanged"
+        f" FROM changes c"
+        f") "
+        f"SELECT s.symbol, s.name, r.close, r.change_percent, r.volume, r.gain_rank, r.loss_rank,"
+        f" r.advancing, r.declining, r.unchanged"
+        f" FROM ranked r JOIN {stocks} s ON s.id = r.stock_id"
+        f" WHERE r.gain_rank <= %s OR r.loss_rank <= %s"
+    )
+    return sql, params
+
+
+# Internals
+
+def _mover(row):
+    symbol, name, close, change_percent, volume = row[:5]
+    return Mover(symbol, name, float(close), float(change_percent), int(volume))
@@ -0,0 +1,207 @@
+"""
+Per trading day breadth and performance snapshots of the market, sectors and indices.
+
+For every trading day, MarketSnapshot holds one row for the whole market,
+one per Sector and one per Index with the advance/decline counts, 52-week
+new highs and lows, up and down volume, and the equal-weighted and
+cap-weighted average change of the members. Ingestion refreshes the latest
+days once prices are loaded, so breadth charts over years are a single
+indexed range read of (scope, name, date) instead of an aggregation over
+StockPrice.
+
+Snapshots are computed with pandas over split and dividend adjusted bars.
+Memberships are the current sectors and index constituents, and cap weights
+use the market cap of the nearest stored fundamentals.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max, Min
+
+from stocks.models import MarketSnapshot, Stock, StockFundamental, StockIndex, StockPrice
+from stocks.services.corporate_actions import adjust_prices
+
+
+# Bars a new high or low is measured against (about 52 weeks)
+NEW_HIGH_BARS = 252
+
+# Calendar days of prices loaded before the first snapshot day for the 52-week window
+HISTORY_DAYS = 380
+
+SNAPSHOT_FIELDS = [
+    'members', 'advancing', 'declining', 'unchanged', 'new_highs', 'new_lows', 'up_volume', 'down_volume',
+    'equal_weighted_change', 'cap_weighted_change',
+]
+
+
+def load_snapshot_prices(start, end):
+    """Adjusted stock_id, date, high, low, close and volume from HISTORY_DAYS before ``start`` to ``end``"""
+    rows = StockPrice.objects.filter(
+        date__gte=start - timedelta(days=HISTORY_DAYS), date__lte=end
+    ).values_list('stock_id', 'date', 'high', 'low', 'close', 'volume')
+    prices = pd.DataFrame.from_records(list(rows), columns=['stock_id', 'date', 'high', 'low', 'close', 'volume'])
+    for column in ('high', 'low', 'close', 'volume'):
+        prices[column] = prices[column].astype('float64')
+    return adjust_prices(prices)
+
+
+def load_memberships():
+    """Frame of stock_id, scope and name: every stock in the market, its sector and its indices"""
+    stocks = list(Stock.objects.values_list('id', 'sector__name'))
+    indices = list(StockIndex.objects.values_list('stock_id', 'index__name'))
+    return pd.DataFrame(
+        [(stock_id, 'market', '') for stock_id, _ in stocks]
+        + [(stock_id, 'sector', sector) for stock_id, sector in stocks if sector]
+        + [(stock_id, 'index', index) for stock_id, index in indices],
+        columns=['stock_id', 'scope', 'name'],
+    )
+
+
+def load_market_caps():
+    """Frame of stock_id, date and market_cap from the stored fundamentals"""
+    rows = StockFundamental.objects.filter(market_cap__isnull=False).values_list('stock_id', 'date', 'market_cap')
+    caps = pd.DataFrame.from_records(list(rows), columns=['stock_id', 'date', 'market_cap'])
+    caps['market_cap'] = caps['market_cap'].astype('float64')
+    return caps
+
+
+def compute_snapshots(prices, memberships, caps=None, start=None, end=None):
+    """
+    Snapshot rows for the trading days from ``start`` to ``end`` (all when None).
+
+    ``prices`` holds adjusted bars from load_snapshot_prices, including the
+    history before ``start``. Returns a DataFrame with columns scope, name,
+    date and the SNAPSHOT_FIELDS.
+    """
+    columns = ['scope', 'name', 'date'] + SNAPSHOT_FIELDS
+    if prices.empty or memberships.empty:
+        return pd.DataFrame(columns=columns)
+
+    prices = prices.sort_values(['stock_id', 'date'], kind='stable').reset_index(drop=True)
+    owner = prices['stock_id']
+    previous_close = prices.groupby(owner, sort=False)['close'].shift(1)
+    prior_high = _prior_extreme(prices['high'], owner, 'max')
+    prior_low = _prior_extreme(prices['low'], owner, 'min')
+
+    days = pd.DataFrame({
+        'stock_id': owner,
+        'date': prices['date'],
+        'change': prices['close'] / previous_close.where(previous_close > 0) - 1,
+        'volume': prices['volume'],
+        'new_high': (prices['high'] > prior_high).astype(int),
+        'new_low': (prices['low'] < prior_low).astype(int),
+        'weight': _cap_weights(prices, caps),
+    })
+    in_range = days['change'].notna()
+    if start is not None:
+        in_range &= days['date'] >= start
+    if end is not None:
+        in_range &= days['date'] <= end
+    days = days[in_range]
+    if days.empty:
+        return pd.DataFrame(columns=columns)
+
+    days = days.assign(
+        advancing=(days['change'] > 0).astype(int),
+        declining=(days['change'] < 0).astype(int),
+        unchanged=(days['change'] == 0).astype(int),
+        up_volume=days['volume'].where(days['change'] > 0, 0.0),
+        down_volume=days['volume'].where(days['change'] < 0, 0.0),
+        weighted_change=days['change'] * days['weight'],
+    )
+    grouped = days.merge(memberships, on='stock_id').groupby(['scope', 'name', 'date'], sort=True)
+    snapshots = grouped.agg(
+        members=('change', 'size'),
+        advancing=('advancing', 'sum'),
+        declining=('declining', 'sum'),
+        unchanged=('unchanged', 'sum'),
+        new_highs=('new_high', 'sum'),
+        new_lows=('new_low', 'sum'),
+        up_volume=('up_volume', 'sum'),
+        down_volume=('down_volume', 'sum'),
+        equal_weighted_change=('change', 'mean'),
+        weighted_change=('weighted_change', 'sum'),
+        weight=('weight', 'sum'),
+    ).reset_index()
+
+    snapshots['equal_weighted_change'] *= 100
+    snapshots['cap_weighted_change'] = (
+        snapshots['weighted_change'] / snapshots['weight'].where(snapshots['weight'] > 0) * 100
+    )
+    return snapshots[columns]
+
+
+def refresh_market_snapshots(start=None, end=None):
+    """
+    Recompute and store the snapshots from ``start`` to ``end``.
+
+    ``end`` defaults to the latest price date and ``start`` to the latest
+    stored snapshot day (recomputed, as its prices may have been updated),
+    or the first price date when there are none. Returns the rows written.
+    """
+    bounds = StockPrice.objects.aggregate(first=Min('date'), last=Max('date'))
+    if bounds['last'] is None:
+        return 0
+    end = end or bounds['last']
+    start = start or MarketSnapshot.objects.aggregate(last=Max('date'))['last'] or bounds['first']
+    if start > end:
+        return 0
+
+    snapshots = compute_snapshots(load_snapshot_prices(start, end), load_memberships(), load_market_caps(), start, end)
+    return _write_snapshots(snapshots)
+
+
+# Internals
+
+def _prior_extreme(values, owner, how):
+    """Rolling max or min of each stock's previous NEW_HIGH_BARS bars"""
+    shifted = values.groupby(owner, sort=False).shift(1)
+    rolling = shifted.groupby(owner, sort=False).rolling(NEW_HIGH_BARS, min_periods=1)
+    return getattr(rolling, how)().reset_index(level=0, drop=True).sort_index()
+
+
+def _cap_weights(prices, caps):
+    """Market cap of the nearest fundamentals for every bar; NaN for stocks without any"""
+    if caps is None or caps.empty:
+        return np.full(len(prices), np.nan)
+    left = pd.DataFrame({
+        'row': np.arange(len(prices)),
+        'stock_id': prices['stock_id'].to_numpy(),
+        'key': pd.to_datetime(prices['date']).to_numpy(),
+    }).sort_values('key', kind='stable')
+    right = pd.DataFrame({
+        'stock_id': caps['stock_id'].to_numpy(),
+        'key': pd.to_datetime(caps['date']).to_numpy(),
+        'market_cap': caps['market_cap'].to_numpy(dtype='float64'),
+    }).sort_values('key', kind='stable')
+    matched = pd.merge_asof(left, right, on='key', by='stock_id', direction='nearest').sort_values('row')
+    return matched['market_cap'].to_numpy()
+
+
+def _write_snapshots(snapshots):
+    counts = ['members', 'advancing', 'declining', 'unchanged', 'new_highs', 'new_lows', 'up_volume', 'down_volume']
+    objects = [
+        MarketSnapshot(
+            scope=row['scope'], name=row['name'], date=row['date'],
+            **{field: int(row[field]) for field in counts},
+            equal_weighted_change=_float(row['equal_weighted_change']),
+            cap_weighted_change=_float(row['cap_weighted_change']),
+        )
+        for row in snapshots.to_dict('records')
+    ]
+    with transaction.atomic():
+        MarketSnapshot.objects.bulk_create(
+            objects,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['scope', 'name', 'date'],
+            update_fields=SNAPSHOT_FIELDS + ['updated_at'],
+        )
+    return len(objects)
+
+
+def _float(value):
+    return None if pd.isna(value) else round(float(value), 6)
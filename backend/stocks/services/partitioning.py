@@ -0,0 +1,283 @@
+"""
+Yearly range partitioning of the price and indicator tables.
+
+Django cannot declare partitioned tables, so the tables are created by the
+migrations as plain heap tables and converted in place by
+``convert_to_partitioned``: the table is rebuilt as ``PARTITION BY RANGE
+(date)`` with one partition per calendar year (``<table>_y2024``) plus a
+default partition, the rows are copied over and every constraint and index
+is recreated on the partitioned table. The primary key becomes (id, date),
+because a primary key of a partitioned table has to contain the partition
+key; ``id`` stays unique through its sequence and the ORM keeps using it.
+
+With yearly partitions, date range queries are pruned to the partitions
+they cover, and latest-bar lookups (``order_by('-date').first()`` per
+stock) are answered from the newest partition. Vacuum and index maintenance
+only touch partitions that change. Old years can be detached, and moved to
+an archive schema, without rewriting anything.
+
+Only PostgreSQL supports partitioning; on other databases these functions
+are not used (see ``partitioning_supported``).
+"""
+
+import re
+from collections import namedtuple
+from datetime import date
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from stocks.models import StockPrice, TechnicalIndicator
+
+
+PARTITIONED_MODELS = {
+    'prices': StockPrice,
+    'indicators': TechnicalIndicator,
+}
+
+PARTITION_KEY = 'date'
+
+DEFAULT_ARCHIVE_SCHEMA = 'archive'
+
+# Partitions are kept ready for this many years past the current one
+DEFAULT_YEARS_AHEAD = 1
+
+Partition = namedtuple('Partition', ['name', 'year', 'rows', 'size'])
+
+
+def partitioning_supported(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'postgresql'
+
+
+def partition_name(table, year):
+    """Name of a yearly partition; year None is the default partition"""
+    return f'{table}_default' if year is None else f'{table}_y{year}'
+
+
+def partition_year(table, name):
+    """Year of a partition named by partition_name, or None for any other table"""
+    match = re.fullmatch(rf'{re.escape(table)}_y(\d{{4}})', name)
+    return int(match.group(1)) if match else None
+
+
+def year_bounds(year):
+    """FOR VALUES clause of a yearly partition"""
+    return f"FOR VALUES FROM ('{date(year, 1, 1)}') TO ('{date(year + 1, 1, 1)}')"
+
+
+def is_partitioned(model, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(model, using=DEFAULT_DB_ALIAS):
+    """Attached partitions of a model's table, oldest year first and the default partition last"""
+    table = model._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, GREATEST(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [table],
+        )
+        partitions = [
+            Partition(name, partition_year(table, name), rows, size) for name, rows, size in cursor.fetchall()
+        ]
+    return sorted(partitions, key=lambda p: (p.year is None, p.year or 0))
+
+
+def convert_to_partitioned(model, years_ahead=DEFAULT_YEARS_AHEAD, using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild a model's table as a yearly range-partitioned table, in one transaction.
+
+    Returns the number of rows copied. The table is locked for the duration,
+    so run this during a maintenance window.
+    """
+    connection = connections[using]
+    q = connection.ops.quote_name
+    table = model._meta.db_table
+    old_table = f'{table}_unpartitioned'
+    pk_column = model._meta.pk.column
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        # Deferred foreign key checks still queued in an enclosing transaction would block the DDL
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        constraints, indexes = _table_definitions(cursor, table)
+
+        cursor.execute(f"ALTER TABLE {q(table)} RENAME TO {q(old_table)}")
+        # Columns and NOT NULLs only: the id sequence and all constraints are recreated below
+        cursor.execute(f"CREATE TABLE {q(table)} (LIKE {q(old_table)}) PARTITION BY RANGE ({q(PARTITION_KEY)})")
+
+        cursor.execute(
+            f"SELECT MIN({q(PARTITION_KEY)}), MAX({q(PARTITION_KEY)}), MAX({q(pk_column)}) FROM {q(old_table)}"
+        )
+        first_date, last_date, last_id = cursor.fetchone()
+        first_year = first_date.year if first_date else date.today().year
+        last_year = max(last_date.year if last_date else 0, date.today().year + years_ahead)
+        for year in range(first_year, last_year + 1):
+            name = partition_name(table, year)
+            cursor.execute(f"CREATE TABLE {q(name)} PARTITION OF {q(table)} {year_bounds(year)}")
+        cursor.execute(f"CREATE TABLE {q(partition_name(table, None))} PARTITION OF {q(table)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {q(table)} SELECT * FROM {q(old_table)}")
+        copied = cursor.rowcount
+        # Drops the old identity sequence together with the old constraints and indexes
+        cursor.execute(f"DROP TABLE {q(old_table)}")
+
+        sequence = f'{table}_{pk_column}_seq'
+        cursor.execute(f"CREATE SEQUENCE {q(sequence)} OWNED BY {q(table)}.{q(pk_column)}")
+        cursor.execute(
+            f"ALTER TABLE {q(table)} ALTER COLUMN {q(pk_column)} SET DEFAULT nextval('{sequence}'::regclass)"
+        )
+        cursor.execute("SELECT setval(%s, %s, %s)", [sequence, last_id or 1, last_id is not None])
+
+        for name, contype, definition in constraints:
+            if contype == 'p':
+                definition = f"PRIMARY KEY ({q(pk_column)}, {q(PARTITION_KEY)})"
+            cursor.execute(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(name)} {definition}")
+        for definition in indexes:
+            cursor.execute(definition)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {q(table)}")
+    return copied
+
+
+def ensure_partitions(model, through_year=None, using=DEFAULT_DB_ALIAS):
+    """
+    Create the yearly partitions after the newest one, through ``through_year``.
+
+    Every year with rows in the default partition (e.g. history older than
+    the first partition, loaded after the conversion) also gets its own
+    partition, and the rows are moved into it. Years whose detached
+    partition was left in place are skipped. Returns the names of the
+    partitions created.
+    """
+    connection = connections[using]
+    q = connection.ops.quote_name
+    table = model._meta.db_table
+    default = partition_name(table, None)
+    through_year = through_year or date.today().year + DEFAULT_YEARS_AHEAD
+
+    attached = {p.year for p in list_partitions(model, using) if p.year is not None}
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT EXTRACT(YEAR FROM {q(PARTITION_KEY)})::int FROM {q(default)}")
+        years = {year for (year,) in cursor.fetchall()}
+    years.update(range((max(attached) + 1) if attached else date.today().year, through_year + 1))
+
+    created = []
+    for year in sorted(years - attached):
+        name = partition_name(table, year)
+        if table_exists(name, using=using):
+            continue
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f"CREATE TABLE {q(name)} (LIKE {q(table)} INCLUDING DEFAULTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {q(default)} WHERE {q(PARTITION_KEY)} >= %s "
+                f"AND {q(PARTITION_KEY)} < %s RETURNING *) INSERT INTO {q(name)} SELECT * FROM moved",
+                [date(year, 1, 1), date(year + 1, 1, 1)],
+            )
+            cursor.execute(f"ALTER TABLE {q(table)} ATTACH PARTITION {q(name)} {year_bounds(year)}")
+        created.append(name)
+    return created
+
+
+def table_exists(name, schema=None, using=DEFAULT_DB_ALIAS):
+    """Whether a table exists, in ``schema`` or else on the search path"""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [f'{schema}.{name}' if schema else name])
+        return cursor.fetchone()[0] is not None
+
+
+def partition_problem(model, year, detach, archive_schema=DEFAULT_ARCHIVE_SCHEMA, using=DEFAULT_DB_ALIAS):
+    """Why a year of a model cannot be detached (or attached again), or None when it can"""
+    table = model._meta.db_table
+    name = partition_name(table, year)
+    attached = year in {p.year for p in list_partitions(model, using)}
+    if detach:
+        return None if attached else f"{table} has no attached partition for {year}"
+    if attached:
+        return f"{name} is already attached"
+    if not table_exists(name, archive_schema, using=using):
+        return f"{f'{archive_schema}.' if archive_schema else ''}{name} does not exist"
+    return None
+
+
+def detach_partition(model, year, archive_schema=DEFAULT_ARCHIVE_SCHEMA, using=DEFAULT_DB_ALIAS):
+    """
+    Detach a year from a model's table, optionally moving it to ``archive_schema``.
+
+    The detached table keeps its rows and indexes but loses its foreign keys,
+    so stocks can still be deleted. Returns the schema-qualified table name.
+    """
+    connection = connections[using]
+    q = connection.ops.quote_name
+    table = model._meta.db_table
+    name = partition_name(table, year)
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {q(table)} DETACH PARTITION {q(name)}")
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'", [name]
+        )
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {q(name)} DROP CONSTRAINT {q(constraint)}")
+        if not archive_schema:
+            return name
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {q(archive_schema)}")
+        cursor.execute(f"ALTER TABLE {q(name)} SET SCHEMA {q(archive_schema)}")
+    return f'{archive_schema}.{name}'
+
+
+def attach_partition(model, year, archive_schema=DEFAULT_ARCHIVE_SCHEMA, using=DEFAULT_DB_ALIAS):
+    """Attach a detached year again, moving it back from ``archive_schema`` first if given"""
+    connection = connections[using]
+    q = connection.ops.quote_name
+    table = model._meta.db_table
+    name = partition_name(table, year)
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if archive_schema:
+            cursor.execute(f"ALTER TABLE {q(archive_schema)}.{q(name)} SET SCHEMA {q(_current_schema(cursor))}")
+        # Attaching validates the rows and adds the parent's foreign keys and indexes
+        cursor.execute(f"ALTER TABLE {q(table)} ATTACH PARTITION {q(name)} {year_bounds(year)}")
+    return name
+
+
+def index_definition(definition):
+    """
+    An index definition from pg_get_indexdef that builds on every partition.
+
+    Definitions of partitioned indexes read ``ON ONLY <table>``, which would
+    create the index on the parent alone.
+    """
+    return definition.replace(' ON ONLY ', ' ON ', 1)
+
+
+# Internals
+
+def _current_schema(cursor):
+    cursor.execute("SELECT current_schema()")
+    return cursor.fetchone()[0]
+
+
+def _table_definitions(cursor, table):
+    """Constraints [(name, type, definition)] and the CREATE INDEX statements of other indexes"""
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f', 'c') "
+        "ORDER BY contype = 'p' DESC, conname",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x "
+        "WHERE x.indrelid = to_regclass(%s) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)",
+        [table],
+    )
+    indexes = [index_definition(definition) for (definition,) in cursor.fetchall()]
+    return constraints, indexes
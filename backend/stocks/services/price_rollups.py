@@ -0,0 +1,201 @@
+"""
+Weekly and monthly OHLCV rollups of the daily bars, and price series at any interval.
+
+StockPriceRollup and IndexPriceRollup keep one candle per week (starting
+Monday) or calendar month: first open, highest high, lowest low, last close,
+summed volume. Ingestion rebuilds the periods its new bars fall in, so a
+five-year chart reads about 260 weekly or 60 monthly rows instead of 1,250
+daily ones.
+
+Daily bars are stored as traded. A candle is put on the split and dividend
+basis of its last bar, so adjusting it at read time takes the factors of
+that date, as for a daily bar, and an event only ever changes the candle of
+the period it falls in.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from stocks.models import IndexPrice, IndexPriceRollup, StockPrice, StockPriceRollup
+from stocks.services.corporate_actions import adjust_prices, adjustment_for, load_adjustment_factors
+
+
+ROLLUP_INTERVALS = ['1w', '1mo']
+INTERVALS = ['1d'] + ROLLUP_INTERVALS
+
+# Longest span (in days) served at each resolution when the interval is chosen automatically
+AUTO_INTERVAL_SPANS = [(730, '1d'), (3650, '1w')]
+
+ROLLUP_FIELDS = ['last_date', 'open', 'high', 'low', 'close', 'volume', 'bars']
+
+SERIES_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume']
+
+# (daily bar model, rollup model, owner field) by item type
+ROLLUP_MODELS = {
+    'stock': (StockPrice, StockPriceRollup, 'stock'),
+    'index': (IndexPrice, IndexPriceRollup, 'index'),
+}
+
+
+def period_start(day, interval):
+    """First day of the week (Monday) or month containing ``day``"""
+    if interval == '1w':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def auto_interval(start, end):
+    """Resolution for a chart from ``start`` to ``end``: daily, weekly or monthly"""
+    if start is None or end is None:
+        return '1mo'
+    span = (end - start).days
+    for longest, interval in AUTO_INTERVAL_SPANS:
+        if span <= longest:
+            return interval
+    return '1mo'
+
+
+def build_rollups(bars, interval, factors=None):
+    """
+    Candles of ``interval`` from a frame of daily bars.
+
+    ``bars`` has columns owner_id, date, open, high, low, close and volume;
+    ``factors`` (stocks only, see load_adjustment_factors) put each candle on
+    the basis of its last bar. Returns a frame with columns owner_id, date
+    (period start) and ROLLUP_FIELDS.
+    """
+    columns = ['owner_id', 'date'] + ROLLUP_FIELDS
+    if bars.empty:
+        return pd.DataFrame(columns=columns)
+
+    bars = bars.sort_values(['owner_id', 'date'], kind='stable').reset_index(drop=True)
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        bars[column] = bars[column].astype('float64')
+    days = pd.to_datetime(bars['date'])
+    if interval == '1w':
+        periods = days - pd.to_timedelta(days.dt.weekday, unit='D')
+    else:
+        periods = days.dt.to_period('M').dt.start_time
+    bars['period'] = periods.dt.date
+
+    if factors is not None and not factors.empty:
+        price_factor, volume_factor = adjustment_for(bars.rename(columns={'owner_id': 'stock_id'}), factors)
+        keys = [bars['owner_id'], bars['period']]
+        price_factor = pd.Series(price_factor, index=bars.index)
+        volume_factor = pd.Series(volume_factor, index=bars.index)
+        price_ratio = price_factor / price_factor.groupby(keys).transform('last')
+        for column in ('open', 'high', 'low', 'close'):
+            bars[column] = bars[column] * price_ratio
+        bars['volume'] = bars['volume'] * volume_factor / volume_factor.groupby(keys).transform('last')
+
+    rollups = bars.groupby(['owner_id', 'period'], sort=False).agg(
+        last_date=('date', 'last'),
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        volume=('volume', 'sum'),
+        bars=('close', 'size'),
+    ).reset_index().rename(columns={'period': 'date'})
+    return rollups[columns]
+
+
+def refresh_rollups(item_type, owner_ids=None, since=None):
+    """
+    Rebuild the weekly and monthly candles of the given owners (all when None).
+
+    Only periods from the one containing ``since`` on are rebuilt (all when
+    None). Returns the number of candles written.
+    """
+    bar_model, rollup_model, owner_field = ROLLUP_MODELS[item_type]
+    owner_column = f'{owner_field}_id'
+
+    # Whole months, which also covers the week containing ``since``
+    queryset = bar_model.objects.all()
+    if owner_ids is not None:
+        queryset = queryset.filter(**{f'{owner_column}__in': list(owner_ids)})
+    if since is not None:
+        queryset = queryset.filter(date__gte=min(period_start(since, '1mo'), period_start(since, '1w')))
+    bars = pd.DataFrame.from_records(
+        list(queryset.values_list(owner_column, 'date', 'open', 'high', 'low', 'close', 'volume')),
+        columns=['owner_id', 'date', 'open', 'high', 'low', 'close', 'volume']
+    )
+    if bars.empty:
+        return 0
+
+    factors = load_adjustment_factors(bars['owner_id'].unique().tolist()) if item_type == 'stock' else None
+    written = 0
+    for interval in ROLLUP_INTERVALS:
+        written += _write_rollups(rollup_model, owner_field, interval, build_rollups(bars, interval, factors))
+    return written
+
+
+def load_price_series(stock, interval='1d', start=None, end=None, adjusted=False):
+    """
+    A stock's bars or candles from ``start`` to ``end`` as a frame of SERIES_COLUMNS.
+
+    ``adjusted_close`` is always split and dividend adjusted; with
+    ``adjusted`` the other prices and the volume are too. Candles are dated
+    by the first day of their period.
+    """
+    if interval == '1d':
+        queryset = StockPrice.objects.filter(stock=stock)
+        factor_date = 'date'
+    else:
+        queryset = StockPriceRollup.objects.filter(stock=stock, interval=interval)
+        factor_date = 'last_date'
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+
+    frame = pd.DataFrame.from_records(
+        list(queryset.order_by('date').values_list('date', factor_date, 'open', 'high', 'low', 'close', 'volume')),
+        columns=['date', 'factor_date', 'open', 'high', 'low', 'close', 'volume']
+    )
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        frame[column] = frame[column].astype('float64')
+
+    # Candles take the factors of their last bar's date
+    factored = adjust_prices(frame.assign(stock_id=stock.pk, date=frame['factor_date']))
+    if adjusted:
+        frame[['open', 'high', 'low', 'close', 'volume']] = factored[['open', 'high', 'low', 'close', 'volume']]
+    frame['adjusted_close'] = factored['close'].to_numpy()
+    return frame[SERIES_COLUMNS]
+
+
+# Internals
+
+def _decimal(value):
+    return Decimal(str(round(float(value), 4)))
+
+
+def _write_rollups(model, owner_field, interval, rollups):
+    objects = [
+        model(**{
+            f'{owner_field}_id': row['owner_id'],
+            'interval': interval,
+            'date': row['date'],
+            'last_date': row['last_date'],
+            'open': _decimal(row['open']),
+            'high': _decimal(row['high']),
+            'low': _decimal(row['low']),
+            'close': _decimal(row['close']),
+            'volume': int(np.round(row['volume'])),
+            'bars': int(row['bars']),
+        })
+        for row in rollups.to_dict('records')
+    ]
+    with transaction.atomic():
+        model.objects.bulk_create(
+            objects,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=[owner_field, 'interval', 'date'],
+            update_fields=ROLLUP_FIELDS,
+        )
+    return len(objects)
@@ -0,0 +1,195 @@
+"""
+Bulk storage of fetched price history.
+
+Yahoo Finance history frames are normalized once and written with chunked
+``INSERT ... ON CONFLICT (owner_id, date) DO UPDATE`` statements instead of
+one ``update_or_create`` round trip per row. Rows whose stored values are
+already identical are not written at all.
+
+Yahoo's split adjustment is undone before storing, so stored bars are as
+traded; splits and dividends are adjusted for at read time (see
+corporate_actions).
+
+For first-time backfills the same frames can instead be staged with
+PostgreSQL COPY and merged in one statement (see copy_backfill).
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+from django.db import transaction
+
+from stocks.models import IndicatorState, StockPrice, IndexPrice
+from stocks.services.copy_backfill import CopyStager
+from stocks.services.corporate_actions import unadjust_splits
+from stocks.services.run_telemetry import timed
+from stocks.services.technical_indicators import invalidate_indicator_state
+
+
+DEFAULT_WRITE_BATCH_SIZE = 1000
+
+# Decimal places of the price columns on StockPrice / IndexPrice
+PRICE_DECIMALS = 4
+
+# adjusted_close is not stored: readers adjust with the CorporateAction factors, which stay current
+STOCK_PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+INDEX_PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# first_written is the earliest date that was inserted or changed, if any
+UpsertResult = namedtuple('UpsertResult', ['created', 'updated', 'unchanged', 'first_written'], defaults=[None])
+
+
+def prepare_price_frame(hist):
+    """
+    Normalize a yfinance history frame into one row per date.
+
+    Returns a DataFrame with columns date, open, high, low, close and
+    volume. Rows missing any OHLCV value are dropped,
+    duplicate dates keep the last bar and splits inside the frame are
+    un-adjusted.
+    """
+    columns = ['date'] + STOCK_PRICE_FIELDS
+    if hist is None or hist.empty:
+        return pd.DataFrame(columns=columns)
+
+    frame = hist.reset_index() if 'Date' not in hist.columns else hist.copy()
+    frame = unadjust_splits(frame.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume']))
+
+    prepared = pd.DataFrame({
+        'date': pd.to_datetime(frame['Date']).dt.date,
+        'open': frame['Open'].astype('float64').round(PRICE_DECIMALS),
+        'high': frame['High'].astype('float64').round(PRICE_DECIMALS),
+        'low': frame['Low'].astype('float64').round(PRICE_DECIMALS),
+        'close': frame['Close'].astype('float64').round(PRICE_DECIMALS),
+        'volume': frame['Volume'].astype('int64'),
+    })
+    return prepared.drop_duplicates(subset='date', keep='last').reset_index(drop=True)
+
+
+def _changed_rows(model, owner_field, owner, frame, fields):
+    """Split a prepared frame into rows that need writing and count the new ones"""
+    existing = pd.DataFrame(
+        list(
+            model.objects
+            .filter(**{owner_field: owner}, date__gte=frame['date'].min(), date__lte=frame['date'].max())
+            .values_list('date', *fields)
+        ),
+        columns=['date'] + fields,
+    )
+    if existing.empty:
+        return frame, len(frame)
+
+    for field in fields:
+        existing[field] = existing[field].astype('float64')
+
+    merged = frame.merge(existing, on='date', how='left', suffixes=('', '_stored'), indicator=True)
+    is_new = (merged['_merge'] == 'left_only').to_numpy()
+
+    differs = pd.Series(False, index=merged.index)
+    for field in fields:
+        stored = merged[f'{field}_stored']
+        differs |= ~((merged[field] == stored) | (merged[field].isna() & stored.isna()))
+
+    write_mask = is_new | differs.to_numpy()
+    return frame[write_mask], int(is_new.sum())
+
+
+def bulk_upsert_prices(model, owner_field, owner, frame, fields, batch_size=DEFAULT_WRITE_BATCH_SIZE):
+    """
+    Upsert a prepared price frame for a single stock or index.
+
+    Only new or changed rows are sent to the database, in chunks of
+    ``batch_size`` rows per statement.
+    """
+    if frame.empty:
+        return UpsertResult(0, 0, 0)
+
+    to_write, created = _changed_rows(model, owner_field, owner, frame, fields)
+    updated = len(to_write) - created
+    unchanged = len(frame) - len(to_write)
+
+    if to_write.empty:
+        return UpsertResult(created, updated, unchanged)
+
+    objects = [
+        model(**{owner_field: owner, 'date': row['date']}, **{field: row[field] for field in fields})
+        for row in to_write[['date'] + fields].to_dict('records')
+    ]
+
+    with transaction.atomic():
+        for start in range(0, len(objects), batch_size):
+            model.objects.bulk_create(
+                objects[start:start + batch_size],
+                update_conflicts=True,
+                unique_fields=[owner_field, 'date'],
+                update_fields=fields,
+            )
+
+    return UpsertResult(created, updated, unchanged, to_write['date'].min())
+
+
+def _record(metrics, result):
+    if metrics is not None:
+        metrics.add_rows(inserted=result.created, updated=result.updated, skipped=result.unchanged)
+    return result
+
+
+def upsert_stock_prices(stock, hist, batch_size=DEFAULT_WRITE_BATCH_SIZE, metrics=None):
+    """Bulk upsert a yfinance history frame into StockPrice; timings and row counts go to metrics if given"""
+    with timed(metrics, 'parse'):
+        frame = prepare_price_frame(hist)
+    with timed(metrics, 'db'):
+        result = bulk_upsert_prices(StockPrice, 'stock', stock, frame, STOCK_PRICE_FIELDS, batch_size)
+        if result.first_written is not None:
+            invalidate_indicator_state(stock, result.first_written)
+    return _record(metrics, result)
+
+
+def upsert_index_prices(index, hist, batch_size=DEFAULT_WRITE_BATCH_SIZE, metrics=None):
+    """Bulk upsert a yfinance history frame into IndexPrice; timings and row counts go to metrics if given"""
+    with timed(metrics, 'parse'):
+        frame = prepare_price_frame(hist)
+    with timed(metrics, 'db'):
+        result = bulk_upsert_prices(IndexPrice, 'index', index, frame, INDEX_PRICE_FIELDS, batch_size)
+    return _record(metrics, result)
+
+
+def stock_price_stager():
+    """CopyStager for COPY-based StockPrice backfills"""
+    return CopyStager(StockPrice, 'stock', STOCK_PRICE_FIELDS)
+
+
+def index_price_stager():
+    """CopyStager for COPY-based IndexPrice backfills"""
+    return CopyStager(IndexPrice, 'index', INDEX_PRICE_FIELDS)
+
+
+def stage_prices(stager, owner, hist, metrics=None):
+    """Normalize a yfinance history frame and stream it into the stager; returns rows staged"""
+    with timed(metrics, 'parse'):
+        frame = prepare_price_frame(hist)
+        frame.insert(0, stager.owner_column, owner.pk)
+    with timed(metrics, 'db'):
+        return stager.add(frame)
+
+
+def merge_staged_prices(stager, rebuild_indexes=None):
+    """
+    Merge every staged price row into its table.
+
+    Returns {owner_id: UpsertResult}. Indicator state of stocks whose
+    stored bars changed is invalidated, as with upsert_stock_prices.
+    """
+    merged = stager.merge(rebuild_indexes=rebuild_indexes)
+    results = {owner: UpsertResult(*result) for owner, result in merged.items()}
+
+    if stager.model is StockPrice:
+        first_written = {owner: result.first_written for owner, result in results.items() if result.first_written}
+        stale = [
+            stock_id for stock_id, last_date in
+            IndicatorState.objects.filter(stock_id__in=first_written).values_list('stock_id', 'last_date')
+            if last_date >= first_written[stock_id]
+        ]
+        if stale:
+            IndicatorState.objects.filter(stock_id__in=stale).delete()
+    return results
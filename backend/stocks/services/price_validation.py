@@ -0,0 +1,221 @@
+"""
+Data quality rules for fetched price history.
+
+The history frames of many symbols are stacked into one set of arrays and
+every rule is a vectorized expression over all of them (with per-symbol
+shifts), so validating a whole batch costs milliseconds rather than a
+Python check per row. Rows breaking a rule are removed from the frames
+before storage and quarantined in QuarantinedPrice with the rules they
+broke.
+
+Rules:
+    missing_value       an OHLCV value is missing
+    non_positive_price  a price is zero or negative
+    zero_volume         no shares traded (not applied to indices)
+    high_below_low      high is below low
+    outside_range       open or close outside the day's low-high range
+    duplicate_date      more than one bar for a date (the last one is kept)
+    price_jump          close moved more than max_daily_move from the previous
+                        bar (a one-day spike flags only the spike)
+    stale_close         close repeated for stale_run or more bars in a row
+                        (the first bar of the run is kept)
+
+The jump and stale rules compare each bar with the previous bar that passed
+the other rules.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from stocks.models import QuarantinedPrice
+
+
+DEFAULT_MAX_DAILY_MOVE = 0.25
+DEFAULT_STALE_RUN = 5
+
+# Relative slack for open/close against the low-high range (rounding in the feed)
+RANGE_TOLERANCE = 1e-4
+
+RULES = [
+    'missing_value', 'non_positive_price', 'zero_volume', 'high_below_low', 'outside_range',
+    'duplicate_date', 'price_jump', 'stale_close',
+]
+
+ISSUE_COLUMNS = ['symbol', 'date', 'reasons', 'open', 'high', 'low', 'close', 'volume']
+
+# ``histories`` are the frames without the rejected rows; ``checked`` counts the rows validated
+ValidationResult = namedtuple('ValidationResult', ['histories', 'issues', 'checked'])
+
+
+def validate_histories(histories, max_daily_move=DEFAULT_MAX_DAILY_MOVE, stale_run=DEFAULT_STALE_RUN,
+                       zero_volume=True):
+    """
+    Validate {symbol: yfinance history frame} with every rule in one pass.
+
+    Returns a ValidationResult; ``issues`` is a DataFrame with one row per
+    rejected bar (symbol, date, comma separated reasons and its values).
+    """
+    symbols, columns = [], []
+    for symbol, hist in histories.items():
+        if hist is None or hist.empty:
+            continue
+        symbols.append(symbol)
+        columns.append(_bar_arrays(hist))
+    if not columns:
+        return ValidationResult(dict(histories), pd.DataFrame(columns=ISSUE_COLUMNS), 0)
+
+    owner = np.concatenate([np.full(len(c['close']), i) for i, c in enumerate(columns)])
+    position = np.concatenate([np.arange(len(c['close'])) for c in columns])
+    bars = {name: np.concatenate([c[name] for c in columns]) for name in columns[0]}
+    order = np.lexsort((position, bars['day'], owner))
+    owner, position = owner[order], position[order]
+    bars = {name: values[order] for name, values in bars.items()}
+
+    flags = _row_flags(bars, owner, zero_volume)
+    passed = ~np.logical_or.reduce(list(flags.values()))
+    flags.update(_sequence_flags(bars['close'], owner, passed, max_daily_move, stale_run))
+
+    rejected = np.logical_or.reduce(list(flags.values()))
+    issues = _issue_frame(symbols, owner, bars, flags, rejected)
+
+    cleaned = dict(histories)
+    for index in np.unique(owner[rejected]):
+        symbol = symbols[index]
+        keep = np.ones(len(columns[index]['close']), dtype=bool)
+        keep[position[rejected & (owner == index)]] = False
+        cleaned[symbol] = histories[symbol].iloc[keep]
+    for symbol in symbols:
+        cleaned[symbol].attrs['validated'] = True
+    return ValidationResult(cleaned, issues, len(owner))
+
+
+def validate_history(hist, **options):
+    """Validate a single history frame; returns (frame without rejected rows, issues)"""
+    result = validate_histories({None: hist}, **options)
+    return result.histories[None], result.issues
+
+
+def reason_counts(issues):
+    """{rule: number of rejected rows} of an issues frame"""
+    if issues.empty:
+        return {}
+    counts = issues['reasons'].str.split(',').explode().value_counts()
+    return {reason: int(counts[reason]) for reason in RULES if reason in counts}
+
+
+def quarantine_issues(item_type, issues, symbols=None, run=None):
+    """
+    Upsert rejected bars into QuarantinedPrice in one statement per chunk.
+
+    ``symbols`` maps the issue frame's symbols (e.g. Yahoo tickers) to the
+    stored symbol or index name. Returns the number of rows written.
+    """
+    if issues.empty:
+        return 0
+
+    rows = []
+    for issue in issues.to_dict('records'):
+        values = {
+            field: None if pd.isna(issue[field]) else float(issue[field])
+            for field in ('open', 'high', 'low', 'close', 'volume')
+        }
+        rows.append(QuarantinedPrice(
+            item_type=item_type, symbol=(symbols or {}).get(issue['symbol'], issue['symbol']),
+            date=issue['date'], reasons=issue['reasons'], values=values, run=run,
+        ))
+
+    with transaction.atomic():
+        QuarantinedPrice.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['item_type', 'symbol', 'date'],
+            update_fields=['reasons', 'values', 'run', 'updated_at'],
+        )
+    return len(rows)
+
+
+# Internals
+
+def _bar_arrays(hist):
+    frame = hist.reset_index() if 'Date' not in hist.columns else hist.reset_index(drop=True)
+    dates = pd.to_datetime(frame['Date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return {
+        'day': dates.dt.normalize().to_numpy(),
+        **{
+            name.lower(): frame[name].to_numpy(dtype='float64', na_value=np.nan)
+            for name in ('Open', 'High', 'Low', 'Close', 'Volume')
+        },
+    }
+
+
+def _row_flags(bars, owner, zero_volume):
+    """Rules that look at one bar (and its neighbour's date) only"""
+    o, h, l, c, v = (bars[name] for name in ('open', 'high', 'low', 'close', 'volume'))
+    missing = np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c) | np.isnan(v)
+    with np.errstate(invalid='ignore'):
+        flags = {
+            'missing_value': missing,
+            'non_positive_price': ~missing & ((o <= 0) | (h <= 0) | (l <= 0) | (c <= 0)),
+            'zero_volume': ~missing & (v == 0) if zero_volume else np.zeros(len(c), dtype=bool),
+            'high_below_low': ~missing & (h < l),
+            'outside_range': ~missing & (h >= l) & (
+                (np.minimum(o, c) < l * (1 - RANGE_TOLERANCE)) | (np.maximum(o, c) > h * (1 + RANGE_TOLERANCE))
+            ),
+        }
+    # Sorted by owner, day and position, so a duplicate's kept copy is the next row
+    duplicate = np.zeros(len(c), dtype=bool)
+    duplicate[:-1] = (owner[:-1] == owner[1:]) & (bars['day'][:-1] == bars['day'][1:])
+    flags['duplicate_date'] = duplicate
+    return flags
+
+
+def _sequence_flags(close, owner, passed, max_daily_move, stale_run):
+    """Jump and stale rules over the bars that passed the row rules"""
+    jump = np.zeros(len(close), dtype=bool)
+    stale = np.zeros(len(close), dtype=bool)
+    rows = np.flatnonzero(passed)
+    if len(rows) < 2:
+        return {'price_jump': jump, 'stale_close': stale}
+
+    c, o = close[rows], owner[rows]
+    same = np.zeros(len(rows), dtype=bool)
+    same[1:] = o[1:] == o[:-1]
+    previous = np.empty(len(rows))
+    previous[0] = np.nan
+    previous[1:] = c[:-1]
+
+    move = np.where(same, c / previous - 1, 0.0)
+    jumped = np.abs(move) > max_daily_move
+    # A spike and its reversal: only the spike is bad
+    reverted = np.zeros(len(rows), dtype=bool)
+    reverted[1:] = jumped[:-1] & same[1:] & (np.sign(move[1:]) != np.sign(move[:-1]))
+    jump[rows] = jumped & ~reverted
+
+    repeated = same & (c == previous)
+    run = np.cumsum(~repeated)
+    run_length = np.bincount(run)[run]
+    stale[rows] = repeated & (run_length >= stale_run)
+    return {'price_jump': jump, 'stale_close': stale}
+
+
+def _issue_frame(symbols, owner, bars, flags, rejected):
+    rows = np.flatnonzero(rejected)
+    if not len(rows):
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+
+    reasons = [[] for _ in rows]
+    for rule in RULES:
+        for i in np.flatnonzero(flags[rule][rows]):
+            reasons[i].append(rule)
+    return pd.DataFrame({
+        'symbol': [symbols[i] for i in owner[rows]],
+        'date': pd.DatetimeIndex(bars['day'][rows]).date,
+        'reasons': [','.join(names) for names in reasons],
+        **{name: bars[name][rows] for name in ('open', 'high', 'low', 'close', 'volume')},
+    }, columns=ISSUE_COLUMNS)
@@ -0,0 +1,137 @@
+"""
+Latest-quote snapshots of stocks and indices.
+
+StockQuote and IndexQuote hold one row per stock or index with its latest
+bar, the previous close and the change against it, so read paths join one
+row per symbol instead of running a latest-bar and a previous-bar query
+each. Ingestion refreshes the snapshots of the symbols it loaded; the
+``refresh_quotes`` command rebuilds all of them.
+
+The two latest bars of every owner come from a single ``ROW_NUMBER()``
+window query and the snapshots are written with one bulk upsert. Stored
+stock prices are as traded, so a stock's previous close is put on the
+latest bar's split and dividend basis before the change is computed.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from stocks.models import IndexPrice, IndexQuote, StockPrice, StockQuote
+from stocks.services.corporate_actions import adjustment_for, load_adjustment_factors
+
+
+# Decimal places of the quote's price and percentage columns
+QUOTE_DECIMALS = 4
+
+QUOTE_FIELDS = ['date', 'open', 'high', 'low', 'close', 'volume', 'previous_close', 'change', 'change_percent']
+
+BAR_COLUMNS = ['owner_id', 'date', 'open', 'high', 'low', 'close', 'volume', 'recency']
+
+
+def latest_bars(model, owner_field, owner_ids=None, bars=2):
+    """
+    The ``bars`` most recent bars of every owner in one window query.
+
+    Returns a DataFrame with columns owner_id, date, open, high, low, close,
+    volume and recency (1 for the latest bar).
+    """
+    owner_column = f'{owner_field}_id'
+    queryset = model.objects.all()
+    if owner_ids is not None:
+        queryset = queryset.filter(**{f'{owner_column}__in': list(owner_ids)})
+    rows = queryset.annotate(
+        recency=Window(RowNumber(), partition_by=[F(owner_column)], order_by=F('date').desc())
+    ).filter(recency__lte=bars).values_list(owner_column, 'date', 'open', 'high', 'low', 'close', 'volume', 'recency')
+    return pd.DataFrame.from_records(list(rows), columns=BAR_COLUMNS)
+
+
+def build_quotes(bars, factors=None):
+    """
+    One quote per owner from the frame of latest_bars.
+
+    ``factors`` (see load_adjustment_factors) put the previous close on the
+    latest bar's basis. Returns a DataFrame indexed by owner_id with the
+    QUOTE_FIELDS columns; previous_close, change and change_percent are NaN
+    for owners with a single bar.
+    """
+    latest = bars[bars['recency'] == 1].set_index('owner_id')
+    previous = bars[bars['recency'] == 2].set_index('owner_id').reindex(latest.index)
+
+    quotes = latest[['date', 'open', 'high', 'low', 'close', 'volume']].copy()
+    for column in ('open', 'high', 'low', 'close'):
+        quotes[column] = quotes[column].astype('float64')
+    previous_close = previous['close'].astype('float64')
+
+    if factors is not None and not factors.empty and previous['date'].notna().any():
+        owners = np.concatenate([latest.index.to_numpy(), latest.index.to_numpy()])
+        dates = pd.concat([latest['date'], previous['date'].fillna(latest['date'])], ignore_index=True)
+        price_factor, _ = adjustment_for(pd.DataFrame({'stock_id': owners, 'date': dates}), factors)
+        current, before = price_factor[:len(latest)], price_factor[len(latest):]
+        previous_close = previous_close * before / current
+
+    quotes['previous_close'] = previous_close
+    quotes['change'] = quotes['close'] - previous_close
+    quotes['change_percent'] = (quotes['change'] / previous_close.where(previous_close > 0)) * 100
+    return quotes
+
+
+def refresh_stock_quotes(stock_ids=None):
+    """Rebuild the quotes of the given stocks (all when None); returns the number written"""
+    bars = latest_bars(StockPrice, 'stock', stock_ids)
+    if bars.empty:
+        return 0
+    factors = load_adjustment_factors(bars['owner_id'].unique().tolist())
+    return _write_quotes(StockQuote, 'stock', build_quotes(bars, factors))
+
+
+def refresh_index_quotes(index_ids=None):
+    """Rebuild the quotes of the given indices (all when None); returns the number written"""
+    bars = latest_bars(IndexPrice, 'index', index_ids)
+    if bars.empty:
+        return 0
+    return _write_quotes(IndexQuote, 'index', build_quotes(bars))
+
+
+def quote_of(owner):
+    """The joined quote of a stock or index, or None if it has none yet"""
+    return getattr(owner, 'quote', None)
+
+
+# Internals
+
+def _decimal(value):
+    if value is None or pd.isna(value):
+        return None
+    return Decimal(str(round(float(value), QUOTE_DECIMALS)))
+
+
+def _write_quotes(model, owner_field, quotes):
+    objects = [
+        model(**{
+            f'{owner_field}_id': owner_id,
+            'date': quote.date,
+            'open': _decimal(quote.open),
+            'high': _decimal(quote.high),
+            'low': _decimal(quote.low),
+            'close': _decimal(quote.close),
+            'volume': int(quote.volume),
+            'previous_close': _decimal(quote.previous_close),
+            'change': _decimal(quote.change),
+            'change_percent': _decimal(quote.change_percent),
+        })
+        for owner_id, quote in zip(quotes.index, quotes.itertuples(index=False))
+    ]
+    with transaction.atomic():
+        model.objects.bulk_create(
+            objects,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=[owner_field],
+            update_fields=QUOTE_FIELDS + ['updated_at'],
+        )
+    return len(objects)
@@ -0,0 +1,112 @@
+"""
+Shared rate limiting for Yahoo Finance requests.
+
+A thread-safe token bucket caps the request rate across all ingestion
+workers, and ``call_with_backoff`` retries throttled calls with exponential
+backoff instead of sleeping a fixed second after every symbol.
+"""
+
+import random
+import re
+import threading
+import time
+
+
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+
+HTTP_TOO_MANY_REQUESTS = 429
+
+# Messages Yahoo / yfinance use when a request was throttled. A bare 429 also
+# appears in symbols, counts and URLs, so it only counts next to a status word
+THROTTLE_PATTERN = re.compile(
+    r'too many requests|rate limit|^429\b|\b(?:http|status|status code|error)\W{0,2}429\b', re.IGNORECASE
+)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    ``rate`` tokens are added per second up to ``capacity``; every request
+    takes one token and blocks until one is available.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Take ``tokens`` from the bucket, blocking as needed; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.total_wait += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_throttle_error(exc):
+    """Return True when an exception means the provider throttled us"""
+    if type(exc).__name__ == 'YFRateLimitError':
+        return True
+    status = _http_status(exc)
+    if status is not None:
+        return status == HTTP_TOO_MANY_REQUESTS
+    return THROTTLE_PATTERN.search(str(exc)) is not None
+
+
+def call_with_backoff(func, limiter=None, max_retries=DEFAULT_MAX_RETRIES,
+                      base_delay=DEFAULT_BACKOFF_SECONDS, max_delay=MAX_BACKOFF_SECONDS, metrics=None):
+    """
+    Call ``func`` under the shared limiter, retrying throttling errors.
+
+    Each attempt takes a token from ``limiter`` (when given). Throttling
+    errors are retried after ``base_delay * 2**attempt`` seconds with jitter;
+    any other exception is raised immediately. Token waits, backoff sleeps
+    and retries are added to ``metrics`` (an ItemMetrics) when given.
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            waited = limiter.acquire()
+            if metrics is not None:
+                metrics.add_wait(throttle=waited)
+        try:
+            return func()
+        except Exception as exc:
+            if attempt >= max_retries or not is_throttle_error(exc):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            if metrics is not None:
+                metrics.add_wait(backoff=delay, retried=True)
+            time.sleep(delay)
+
+
+# Internals
+
+def _http_status(exc):
+    """HTTP status of an error raised for a response (requests, curl_cffi, urllib), else None"""
+    for source in (exc, getattr(exc, 'response', None)):
+        for attribute in ('status_code', 'status', 'code'):
+            status = getattr(source, attribute, None)
+            if isinstance(status, int):
+                return status
+    return None
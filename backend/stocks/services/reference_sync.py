@@ -0,0 +1,129 @@
+"""
+Diff-based sync of the reference data files into Stock / Index / StockIndex.
+
+Current database state is loaded in a few queries, the differences to the
+files are computed in memory and applied with bulk_create / bulk_update and
+set-based deletes. Rows that already match are not written.
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from stocks.models import Index, Stock, StockIndex
+
+
+DEFAULT_SYNC_BATCH_SIZE = 500
+
+StockSyncResult = namedtuple('StockSyncResult', ['created', 'updated', 'unchanged', 'deactivated'])
+MembershipSyncResult = namedtuple('MembershipSyncResult', ['index_created', 'added', 'removed', 'missing'])
+
+
+def read_stock_list(csv_path):
+    """Read Şirketler.csv into {symbol: name}, ignoring the header row and blank symbols"""
+    df = pd.read_csv(csv_path, header=None, names=['ticker', 'name'], dtype=str, keep_default_na=False)
+    df['ticker'] = df['ticker'].str.strip()
+    df['name'] = df['name'].str.strip()
+    df = df[(df['ticker'] != '') & (df['ticker'].str.upper() != 'SYMBOL')]
+    return dict(zip(df['ticker'], df['name']))
+
+
+def sync_stocks(stock_names, batch_size=DEFAULT_SYNC_BATCH_SIZE):
+    """
+    Make the active stock list match {symbol: name}.
+
+    New symbols are created, listed symbols are (re)activated and stocks
+    missing from the list are deactivated rather than deleted, since
+    portfolios and watchlists reference them. Names only come from the file
+    until a stock's metadata has been refreshed from Yahoo Finance.
+    """
+    existing = {stock.symbol: stock for stock in Stock.objects.only('id', 'symbol', 'name', 'is_active', 'metadata_updated_at')}
+    now = timezone.now()
+
+    to_create = []
+    to_update = []
+    for symbol, name in stock_names.items():
+        stock = existing.get(symbol)
+        if stock is None:
+            to_create.append(Stock(symbol=symbol, name=name, is_active=True))
+            continue
+
+        changed = False
+        if stock.metadata_updated_at is None and stock.name != name:
+            stock.name = name
+            changed = True
+        if not stock.is_active:
+            stock.is_active = True
+            changed = True
+        if changed:
+            stock.updated_at = now
+            to_update.append(stock)
+
+    stale = [symbol for symbol, stock in existing.items() if stock.is_active and symbol not in stock_names]
+
+    deactivated = 0
+    if to_create or to_update or stale:
+        with transaction.atomic():
+            Stock.objects.bulk_create(to_create, batch_size=batch_size)
+            Stock.objects.bulk_update(to_update, ['name', 'is_active', 'updated_at'], batch_size=batch_size)
+            if stale:
+                deactivated = Stock.objects.filter(symbol__in=stale).update(is_active=False, updated_at=now)
+
+    unchanged = len(stock_names) - len(to_create) - len(to_update)
+    return StockSyncResult(len(to_create), len(to_update), unchanged, deactivated)
+
+
+def sync_index_memberships(indices_data, region='Turkey', batch_size=DEFAULT_SYNC_BATCH_SIZE):
+    """
+    Make index constituents match {index name: [symbols]} exactly.
+
+    Missing indices are created, new constituents added and stocks no longer
+    listed removed. Indices not in the data are left untouched.
+    Returns {index name: MembershipSyncResult}.
+    """
+    indices = {index.name: index for index in Index.objects.filter(name__in=list(indices_data))}
+    new_indices = [
+        Index(name=name, display_name=name.replace('_', ' '), region=region)
+        for name in indices_data if name not in indices
+    ]
+    indices.update((index.name, index) for index in new_indices)
+    stock_ids = dict(Stock.objects.values_list('symbol', 'id'))
+
+    desired = set()
+    missing = {}
+    for name, symbols in indices_data.items():
+        missing[name] = [symbol for symbol in symbols if symbol not in stock_ids]
+        desired.update((stock_ids[symbol], indices[name].id) for symbol in symbols if symbol in stock_ids)
+
+    current = {
+        (stock_id, index_id): pk
+        for pk, stock_id, index_id in StockIndex.objects
+        .filter(index_id__in=[index.id for index in indices.values()])
+        .values_list('id', 'stock_id', 'index_id')
+    }
+    to_add = desired - current.keys()
+    to_remove = current.keys() - desired
+
+    if new_indices or to_add or to_remove:
+        with transaction.atomic():
+            Index.objects.bulk_create(new_indices, batch_size=batch_size)
+            StockIndex.objects.bulk_create(
+                [StockIndex(stock_id=stock_id, index_id=index_id) for stock_id, index_id in to_add],
+                batch_size=batch_size,
+            )
+            if to_remove:
+                StockIndex.objects.filter(id__in=[current[pair] for pair in to_remove]).delete()
+
+    created_names = {index.name for index in new_indices}
+    results = {}
+    for name in indices_data:
+        index_id = indices[name].id
+        results[name] = MembershipSyncResult(
+            index_created=name in created_names,
+            added=sum(1 for _, member_index in to_add if member_index == index_id),
+            removed=sum(1 for _, member_index in to_remove if member_index == index_id),
+            missing=missing[name],
+        )
+    return results
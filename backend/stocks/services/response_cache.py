@@ -0,0 +1,278 @@
+"""
+On-disk cache of raw Yahoo Finance responses.
+
+Responses are stored content-addressed: every payload is serialized
+(Parquet for OHLCV frames, gzipped JSON for ``info`` dicts and news lists)
+and written once under the SHA-256 of its bytes. Small per-symbol ref files
+map a request (kind + parameters) to the object it returned and when it was
+fetched, so identical responses are shared and every kind has its own TTL.
+
+In replay mode nothing is fetched: requests are answered from the cache only
+and misses raise ``CacheMiss``. History requests may be served by slicing a
+cached wider range; when replaying, the range only has to cover the start of
+the request, as the end is the wall clock of the run that asks (a run
+replayed a day later asks for one more day than was recorded).
+
+``prune()`` drops refs older than the retention period
+(``MARKET_DATA_CACHE_RETENTION``, independent of the freshness TTLs),
+except those of symbols on the replay keep-list (``MARKET_DATA_CACHE_KEEP``),
+and then the objects no ref points to. The loader runs it at the end of
+every run that fetched.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+import pandas as pd
+from django.conf import settings
+
+try:
+    import pyarrow  # noqa: F401 - enables DataFrame.to_parquet
+except ImportError:
+    pyarrow = None
+
+
+DEFAULT_TTL = {
+    'history': 60 * 60 * 6,
+    'info': 60 * 60 * 12,
+    'news': 60 * 60,
+}
+
+# Seconds a cached response is kept for replays after it was fetched
+DEFAULT_RETENTION = 60 * 60 * 24 * 30
+
+PruneResult = namedtuple('PruneResult', ['refs', 'objects', 'bytes'])
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a response is not in the cache"""
+
+
+def _as_date_string(value):
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    return str(value) if value is not None else None
+
+
+class ResponseCache:
+    """Content-addressed store of raw provider responses with per-kind TTLs"""
+
+    def __init__(self, root=None, ttl=None, replay=False, namespace=None):
+        self.root = str(root or getattr(
+            settings, 'MARKET_DATA_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'market_data')
+        ))
+        # Providers other than Yahoo Finance keep their responses apart
+        if namespace:
+            self.root = os.path.join(self.root, namespace)
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(getattr(settings, 'MARKET_DATA_CACHE_TTL', {}))
+        self.ttl.update(ttl or {})
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # Public API
+
+    def history(self, symbol, fetch, start=None, end=None, period=None, ttl=None):
+        """Return an OHLCV frame for symbol, calling fetch() only on a cache miss"""
+        params = {'start': _as_date_string(start), 'end': _as_date_string(end), 'period': period}
+        return self._get_or_fetch('history', symbol, params, fetch, ttl)
+
+    def info(self, symbol, fetch, ttl=None):
+        """Return the info dict for symbol, calling fetch() only on a cache miss"""
+        return self._get_or_fetch('info', symbol, {}, fetch, ttl)
+
+    def news(self, symbol, fetch, ttl=None):
+        """Return the news list for symbol, calling fetch() only on a cache miss"""
+        return self._get_or_fetch('news', symbol, {}, fetch, ttl)
+
+    def cached_history(self, symbol, start=None, end=None, period=None, ttl=None):
+        """Return a cached frame for the request, or None"""
+        params = {'start': _as_date_string(start), 'end': _as_date_string(end), 'period': period}
+        return self._lookup('history', symbol, params, ttl)
+
+    def store_history(self, symbol, frame, start=None, end=None, period=None):
+        """Record a frame fetched outside the cache (e.g. by a multi-ticker download)"""
+        params = {'start': _as_date_string(start), 'end': _as_date_string(end), 'period': period}
+        self._store('history', symbol, params, frame)
+
+    def prune(self, max_age=None, keep=None):
+        """
+        Delete refs older than max_age seconds (default: the retention setting) and unreferenced objects.
+
+        Refs of the symbols in keep (default: settings.MARKET_DATA_CACHE_KEEP)
+        are kept whatever their age, so recorded runs can still be replayed.
+        """
+        if max_age is None:
+            max_age = getattr(settings, 'MARKET_DATA_CACHE_RETENTION', DEFAULT_RETENTION)
+        if keep is None:
+            keep = getattr(settings, 'MARKET_DATA_CACHE_KEEP', ())
+        keep = {symbol.replace(os.sep, '_') for symbol in keep}
+        started = time.time()
+        removed_refs = removed_objects = freed = 0
+        referenced = set()
+
+        with self._lock:
+            for kind, symbol, path in self._ref_files():
+                refs = self._read_refs(kind, symbol)
+                if symbol not in keep:
+                    kept = {key: ref for key, ref in refs.items() if started - ref['fetched_at'] <= max_age}
+                    removed_refs += len(refs) - len(kept)
+                    if not kept:
+                        os.remove(path)
+                    elif len(kept) < len(refs):
+                        self._atomic_write(path, json.dumps(kept, sort_keys=True).encode())
+                    refs = kept
+                referenced.update(ref['object'] for ref in refs.values())
+
+            for path in self._object_files():
+                digest = os.path.basename(path).split('.', 1)[0]
+                stat = os.stat(path)
+                # Objects written (or reused) since the prune started may be about to get their ref
+                if digest in referenced or stat.st_mtime >= started:
+                    continue
+                os.remove(path)
+                removed_objects += 1
+                freed += stat.st_size
+
+        return PruneResult(removed_refs, removed_objects, freed)
+
+    # Internals
+
+    def _get_or_fetch(self, kind, symbol, params, fetch, ttl):
+        cached = self._lookup(kind, symbol, params, ttl)
+        if cached is not None:
+            return cached
+        if self.replay:
+            raise CacheMiss(f"No cached {kind} response for {symbol} {params or ''}".strip())
+
+        value = fetch()
+        self._store(kind, symbol, params, value)
+        return value
+
+    def _lookup(self, kind, symbol, params, ttl):
+        refs = self._read_refs(kind, symbol)
+        max_age = ttl if ttl is not None else self.ttl.get(kind)
+        now = time.time()
+
+        def fresh(ref):
+            return self.replay or max_age is None or now - ref['fetched_at'] <= max_age
+
+        ref = refs.get(self._request_key(params))
+        if ref is not None and fresh(ref):
+            value = self._read_object(ref)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        # A wider cached history range can answer a narrower request; a replay takes the newest
+        # range that covers the start, whatever end the run asks for
+        if kind == 'history' and params.get('start') and params.get('end'):
+            for candidate in sorted(refs.values(), key=lambda r: r['fetched_at'], reverse=True):
+                cached = candidate['params']
+                if not (cached.get('start') and cached.get('end')) or not fresh(candidate):
+                    continue
+                if cached['start'] <= params['start'] and (self.replay or cached['end'] >= params['end']):
+                    frame = self._read_object(candidate)
+                    if frame is None:
+                        continue
+                    dates = pd.to_datetime(frame.index).strftime('%Y-%m-%d')
+                    self.hits += 1
+                    return frame[(dates >= params['start']) & (dates < params['end'])]
+
+        self.misses += 1
+        return None
+
+    def _store(self, kind, symbol, params, value):
+        data, fmt = self._serialize(value)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, fmt)
+        if not os.path.exists(path):
+            self._atomic_write(path, data)
+        else:
+            os.utime(path)  # Reused; keeps a concurrent prune from deleting it
+
+        with self._lock:
+            refs = self._read_refs(kind, symbol)
+            refs[self._request_key(params)] = {
+                'object': digest,
+                'format': fmt,
+                'params': params,
+                'fetched_at': time.time(),
+            }
+            self._atomic_write(self._refs_path(kind, symbol), json.dumps(refs, sort_keys=True).encode())
+
+    def _serialize(self, value):
+        if isinstance(value, pd.DataFrame):
+            buffer = io.BytesIO()
+            if pyarrow is not None:
+                value.to_parquet(buffer)
+                return buffer.getvalue(), 'parquet'
+            value.to_pickle(buffer, compression={'method': 'gzip', 'mtime': 0})
+            return buffer.getvalue(), 'pkl.gz'
+
+        payload = json.dumps(value, sort_keys=True, default=str).encode()
+        return gzip.compress(payload, mtime=0), 'json.gz'
+
+    def _read_object(self, ref):
+        path = self._object_path(ref['object'], ref['format'])
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return None
+
+        if ref['format'] == 'parquet':
+            return pd.read_parquet(io.BytesIO(data))
+        if ref['format'] == 'pkl.gz':
+            return pd.read_pickle(io.BytesIO(data), compression='gzip')
+        return json.loads(gzip.decompress(data))
+
+    def _read_refs(self, kind, symbol):
+        try:
+            with open(self._refs_path(kind, symbol), 'r') as handle:
+                return json.load(handle)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _ref_files(self):
+        refs_root = os.path.join(self.root, 'refs')
+        for kind in sorted(os.listdir(refs_root)) if os.path.isdir(refs_root) else ():
+            for name in sorted(os.listdir(os.path.join(refs_root, kind))):
+                if name.endswith('.json'):
+                    yield kind, name[:-len('.json')], os.path.join(refs_root, kind, name)
+
+    def _object_files(self):
+        objects_root = os.path.join(self.root, 'objects')
+        for directory, _, names in os.walk(objects_root):
+            for name in names:
+                if not name.startswith('tmp'):
+                    yield os.path.join(directory, name)
+
+    @staticmethod
+    def _request_key(params):
+        return json.dumps(params, sort_keys=True)
+
+    def _object_path(self, digest, fmt):
+        return os.path.join(self.root, 'objects', digest[:2], f'{digest}.{fmt}')
+
+    def _refs_path(self, kind, symbol):
+        safe_symbol = symbol.replace(os.sep, '_')
+        return os.path.join(self.root, 'refs', kind, f'{safe_symbol}.json')
+
+    @staticmethod
+    def _atomic_write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,355 @@
+"""
+Structured per-run metrics for ingestion and analysis commands.
+
+Every instrumented command writes a JSON-lines report: a ``run_start`` line,
+one ``item`` line per symbol (or portfolio) with the seconds spent in each
+phase (network, parse, db, ...), the rows it inserted, updated, skipped or
+quarantined (by rule), and the retries and throttle waits of its requests,
+``stage`` lines for work that is not per symbol, and a closing ``run_end``
+line with totals.
+
+Lines are written as soon as they are known, so a crashed run still leaves
+a usable (if unterminated) report. ``load_run_reports`` reads the reports
+back for the ``ingest_report`` command.
+"""
+
+import glob
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.utils import timezone
+
+
+ROW_KINDS = ('inserted', 'updated', 'skipped')
+
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+
+# Options that change how a run does its work or identify it, not what work it does. Runs of a
+# command are compared when the rest of their options (the workload) match
+NON_WORKLOAD_OPTIONS = frozenset({
+    'verbosity', 'settings', 'pythonpath', 'traceback', 'no_color', 'force_color', 'skip_checks',
+    'no_report', 'resume', 'workers', 'queue_size', 'rate_limit', 'batch_download', 'batch_size',
+    'row_by_row', 'write_batch_size',
+})
+
+
+def report_dir():
+    return str(getattr(settings, 'INGEST_REPORT_DIR', os.path.join(settings.BASE_DIR, 'reports', 'ingest')))
+
+
+def timed(metrics, phase):
+    """metrics.time(phase), or a no-op when there are no metrics to record into"""
+    return metrics.time(phase) if metrics is not None else nullcontext()
+
+
+class ItemMetrics:
+    """
+    Timings and counters of one symbol within a run.
+
+    Phases nest: time spent in an inner phase is not also counted in the
+    phase around it, so ``db`` around a call that times its own ``parse``
+    only gets the database part.
+    """
+
+    def __init__(self, item_type, symbol):
+        self.item_type = item_type
+        self.symbol = symbol
+        self.timings = defaultdict(float)
+        self.rows = dict.fromkeys(ROW_KINDS, 0)
+        self.retries = 0
+        self.throttle_wait = 0.0
+        self.backoff_wait = 0.0
+        self.quarantined = {}
+        self._stack = threading.local()
+
+    @contextmanager
+    def time(self, phase):
+        stack = self._stack.__dict__.setdefault('frames', [])
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            total = time.perf_counter() - frame[0]
+            self.timings[phase] += total - frame[1]
+            if stack:
+                stack[-1][1] += total
+
+    def add_rows(self, inserted=0, updated=0, skipped=0):
+        self.rows['inserted'] += inserted
+        self.rows['updated'] += updated
+        self.rows['skipped'] += skipped
+
+    def add_quarantined(self, reasons):
+        """Count rows rejected by price validation, as {rule: rows}"""
+        for reason, count in reasons.items():
+            self.quarantined[reason] = self.quarantined.get(reason, 0) + count
+
+    def add_wait(self, throttle=0.0, backoff=0.0, retried=False):
+        self.throttle_wait += throttle
+        self.backoff_wait += backoff
+        if retried:
+            self.retries += 1
+
+
+class RunTelemetry:
+    """JSON-lines report of one command run; a disabled instance records nothing"""
+
+    def __init__(self, command, options=None, run_id=None, directory=None, enabled=True):
+        self.command = command
+        self.run_id = str(run_id or uuid.uuid4())
+        self.enabled = enabled
+        self.path = None
+        self.started = time.monotonic()
+        self._items = {}
+        self._totals = {
+            'items': 0, 'failed_items': 0, 'rows': dict.fromkeys(ROW_KINDS, 0), 'timings': defaultdict(float),
+            'retries': 0, 'throttle_wait': 0.0, 'backoff_wait': 0.0,
+        }
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if not enabled:
+            return
+        directory = directory or report_dir()
+        os.makedirs(directory, exist_ok=True)
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+        self.path = os.path.join(directory, f'{stamp}-{command}-{self.run_id[:8]}.jsonl')
+        self._write({
+            'event': 'run_start', 'run_id': self.run_id, 'command': command,
+            'started_at': timezone.now().isoformat(), 'options': _json_safe(options or {}),
+        })
+
+    def item(self, item_type, symbol):
+        """The ItemMetrics for a symbol, created on first use (safe from worker threads)"""
+        with self._lock:
+            key = (item_type, symbol)
+            if key not in self._items:
+                self._items[key] = ItemMetrics(item_type, symbol)
+            return self._items[key]
+
+    def finish_item(self, metrics, error=None):
+        """Write the item line for a symbol once all of its phases are done"""
+        with self._lock:
+            self._items.pop((metrics.item_type, metrics.symbol), None)
+            totals = self._totals
+            totals['items'] += 1
+            totals['failed_items'] += 1 if error else 0
+            for kind in ROW_KINDS:
+                totals['rows'][kind] += metrics.rows[kind]
+            for phase, seconds in metrics.timings.items():
+                totals['timings'][phase] += seconds
+            totals['retries'] += metrics.retries
+            totals['throttle_wait'] += metrics.throttle_wait
+            totals['backoff_wait'] += metrics.backoff_wait
+
+        self._write({
+            'event': 'item', 'item_type': metrics.item_type, 'symbol': metrics.symbol,
+            'timings': _rounded(metrics.timings), 'rows': metrics.rows, 'retries': metrics.retries,
+            'throttle_wait': round(metrics.throttle_wait, 4), 'backoff_wait': round(metrics.backoff_wait, 4),
+            'quarantined': metrics.quarantined, 'error': str(error) if error else None,
+        })
+
+    def track(self, item_type, items, symbol=str, phase='compute'):
+        """Yield items, recording the time the loop body spends on each as one phase of its item"""
+        for item in items:
+            metrics = self.item(item_type, symbol(item))
+            started = time.perf_counter()
+            yield item
+            metrics.timings[phase] += time.perf_counter() - started
+            self.finish_item(metrics)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time a block of work that is not per symbol; yields a dict for extra fields such as rows"""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.record_stage(name, time.perf_counter() - started, error=error, **fields)
+
+    def record_stage(self, name, elapsed, error=None, rows=None, **fields):
+        if rows:
+            with self._lock:
+                for kind in ROW_KINDS:
+                    self._totals['rows'][kind] += rows.get(kind, 0)
+        self._write({
+            'event': 'stage', 'name': name, 'elapsed': round(elapsed, 4), 'rows': rows,
+            'error': str(error) if error else None, **_json_safe(fields),
+        })
+
+    def close(self, status='completed'):
+        """Write the run_end totals; returns them (None when disabled or already closed)"""
+        if self._closed:
+            return None
+        self._closed = True
+
+        elapsed = time.monotonic() - self.started
+        totals = self._totals
+        processed = sum(totals['rows'].values())
+        summary = {
+            'event': 'run_end', 'run_id': self.run_id, 'command': self.command, 'status': status,
+            'finished_at': timezone.now().isoformat(), 'elapsed': round(elapsed, 4),
+            'items': totals['items'], 'failed_items': totals['failed_items'], 'rows': totals['rows'],
+            'rows_per_second': round(processed / elapsed, 2) if elapsed > 0 else None,
+            'timings': _rounded(totals['timings']), 'retries': totals['retries'],
+            'throttle_wait': round(totals['throttle_wait'], 4), 'backoff_wait': round(totals['backoff_wait'], 4),
+        }
+        self._write(summary)
+        return summary if self.enabled else None
+
+    def _write(self, record):
+        if not self.enabled:
+            return
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                handle.write(line + '\n')
+
+
+def _rounded(timings):
+    return {phase: round(seconds, 4) for phase, seconds in timings.items()}
+
+
+def _json_safe(values):
+    return {
+        key: value for key, value in values.items()
+        if isinstance(value, (str, int, float, bool, list, dict, type(None)))
+    }
+
+
+# Reading reports back
+
+def load_run_reports(directory=None, command=None):
+    """
+    Parse every report in ``directory``, oldest first.
+
+    Returns a list of dicts with the run_start fields, the run_end totals
+    (recomputed from item lines and marked 'interrupted' when the run never
+    finished), ``phase_latency``: {phase: (p50, p95)} across items and
+    ``quarantined``: {rule: rows rejected by price validation}.
+    """
+    runs = []
+    for path in sorted(glob.glob(os.path.join(directory or report_dir(), '*.jsonl'))):
+        run = _read_report(path)
+        if run is not None and (command is None or run['command'] == command):
+            runs.append(run)
+    runs.sort(key=lambda run: run['started_at'])
+    return runs
+
+
+def _read_report(path):
+    start, end, items, stages = None, None, [], []
+    with open(path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            event = record.get('event')
+            if event == 'run_start':
+                start = record
+            elif event == 'run_end':
+                end = record
+            elif event == 'item':
+                items.append(record)
+            elif event == 'stage':
+                stages.append(record)
+    if start is None:
+        return None
+
+    if end is None:
+        rows = dict.fromkeys(ROW_KINDS, 0)
+        for record in items + stages:
+            for kind in ROW_KINDS:
+                rows[kind] += (record.get('rows') or {}).get(kind, 0)
+        end = {
+            'status': 'interrupted', 'elapsed': None, 'items': len(items),
+            'failed_items': sum(1 for item in items if item.get('error')), 'rows': rows, 'rows_per_second': None,
+            'retries': sum(item.get('retries', 0) for item in items),
+            'throttle_wait': sum(item.get('throttle_wait', 0.0) for item in items),
+        }
+
+    latencies = defaultdict(list)
+    quarantined = defaultdict(int)
+    for item in items:
+        for phase, seconds in item.get('timings', {}).items():
+            latencies[phase].append(seconds)
+        for reason, count in (item.get('quarantined') or {}).items():
+            quarantined[reason] += count
+
+    return {
+        'path': path,
+        'run_id': start['run_id'],
+        'command': start['command'],
+        'started_at': start['started_at'],
+        'options': start.get('options') or {},
+        **{key: value for key, value in end.items() if key not in ('event', 'run_id', 'command')},
+        'phase_latency': {phase: percentiles(values) for phase, values in sorted(latencies.items())},
+        'stages': {stage['name']: stage['elapsed'] for stage in stages},
+        'quarantined': dict(quarantined),
+    }
+
+
+def percentiles(values):
+    """(p50, p95) of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return (None, None)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return (statistics.median(ordered), ordered[p95_index])
+
+
+def workload(run):
+    """(command, workload options) of a run; only runs with the same workload are compared"""
+    options = run.get('options') or {}
+    return run.get('command'), tuple(sorted(
+        (name, json.dumps(value, sort_keys=True))
+        for name, value in options.items() if name not in NON_WORKLOAD_OPTIONS
+    ))
+
+
+def describe_workload(run):
+    """The workload options of a run that are set, e.g. 'days=30, skip_stocks'"""
+    options = run.get('options') or {}
+    return ', '.join(
+        name if value is True else f'{name}={value}'
+        for name, value in sorted(options.items())
+        if name not in NON_WORKLOAD_OPTIONS and value not in (None, False, '', [])
+    )
+
+
+def find_regressions(runs, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    Runs whose throughput fell below the median of earlier runs of the same workload.
+
+    ``runs`` must be oldest first. A run is flagged when its rows/second is
+    more than ``threshold`` (a fraction) below the median rows/second of the
+    completed runs before it with the same command and workload options
+    (see ``workload``). Returns [(run, baseline rows/second)].
+    """
+    flagged = []
+    for position, run in enumerate(runs):
+        key = workload(run)
+        baseline = [
+            earlier['rows_per_second'] for earlier in runs[:position]
+            if earlier['status'] == 'completed' and earlier.get('rows_per_second') and workload(earlier) == key
+        ]
+        if not baseline or run.get('rows_per_second') is None:
+            continue
+        median = statistics.median(baseline)
+        if run['rows_per_second'] < median * (1 - threshold):
+            flagged.append((run, median))
+    return flagged
@@ -0,0 +1,151 @@
+"""
+Dependency-ordered execution of pipeline stages.
+
+Stages declare the stages they depend on; every stage whose dependencies
+have succeeded is started as soon as a slot is free, so independent stages
+run side by side and the total time is bounded by the critical path.
+
+``after`` orders stages without depending on them: a stage waits for the
+stages in its ``after`` to finish but runs whatever their outcome, e.g. to
+keep stages that share an external rate limit from overlapping.
+
+With ``fail_fast`` the first failure stops everything still running and
+nothing new is started. Otherwise only the stages downstream of a failure
+are skipped.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+DEFAULT_MAX_PARALLEL = 3
+
+Stage = namedtuple('Stage', ['name', 'command', 'args', 'depends_on', 'after'], defaults=[(), (), ()])
+
+# status is one of 'succeeded', 'failed', 'skipped' or 'cancelled'
+StageResult = namedtuple('StageResult', ['name', 'status', 'elapsed', 'output'])
+
+
+def validate_stages(stages):
+    """Raise ValueError for duplicate names, unknown dependencies or cycles"""
+    names = [stage.name for stage in stages]
+    if len(names) != len(set(names)):
+        raise ValueError("Stage names must be unique")
+
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = set(stage.depends_on) - by_name.keys() | set(stage.after) - by_name.keys()
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {', '.join(sorted(unknown))}")
+
+    visiting, visited = set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage '{name}'")
+        visiting.add(name)
+        for dependency in (*by_name[name].depends_on, *by_name[name].after):
+            visit(dependency)
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in names:
+        visit(name)
+
+
+def critical_path(stages, results):
+    """Longest chain of dependent stage timings; returns (seconds, [stage names])"""
+    by_name = {stage.name: stage for stage in stages}
+    memo = {}
+
+    def longest(name):
+        if name not in memo:
+            elapsed = results[name].elapsed if name in results else 0.0
+            best = (0.0, [])
+            for dependency in (*by_name[name].depends_on, *by_name[name].after):
+                candidate = longest(dependency)
+                if candidate[0] > best[0]:
+                    best = candidate
+            memo[name] = (best[0] + elapsed, best[1] + [name])
+        return memo[name]
+
+    return max((longest(stage.name) for stage in stages), key=lambda path: path[0], default=(0.0, []))
+
+
+def run_stage_graph(stages, execute, max_parallel=DEFAULT_MAX_PARALLEL, fail_fast=False, on_event=None):
+    """
+    Run stages in dependency order with up to max_parallel at a time.
+
+    Args:
+        stages: list of Stage
+        execute: callable(stage, stop_event) -> (ok, output); it should
+            abandon the stage when stop_event is set
+        fail_fast: stop all work on the first failure
+        on_event: optional callable(event, stage, result) for 'start' and 'finish'
+
+    Returns:
+        {stage name: StageResult}
+    """
+    validate_stages(stages)
+    max_parallel = max(1, max_parallel)
+    stop = threading.Event()
+    results = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    def notify(event, stage, result=None):
+        if on_event is not None:
+            on_event(event, stage, result)
+
+    def timed(stage):
+        started = time.monotonic()
+        try:
+            ok, output = execute(stage, stop)
+        except Exception as e:
+            ok, output = False, str(e)
+        return ok, output, time.monotonic() - started
+
+    def finish(stage, status, elapsed=0.0, output=''):
+        results[stage.name] = StageResult(stage.name, status, elapsed, output)
+        notify('finish', stage, results[stage.name])
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            # Skip stages that can no longer run
+            for name, stage in list(pending.items()):
+                blocked = [dep for dep in stage.depends_on if dep in results and results[dep].status != 'succeeded']
+                if blocked or stop.is_set():
+                    del pending[name]
+                    status = 'cancelled' if stop.is_set() else 'skipped'
+                    finish(stage, status, output=f"Upstream stage did not succeed: {', '.join(blocked)}" if blocked else '')
+
+            # Start everything that is ready while there are free slots
+            ready = [
+                stage for stage in pending.values()
+                if all(dep in results and results[dep].status == 'succeeded' for dep in stage.depends_on)
+                and all(dep in results for dep in stage.after)
+            ]
+            for stage in ready[:max(0, max_parallel - len(running))]:
+                del pending[stage.name]
+                notify('start', stage)
+                running[pool.submit(timed, stage)] = stage
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                ok, output, elapsed = future.result()
+                if not ok and stop.is_set():
+                    finish(stage, 'cancelled', elapsed, output)
+                    continue
+                finish(stage, 'succeeded' if ok else 'failed', elapsed, output)
+                if not ok and fail_fast:
+                    stop.set()
+
+    return results
@@ -0,0 +1,368 @@
+"""
+Cross-sectional technical indicator engine.
+
+Prices for the whole universe are loaded with one query into float64 panels
+(one column per stock) and every indicator is computed for all columns in a
+single vectorized pass, then written back with chunked bulk upserts.
+
+Panels are aligned on each stock's own bar sequence (row ``k`` is the k-th
+stored bar of every stock) rather than on calendar dates, so a suspended or
+newly listed stock does not punch NaN holes into other stocks' windows and
+the results match the per-stock calculation exactly.
+
+Indicators are computed on split and dividend adjusted prices; a new
+corporate action drops the stock's state so its history is recomputed.
+
+After every run the EMA values and the trailing price window of each stock
+are saved in IndicatorState, so the next run only loads and computes the
+bars added since (see ``update_indicators``).
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F, Q
+
+from stocks.models import IndicatorState, StockPrice, TechnicalIndicator
+from stocks.services.copy_backfill import CopyStager
+from stocks.services.corporate_actions import adjust_prices
+
+
+MA_WINDOWS = (5, 10, 20, 50, 100, 200)
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_STDDEV = 2
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+STOCHASTIC_WINDOW, STOCHASTIC_SMOOTHING = 14, 3
+CCI_WINDOW, CCI_CONSTANT = 14, 0.015
+ATR_WINDOW = 14
+
+# Rows are only stored once the longest window is filled
+MIN_HISTORY = max(MA_WINDOWS)
+
+INDICATOR_FIELDS = [
+    'rsi_14', 'macd', 'macd_signal', 'macd_histogram',
+    'stochastic_k', 'stochastic_d', 'cci_14', 'atr_14',
+    'bollinger_upper', 'bollinger_middle', 'bollinger_lower',
+    'ma_5', 'ma_10', 'ma_20', 'ma_50', 'ma_100', 'ma_200',
+]
+
+# Indicator values are stored with four decimal places
+INDICATOR_DECIMALS = 4
+DEFAULT_WRITE_BATCH_SIZE = 2000
+
+# Trailing bars kept per stock for incremental updates
+STATE_WINDOW = MIN_HISTORY
+EMA_STATE_FIELDS = ['ema_12', 'ema_26', 'macd_signal']
+
+# ``new`` marks the bars to store (None: all of them); ``seeds`` holds the
+# carried EMA values on the last bar of each stock's stored window
+PricePanel = namedtuple('PricePanel', ['dates', 'close', 'high', 'low', 'new', 'seeds'], defaults=[None, None])
+
+
+def _price_frame(queryset):
+    rows = queryset.order_by('stock_id', 'date').values_list('stock_id', 'date', 'high', 'low', 'close')
+    prices = pd.DataFrame.from_records(list(rows), columns=['stock_id', 'date', 'high', 'low', 'close'])
+    for column in ('high', 'low', 'close'):
+        prices[column] = prices[column].astype('float64')
+    return adjust_prices(prices)
+
+
+def _build_panel(prices, seeded=False):
+    """Pivot a long frame ordered by stock (and bar) into bar-aligned panels"""
+    if prices.empty:
+        empty = pd.DataFrame()
+        return PricePanel(empty, empty, empty, empty)
+
+    prices = prices.copy()
+    prices['bar'] = prices.groupby('stock_id').cumcount()
+
+    def pivot(column):
+        return prices.pivot(index='bar', columns='stock_id', values=column)
+
+    if not seeded:
+        return PricePanel(pivot('date'), pivot('close'), pivot('high'), pivot('low'))
+
+    new = pivot('new').fillna(False).astype(bool)
+    seeds = {field: pivot(field).astype('float64') for field in EMA_STATE_FIELDS}
+    return PricePanel(pivot('date'), pivot('close'), pivot('high'), pivot('low'), new, seeds)
+
+
+def load_price_panel(stock_ids=None):
+    """
+    Load all stored prices into bar-aligned panels.
+
+    Returns a PricePanel whose frames are indexed by bar number with one
+    column per stock id; ``dates`` holds the date of every bar.
+    """
+    queryset = StockPrice.objects.all()
+    if stock_ids is not None:
+        queryset = queryset.filter(stock_id__in=list(stock_ids))
+    return _build_panel(_price_frame(queryset))
+
+
+def load_incremental_panel(stock_ids=None):
+    """
+    Load only the bars each stock needs for an incremental update.
+
+    Stocks with a saved IndicatorState get their stored trailing window
+    followed by the bars after ``last_date``; stocks without state get their
+    full history. Stocks with state and no new bars are left out.
+    """
+    queryset = StockPrice.objects.filter(
+        Q(stock__indicator_state__isnull=True) | Q(date__gt=F('stock__indicator_state__last_date'))
+    )
+    if stock_ids is not None:
+        queryset = queryset.filter(stock_id__in=list(stock_ids))
+
+    prices = _price_frame(queryset)
+    if prices.empty:
+        return _build_panel(prices)
+    prices['new'] = True
+
+    tails = {column: [] for column in ['stock_id', 'high', 'low', 'close'] + EMA_STATE_FIELDS}
+    for state in IndicatorState.objects.filter(stock_id__in=prices['stock_id'].unique().tolist()):
+        closes = state.window.get('close', [])
+        if not closes:
+            continue
+        length = len(closes)
+        tails['stock_id'].extend([state.stock_id] * length)
+        for column in ('high', 'low', 'close'):
+            tails[column].extend(state.window[column])
+        for field in EMA_STATE_FIELDS:
+            seed = getattr(state, field)
+            tails[field].extend([np.nan] * (length - 1) + [np.nan if seed is None else seed])
+
+    # Stable sort keeps every stock's window ahead of its new bars
+    tail_frame = pd.DataFrame(tails).assign(date=None, new=False)
+    prices = pd.concat([tail_frame, prices], ignore_index=True).sort_values('stock_id', kind='stable')
+    return _build_panel(prices, seeded=True)
+
+
+def _ewm(values, span, seed=None):
+    """
+    Exponential moving average, optionally continued from a carried value.
+
+    When a column has a seed the recursion restarts from it: earlier bars are
+    ignored and the seed takes the place of the bar it was saved on.
+    """
+    if seed is not None:
+        has_seed = seed.notna()
+        started = has_seed.cummax() | ~has_seed.any()
+        values = seed.where(has_seed, values.where(started))
+    return values.ewm(span=span, adjust=False).mean()
+
+
+def _rolling_mean_abs_dev(values, window):
+    """Rolling mean absolute deviation from the window mean, for every column at once"""
+    data = values.to_numpy(dtype='float64')
+    result = np.full(data.shape, np.nan)
+    if len(data) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(data, window, axis=0)
+        mean = windows.mean(axis=-1, keepdims=True)
+        result[window - 1:] = np.abs(windows - mean).mean(axis=-1)
+    return pd.DataFrame(result, index=values.index, columns=values.columns)
+
+
+def compute_indicators(panel):
+    """Compute every indicator for every column of a price panel; returns {field: frame}"""
+    close = panel.close
+    seeds = panel.seeds or {}
+    results = {}
+
+    # RSI - 14 bar simple average of gains and losses
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    rs = gain.rolling(window=RSI_WINDOW).mean() / loss.rolling(window=RSI_WINDOW).mean()
+    results['rsi_14'] = 100 - (100 / (1 + rs))
+
+    # Moving averages
+    for window in MA_WINDOWS:
+        results[f'ma_{window}'] = close.rolling(window=window).mean()
+
+    # MACD
+    results['ema_12'] = _ewm(close, MACD_FAST, seeds.get('ema_12'))
+    results['ema_26'] = _ewm(close, MACD_SLOW, seeds.get('ema_26'))
+    results['macd'] = results['ema_12'] - results['ema_26']
+    results['macd_signal'] = _ewm(results['macd'], MACD_SIGNAL, seeds.get('macd_signal'))
+    results['macd_histogram'] = results['macd'] - results['macd_signal']
+
+    # Stochastic oscillator - %K over 14 bars, %D its 3 bar average
+    lowest = panel.low.rolling(window=STOCHASTIC_WINDOW).min()
+    highest = panel.high.rolling(window=STOCHASTIC_WINDOW).max()
+    results['stochastic_k'] = 100 * (close - lowest) / (highest - lowest)
+    results['stochastic_d'] = results['stochastic_k'].rolling(window=STOCHASTIC_SMOOTHING).mean()
+
+    # CCI - typical price against its 14 bar mean and mean deviation
+    typical = (panel.high + panel.low + close) / 3
+    typical_mean = typical.rolling(window=CCI_WINDOW).mean()
+    results['cci_14'] = (typical - typical_mean) / (CCI_CONSTANT * _rolling_mean_abs_dev(typical, CCI_WINDOW))
+
+    # ATR - 14 bar simple average of the true range
+    previous_close = close.shift(1)
+    true_range = np.fmax(
+        panel.high - panel.low,
+        np.fmax((panel.high - previous_close).abs(), (panel.low - previous_close).abs()),
+    )
+    results['atr_14'] = true_range.rolling(window=ATR_WINDOW).mean()
+
+    # Bollinger bands
+    middle = close.rolling(window=BOLLINGER_WINDOW).mean()
+    std_dev = close.rolling(window=BOLLINGER_WINDOW).std()
+    results['bollinger_middle'] = middle
+    results['bollinger_upper'] = middle + (std_dev * BOLLINGER_STDDEV)
+    results['bollinger_lower'] = middle - (std_dev * BOLLINGER_STDDEV)
+
+    return results
+
+
+def indicators_to_rows(panel, indicators):
+    """
+    Flatten indicator panels into a long frame of storable rows.
+
+    Only new bars where RSI and the 200-bar average are defined are kept.
+    """
+    valid = (indicators['rsi_14'].notna() & indicators['ma_200'].notna()).to_numpy()
+    if panel.new is not None:
+        valid = valid & panel.new.to_numpy(dtype=bool)
+
+    rows, cols = np.nonzero(valid)
+    frame = pd.DataFrame({
+        'stock_id': panel.close.columns.to_numpy()[cols],
+        'date': panel.dates.to_numpy()[rows, cols],
+    })
+    for field in INDICATOR_FIELDS:
+        values = indicators[field].to_numpy(dtype='float64')[rows, cols]
+        frame[field] = np.round(np.where(np.isfinite(values), values, np.nan), INDICATOR_DECIMALS)
+    return frame
+
+
+def build_states(panel, indicators):
+    """Carry state at the last bar of every column of a computed panel"""
+    counts = panel.close.notna().sum().to_numpy()
+    dates = panel.dates.to_numpy()
+    windows = {column: getattr(panel, column).to_numpy(dtype='float64') for column in ('close', 'high', 'low')}
+    emas = {field: indicators[field].to_numpy(dtype='float64') for field in EMA_STATE_FIELDS}
+
+    states = []
+    for col, stock_id in enumerate(panel.close.columns):
+        last = counts[col] - 1
+        if last < 0:
+            continue
+        first = max(0, last + 1 - STATE_WINDOW)
+        states.append(IndicatorState(
+            stock_id=stock_id,
+            last_date=dates[last, col],
+            window={column: values[first:last + 1, col].tolist() for column, values in windows.items()},
+            **{field: None if np.isnan(values[last, col]) else float(values[last, col])
+               for field, values in emas.items()},
+        ))
+    return states
+
+
+def invalidate_indicator_state(stock, since):
+    """Drop a stock's carried state when bars on or before its last date changed"""
+    IndicatorState.objects.filter(stock=stock, last_date__gte=since).delete()
+
+
+def bulk_upsert_indicators(frame, fields=None, batch_size=DEFAULT_WRITE_BATCH_SIZE):
+    """
+    Upsert indicator rows for many stocks with chunked INSERT ... ON CONFLICT.
+
+    Returns (created, updated).
+    """
+    fields = fields or INDICATOR_FIELDS
+    if frame.empty:
+        return 0, 0
+
+    # Only the (stock, date) range being written, so counting stays on the unique index and
+    # does not scan the stocks' whole indicator history
+    existing = TechnicalIndicator.objects.filter(
+        stock_id__in=frame['stock_id'].unique().tolist(), date__gte=frame['date'].min(), date__lte=frame['date'].max()
+    )
+    count_before = existing.count()
+
+    values = frame[fields].astype(object).where(frame[fields].notna(), None)
+    records = zip(frame['stock_id'].tolist(), frame['date'].tolist(), values.itertuples(index=False, name=None))
+    objects = [
+        TechnicalIndicator(stock_id=stock_id, date=date, **dict(zip(fields, row)))
+        for stock_id, date, row in records
+    ]
+
+    with transaction.atomic():
+        for start in range(0, len(objects), batch_size):
+            TechnicalIndicator.objects.bulk_create(
+                objects[start:start + batch_size],
+                update_conflicts=True,
+                unique_fields=['stock', 'date'],
+                update_fields=fields,
+            )
+
+    created = existing.count() - count_before
+    return created, len(objects) - created
+
+
+def copy_upsert_indicators(frame, fields=None):
+    """
+    Upsert indicator rows through a COPY staging table (PostgreSQL only).
+
+    Returns (created, updated); unchanged rows are not rewritten.
+    """
+    fields = fields or INDICATOR_FIELDS
+    if frame.empty:
+        return 0, 0
+
+    stager = CopyStager(TechnicalIndicator, 'stock', fields)
+    try:
+        stager.add(frame)
+        results = stager.merge()
+    finally:
+        stager.close()
+    return sum(r.created for r in results.values()), sum(r.updated for r in results.values())
+
+
+def _compute_and_store(panel, batch_size, use_copy=False):
+    if panel.close.empty:
+        return 0, 0, 0
+
+    indicators = compute_indicators(panel)
+    frame = indicators_to_rows(panel, indicators)
+    states = build_states(panel, indicators)
+
+    with transaction.atomic():
+        if use_copy:
+            created, updated = copy_upsert_indicators(frame)
+        else:
+            created, updated = bulk_upsert_indicators(frame, batch_size=batch_size)
+        IndicatorState.objects.bulk_create(
+            states,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['stock'],
+            update_fields=['last_date', 'window', 'updated_at'] + EMA_STATE_FIELDS,
+        )
+    return len(states), created, updated
+
+
+def recalculate_indicators(stock_ids=None, batch_size=DEFAULT_WRITE_BATCH_SIZE, use_copy=False):
+    """
+    Recompute and store indicators over the full history of the given stocks (or all stocks).
+
+    With ``use_copy`` rows are written through COPY (PostgreSQL only).
+    Returns (stocks_processed, created, updated).
+    """
+    return _compute_and_store(load_price_panel(stock_ids), batch_size, use_copy)
+
+
+def update_indicators(stock_ids=None, batch_size=DEFAULT_WRITE_BATCH_SIZE, use_copy=False):
+    """
+    Compute and store indicators only for bars added since the last run.
+
+    Stocks without carried state are computed over their full history.
+    With ``use_copy`` rows are written through COPY (PostgreSQL only).
+    Returns (stocks_processed, created, updated).
+    """
+    return _compute_and_store(load_incremental_panel(stock_ids), batch_size, use_copy)
@@ -0,0 +1,53 @@
+"""
+Per-run memo of Yahoo Finance ``Ticker.info``.
+
+``info`` is the slowest and most throttled Yahoo call. Every stage of a run
+asks this memo instead of the ticker, so each symbol is requested at most
+once per run, and callers use ``is_fresh`` to skip the request entirely when
+the slow-changing fields (names, sector, description) were refreshed
+recently.
+"""
+
+import threading
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+DEFAULT_METADATA_MAX_AGE_DAYS = 7
+
+
+def is_fresh(refreshed_at, max_age_days=DEFAULT_METADATA_MAX_AGE_DAYS):
+    """True if metadata refreshed at ``refreshed_at`` is younger than max_age_days"""
+    if refreshed_at is None or max_age_days is None or max_age_days <= 0:
+        return False
+    return timezone.now() - refreshed_at < timedelta(days=max_age_days)
+
+
+class TickerMetadata:
+    """Thread-safe memo of info dicts keyed by Yahoo symbol"""
+
+    def __init__(self):
+        self.requests = 0
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol, fetch):
+        """Return the info dict for symbol, calling fetch() on the first request only"""
+        with self._lock:
+            symbol_lock = self._locks.setdefault(symbol, threading.Lock())
+
+        # Concurrent requests for one symbol wait for the first fetch
+        with symbol_lock:
+            if symbol not in self._values:
+                self.requests += 1
+                try:
+                    self._values[symbol] = (fetch(), None)
+                except Exception as e:
+                    self._values[symbol] = (None, e)
+
+        value, error = self._values[symbol]
+        if error is not None:
+            raise error
+        return value
@@ -1,21 +1,32 @@
-import yfinance as yf
+from .market_data import get_provider
+from .response_cache import ResponseCache
+
+# Live quotes are served from the response cache for at most this many seconds
+QUOTE_CACHE_TTL = 900
+
 
 class YahooFinanceService:
     """
     Service class for interacting with Yahoo Finance API
     """
+    def __init__(self, cache=None, provider=None):
+        self.provider = provider or get_provider()
+        self.cache = cache or ResponseCache(namespace=self.provider.cache_namespace)
+
     def get_stock_detail(self, symbol):
         # Format the symbol correctly for Turkish stocks
         yahoo_symbol = f"{symbol}.IS"
         
         # Fetch the stock data
-        stock = yf.Ticker(yahoo_symbol)
+        stock = self.provider.ticker(yahoo_symbol)
         
         # Get basic info
-        info = stock.info
+        info = self.cache.info(yahoo_symbol, lambda: stock.info, ttl=QUOTE_CACHE_TTL)
         
         # Get historical data (last 30 days)
-        hist = stock.history(period="30d")
+        hist = self.cache.history(
+            yahoo_symbol, lambda: stock.history(period="30d"), period="30d", ttl=QUOTE_CACHE_TTL
+        )
         
         # Convert historical data to a format suitable for JSON
         historical_data = []
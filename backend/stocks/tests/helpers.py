@@ -0,0 +1,51 @@
+"""
+Shared test fixtures: yfinance-shaped price histories and a fake yf.Ticker.
+"""
+
+import pandas as pd
+
+
+def make_history(closes, start='2024-01-01', spread=0.01, volume=1000, dividends=None, splits=None,
+                 tz='Europe/Istanbul', **columns):
+    """
+    Build a frame shaped like yfinance's Ticker.history() output, one business day per close.
+
+    High and Low are spread (a fraction of the close) above and below it. Dividends and
+    splits add the actions=True columns; any other column is set from columns.
+    """
+    dates = pd.date_range(start, periods=len(closes), freq='B', tz=tz, name='Date')
+    frame = pd.DataFrame({
+        'Open': closes,
+        'High': [c * (1 + spread) for c in closes],
+        'Low': [c * (1 - spread) for c in closes],
+        'Close': closes,
+        'Volume': [volume] * len(closes),
+    }, index=dates)
+    if dividends is not None:
+        frame['Dividends'] = dividends
+    if splits is not None:
+        frame['Stock Splits'] = splits
+    for name, values in columns.items():
+        frame[name] = values
+    return frame
+
+
+class FakeTicker:
+    """
+    Stand-in for yf.Ticker, patched in with mock.patch('yfinance.Ticker', FakeTicker).
+
+    History requests return closes as bars from the requested start; subclasses
+    change the bars or the info, or record the requests.
+    """
+
+    closes = [10.0, 10.2, 10.1, 10.3]
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        return {'longName': self.symbol}
+
+    def history(self, start=None, end=None, **kwargs):
+        return make_history(self.closes, start=start)
@@ -0,0 +1,102 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pyarrow.ipc
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import Portfolio, Stock, StockPrice, TechnicalIndicator
+from stocks.services.columnar import record_columns
+
+
+START = date(2024, 1, 1)  # 19723 days after 1970-01-01
+
+
+class RecordColumnTests(SimpleTestCase):
+    def test_columns(self):
+        rows = [
+            {'date': '2024-01-01', 'close': Decimal('10.5000'), 'volume': 100, 'holdings': [{'symbol': 'A'}]},
+            {'date': START + timedelta(days=1), 'close': None, 'volume': 250.4, 'holdings': []},
+        ]
+
+        columns = record_columns(rows, passthrough={'holdings'})
+
+        self.assertEqual(columns, {
+            'date': [19723, 19724],
+            'close': [10.5, None],
+            'volume': [100, 250],
+            'holdings': [[{'symbol': 'A'}], []],
+        })
+        self.assertEqual(record_columns([]), {})
+
+
+class ColumnarAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234')
+        self.client.force_authenticate(self.user)
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        self.start = date.today() - timedelta(days=199)
+        StockPrice.objects.bulk_create([
+            StockPrice(stock=self.stock, date=self.start + timedelta(days=i), open=10, high=11, low=9, close=10 + i,
+                       volume=1000)
+            for i in range(200)
+        ])
+
+    def test_columns_json_is_smaller(self):
+        rows = self.client.get('/api/stocks/THYAO/prices/?downsample=none')
+        columns = self.client.get('/api/stocks/THYAO/prices/?downsample=none&format=columns')
+
+        self.assertEqual(columns['Content-Type'], 'application/vnd.bortal.columns+json; charset=utf-8')
+        self.assertIn('Accept', columns['Vary'])
+        data = json.loads(columns.content)['data']
+        self.assertEqual(list(data), ['date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume'])
+        self.assertEqual(data['date'][0], (self.start - date(1970, 1, 1)).days)
+        self.assertEqual(data['close'][:2], [10.0, 11.0])
+        self.assertEqual(data['volume'][0], 1000)
+        self.assertLess(len(columns.content) * 3, len(rows.content))
+
+    def test_arrow_by_accept_header(self):
+        response = self.client.get(
+            '/api/stocks/THYAO/prices/?downsample=none', HTTP_ACCEPT='application/vnd.apache.arrow.stream'
+        )
+
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.num_rows, 200)
+        self.assertEqual(table.column('date')[0].as_py(), self.start)
+        envelope = json.loads(table.schema.metadata[b'envelope'])
+        self.assertEqual((envelope['symbol'], envelope['stats']['total_points']), ('THYAO', 200))
+
+    def test_detail_and_technicals(self):
+        detail = json.loads(self.client.get('/api/stocks/THYAO/?range=1m&format=columns').content)['data']
+        self.assertEqual(detail['symbol'], 'THYAO')
+        self.assertEqual(len(detail['price_history']['close']), 31)
+
+        TechnicalIndicator.objects.create(stock=self.stock, date=date.today(), rsi_14=Decimal('55.5'), ma_20=None)
+        technicals = json.loads(
+            self.client.get('/api/stocks/THYAO/technical/?indicators=rsi_14,ma_20&format=columns').content
+        )
+        self.assertEqual(technicals['data'], {
+            'date': [(date.today() - date(1970, 1, 1)).days], 'rsi_14': [55.5], 'ma_20': [None]
+        })
+
+    def test_portfolio_performance(self):
+        day = {'total_value': 110.0, 'total_cost': 100.0, 'profit_loss': 10.0, 'profit_loss_percent': 10.0,
+               'holdings': [{'symbol': 'THYAO', 'value': 110.0}]}
+        performance = {
+            'metrics': {'end_value': 110.0},
+            'daily_performance': [dict(day, date='2024-01-01'), dict(day, date='2024-01-02')],
+        }
+        portfolio = Portfolio.objects.create(user=self.user, name='Main')
+
+        with mock.patch.object(Portfolio, 'system_fields', {'performance': performance}, create=True):
+            response = self.client.get(f'/api/portfolios/{portfolio.id}/performance/?format=columns')
+        data = json.loads(response.content)['data']
+
+        self.assertEqual(data['metrics'], {'end_value': 110.0})
+        self.assertEqual(data['daily_performance']['date'], [19723, 19724])
+        self.assertEqual(data['daily_performance']['holdings'][0], [{'symbol': 'THYAO', 'value': 110.0}])
@@ -0,0 +1,123 @@
+import io
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from stocks.models import Stock, StockPrice
+from stocks.services.copy_backfill import CopyStager, MergeResult, copy_supported, csv_chunks
+from stocks.services.partitioning import convert_to_partitioned
+from stocks.services.price_storage import stock_price_stager
+
+
+class CopyBackfillTests(SimpleTestCase):
+    def test_csv_chunks_write_nulls_as_empty_fields(self):
+        frame = pd.DataFrame({'stock_id': [1, 1, 2], 'date': ['2024-01-02', '2024-01-03', '2024-01-02'],
+                              'close': [1.5, np.nan, 2.0]})
+        chunks = list(csv_chunks(frame, chunk_rows=2))
+
+        self.assertEqual(chunks, ['1,2024-01-02,1.5\n1,2024-01-03,\n', '2,2024-01-02,2.0\n'])
+
+    def test_merge_statement_skips_unchanged_rows(self):
+        stager = stock_price_stager()
+        sql = stager.merge_sql()
+
+        self.assertEqual(stager.columns[:2], ['stock_id', 'date'])
+        self.assertIn('SELECT DISTINCT ON ("stock_id", "date")', sql)
+        self.assertIn('ON CONFLICT ("stock_id", "date") DO UPDATE', sql)
+        self.assertIn('IS DISTINCT FROM', sql)
+        self.assertEqual(CopyStager(StockPrice, 'stock', ['close']).staging_table, 'stocks_stockprice_staging')
+
+    def test_copy_needs_postgresql(self):
+        self.assertEqual(copy_supported(), connection.vendor == 'postgresql')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY backfills need PostgreSQL')
+class CopyMergeTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        self.stager = stock_price_stager()
+        self.addCleanup(self.stager.close)
+
+    def bars(self, closes, start=date(2024, 1, 1)):
+        return pd.DataFrame({
+            'stock_id': self.stock.id, 'date': [start + timedelta(days=i) for i in range(len(closes))],
+            'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': 1000,
+        })
+
+    def indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [StockPrice._meta.db_table])
+            return sorted(name for name, in cursor.fetchall())
+
+    def test_first_backfill_rebuilds_indexes(self):
+        indexes = self.indexes()
+        self.stager.add(self.bars([10.0, 11.0, 12.0]))
+
+        # An empty target always takes the drop-and-rebuild path
+        results = self.stager.merge()
+
+        self.assertEqual(results, {self.stock.id: MergeResult(3, 0, 0, date(2024, 1, 1))})
+        self.assertEqual(StockPrice.objects.filter(stock=self.stock).count(), 3)
+        self.assertEqual(self.indexes(), indexes)
+
+    def test_merge_counts(self):
+        self.stager.add(self.bars([10.0, 11.0]))
+        self.stager.merge()
+
+        self.stager.add(self.bars([10.0, 11.5, 12.0]))
+        results = self.stager.merge(rebuild_indexes=False)
+
+        self.assertEqual(results, {self.stock.id: MergeResult(1, 1, 1, date(2024, 1, 2))})
+        self.assertEqual(
+            [float(close) for close in StockPrice.objects.order_by('date').values_list('close', flat=True)],
+            [10.0, 11.5, 12.0]
+        )
+
+    def test_merge_into_partitioned_table(self):
+        convert_to_partitioned(StockPrice)
+        self.stager.add(self.bars([10.0, 11.0]))
+        self.stager.merge()
+
+        self.stager.add(self.bars([10.0, 11.5, 12.0]))
+
+        self.assertEqual(self.stager.merge(), {self.stock.id: MergeResult(1, 1, 1, date(2024, 1, 2))})
+
+
+def load_synthetic(*args):
+    call_command('create_synthetic_stocks', '--count', '2', stdout=io.StringIO())
+    stderr = io.StringIO()
+    call_command(
+        'load_indices_stock_data', '--provider', 'synthetic', '--skip-indices',
+        '--skip-technicals', '--no-cache', '--no-report', '--days', '30', '--backfill', *args,
+        stdout=io.StringIO(), stderr=stderr
+    )
+    return stderr.getvalue()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY backfills need PostgreSQL')
+class LoaderBackfillTests(TestCase):
+    def test_backfill_seeds_an_empty_database(self):
+        self.assertEqual(load_synthetic(), '')
+        bars = StockPrice.objects.filter(stock__symbol='SYN00001').count()
+        self.assertGreaterEqual(bars, 20)
+
+        # A second run over the same days stages the bars again and changes nothing
+        load_synthetic()
+        self.assertEqual(StockPrice.objects.filter(stock__symbol='SYN00001').count(), bars)
+
+
+class BackfillFallbackTests(TestCase):
+    def test_loader_falls_back_to_bulk_upserts(self):
+        with mock.patch(
+            'stocks.management.commands.load_indices_stock_data.copy_supported', return_value=False
+        ):
+            stderr = load_synthetic()
+
+        self.assertIn('--backfill needs PostgreSQL', stderr)
+        self.assertEqual(Stock.objects.count(), 2)
+        self.assertGreaterEqual(StockPrice.objects.filter(stock__symbol='SYN00001').count(), 20)
@@ -0,0 +1,110 @@
+import io
+from datetime import date, timedelta
+from unittest import mock
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import CorporateAction, IndicatorState, Stock, StockPrice
+from stocks.services.corporate_actions import adjust_prices, store_corporate_actions
+from stocks.services.price_storage import prepare_price_frame, upsert_stock_prices
+from stocks.tests.helpers import FakeTicker, make_history
+
+
+class CorporateActionTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+
+    def test_yahoo_split_adjustment_is_undone(self):
+        # 2-for-1 split on the third bar; Yahoo reports earlier bars halved
+        frame = prepare_price_frame(make_history([10.0, 10.5, 11.0], splits=[0.0, 0.0, 2.0]))
+
+        self.assertEqual(list(frame['close']), [20.0, 21.0, 11.0])
+        self.assertEqual(list(frame['volume']), [500, 500, 1000])
+
+    def test_events_become_cumulative_factors(self):
+        IndicatorState.objects.create(stock=self.stock, last_date=date(2024, 1, 3))
+        hist = make_history([10.0, 10.0, 5.0, 5.0, 4.8], dividends=[0, 0, 0, 0, 0.5], splits=[0, 0, 2.0, 0, 0])
+
+        self.assertEqual(store_corporate_actions(self.stock, hist), 2)
+        self.assertEqual(store_corporate_actions(self.stock, hist), 0)
+        self.assertFalse(IndicatorState.objects.filter(stock=self.stock).exists())
+
+        split = CorporateAction.objects.get(action_type='split')
+        dividend = CorporateAction.objects.get(action_type='dividend')
+        self.assertAlmostEqual(dividend.factor, 0.9)
+        self.assertAlmostEqual(split.price_factor, 0.45)
+        self.assertAlmostEqual(split.volume_factor, 2.0)
+
+        upsert_stock_prices(self.stock, hist)
+        stored = pd.DataFrame.from_records(
+            list(StockPrice.objects.order_by('date').values_list('stock_id', 'date', 'close', 'volume')),
+            columns=['stock_id', 'date', 'close', 'volume']
+        )
+        adjusted = adjust_prices(stored)
+        self.assertEqual(list(stored['close'].astype(float)), [20.0, 20.0, 5.0, 5.0, 4.8])
+        self.assertEqual([round(c, 4) for c in adjusted['close']], [9.0, 9.0, 4.5, 4.5, 4.8])
+        self.assertEqual(list(adjusted['volume']), [1000, 1000, 1000, 1000, 1000])
+
+
+class SplitTicker(FakeTicker):
+    requested_starts = []
+
+    def history(self, start=None, end=None, **kwargs):
+        SplitTicker.requested_starts.append(start)
+        # Yahoo's split-adjusted prices with a 2:1 split on the third bar
+        return make_history([50.0, 50.0, 50.0, 51.0], splits=[0.0, 0.0, 2.0, 0.0], start=start)
+
+
+class AdjustedHistoryRebuildTests(TestCase):
+    def test_adjusted_history_is_refetched_once(self):
+        stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari', prices_as_traded=False)
+        first = date.today() - timedelta(days=60)
+        first -= timedelta(days=first.weekday())  # A business day, as the fake history starts on one
+        StockPrice.objects.create(stock=stock, date=first, open=50, high=50, low=50, close=50, volume=2000)
+        StockPrice.objects.create(
+            stock=stock, date=date.today() - timedelta(days=1), open=51, high=51, low=51, close=51, volume=1000
+        )
+
+        def load():
+            SplitTicker.requested_starts = []
+            with mock.patch('yfinance.Ticker', SplitTicker):
+                call_command(
+                    'load_indices_stock_data', '--load-indices', '--skip-indices', '--no-cache', '--incremental',
+                    '--skip-technicals', '--skip-fundamentals', '--days', '10', '--rate-limit', '1000',
+                    stdout=io.StringIO(), stderr=io.StringIO()
+                )
+            return SplitTicker.requested_starts
+
+        # The whole stored history, not the incremental delta, with its corporate actions
+        self.assertEqual(load(), [first.isoformat()])
+        stock.refresh_from_db()
+        self.assertTrue(stock.prices_as_traded)
+        self.assertEqual(CorporateAction.objects.get(stock=stock).action_type, 'split')
+        self.assertEqual(StockPrice.objects.get(stock=stock, date=first).close, 100)
+
+        self.assertGreater(load()[0], first.isoformat())
+
+
+class AdjustedPriceAPITests(APITestCase):
+    def test_prices_adjusted_by_default(self):
+        self.client.force_authenticate(get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234'))
+        stock = Stock.objects.create(symbol='AKBNK', name='Akbank')
+        hist = make_history([10.0, 10.0, 5.0], splits=[0, 0, 2.0], spread=0)
+        store_corporate_actions(stock, hist)
+        upsert_stock_prices(stock, hist)
+
+        raw = self.client.get('/api/stocks/AKBNK/prices/?adjusted=false').data
+        adjusted = self.client.get('/api/stocks/AKBNK/prices/').data
+
+        self.assertEqual([float(bar['close']) for bar in raw['data']], [20.0, 20.0, 5.0])
+        self.assertEqual([float(bar['adjusted_close']) for bar in raw['data']], [10.0, 10.0, 5.0])
+        self.assertEqual([float(bar['close']) for bar in adjusted['data']], [10.0, 10.0, 5.0])
+        self.assertEqual(adjusted['stats']['max_price'], 10.0)
+
+        detail = self.client.get('/api/stocks/AKBNK/?range=5y&interval=1d').data['data']
+        self.assertTrue(detail['price_adjusted'])
+        self.assertEqual([float(bar['close']) for bar in detail['price_history']], [10.0, 10.0, 5.0])
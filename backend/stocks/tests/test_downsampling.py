@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import Stock, StockPrice
+from stocks.services.downsampling import downsample_prices, lttb_indices, ohlc_buckets
+
+
+def price_frame(closes, start=date(2020, 1, 1)):
+    closes = np.asarray(closes, dtype='float64')
+    return pd.DataFrame({
+        'date': [start + timedelta(days=i) for i in range(len(closes))],
+        'open': closes,
+        'high': closes + 1,
+        'low': closes - 1,
+        'close': closes,
+        'adjusted_close': closes,
+        'volume': np.full(len(closes), 10.0),
+    })
+
+
+class DownsamplingTests(SimpleTestCase):
+    def test_lttb_keeps_ends_and_spikes(self):
+        y = np.sin(np.linspace(0, 20, 1000))
+        y[437] = 5.0
+
+        kept = lttb_indices(np.arange(1000), y, 50)
+
+        self.assertEqual(len(kept), 50)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertIn(437, kept)
+        self.assertTrue((np.diff(kept) > 0).all())
+
+    def test_short_series_is_unchanged(self):
+        self.assertEqual(list(lttb_indices(np.arange(5), np.arange(5), 10)), [0, 1, 2, 3, 4])
+
+    def test_ohlc_buckets_keep_extremes(self):
+        frame = price_frame(np.linspace(10, 20, 100))
+        frame.loc[33, 'high'] = 99.0
+        frame.loc[66, 'low'] = 0.5
+
+        candles = ohlc_buckets(frame, 10)
+
+        self.assertEqual(len(candles), 10)
+        self.assertEqual(candles['high'].max(), 99.0)
+        self.assertEqual(candles['low'].min(), 0.5)
+        self.assertEqual(candles['volume'].sum(), 1000.0)
+        self.assertEqual(candles['open'].iloc[0], 10.0)
+        self.assertEqual(candles['close'].iloc[-1], 20.0)
+        self.assertEqual(candles['date'].iloc[1], frame['date'].iloc[10])
+
+    def test_modes(self):
+        frame = price_frame(np.arange(600))
+
+        self.assertEqual(len(downsample_prices(frame, 100, 'lttb')), 100)
+        self.assertEqual(len(downsample_prices(frame, 100, 'ohlc')), 100)
+        self.assertEqual(len(downsample_prices(frame, 100, 'none')), 600)
+
+
+class DownsampledPriceAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234'))
+        stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        frame = price_frame(100 + 10 * np.sin(np.linspace(0, 30, 1200)))
+        StockPrice.objects.bulk_create([
+            StockPrice(
+                stock=stock, date=row.date, open=round(row.open, 4), high=round(row.high, 4), low=round(row.low, 4),
+                close=round(row.close, 4), volume=int(row.volume)
+            )
+            for row in frame.itertuples()
+        ])
+
+    def test_lttb_by_default(self):
+        # Stock, prices and adjustment factors
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/stocks/THYAO/prices/?points=120').data
+
+        self.assertEqual(len(response['data']), 120)
+        self.assertEqual(response['stats']['total_points'], 1200)
+        self.assertEqual(response['stats']['downsample'], 'lttb')
+        self.assertEqual(response['stats']['start_date'], '2020-01-01')
+        self.assertEqual(response['data'][0]['date'], '2020-01-01')
+        self.assertEqual(set(response['data'][0]), {'date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume'})
+
+    def test_ohlc_keeps_the_range(self):
+        response = self.client.get('/api/stocks/THYAO/prices/?downsample=ohlc&points=60').data
+
+        self.assertEqual(len(response['data']), 60)
+        self.assertEqual(max(float(bar['high']) for bar in response['data']), response['stats']['max_price'])
+        self.assertEqual(min(float(bar['low']) for bar in response['data']), response['stats']['min_price'])
+
+    def test_invalid_mode(self):
+        self.assertEqual(self.client.get('/api/stocks/THYAO/prices/?downsample=every').status_code, 400)
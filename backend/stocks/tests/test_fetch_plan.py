@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from django.test import TestCase
+
+from stocks.models import Stock, StockPrice
+from stocks.services.fetch_plan import latest_bar_dates, plan_fetch_starts
+
+
+class FetchPlanTests(TestCase):
+    def setUp(self):
+        self.complete = Stock.objects.create(symbol='AKBNK', name='Akbank')
+        self.gapped = Stock.objects.create(symbol='GARAN', name='Garanti')
+        self.empty = Stock.objects.create(symbol='ISCTR', name='Is Bankasi')
+
+        start = date(2024, 1, 1)
+        for offset in range(60):
+            day = start + timedelta(days=offset)
+            self._bar(self.complete, day)
+            # GARAN is missing three weeks in the middle of its history
+            if not 20 <= offset < 41:
+                self._bar(self.gapped, day)
+
+    def _bar(self, stock, day):
+        StockPrice.objects.create(stock=stock, date=day, open=1, high=1, low=1, close=1, volume=1)
+
+    def test_latest_bar_dates(self):
+        latest = latest_bar_dates(StockPrice, 'stock')
+        self.assertEqual(latest[self.complete.id], date(2024, 2, 29))
+        self.assertNotIn(self.empty.id, latest)
+
+    def test_plan_uses_overlap_gaps_and_default(self):
+        default_start = date(2023, 12, 1)
+        starts = plan_fetch_starts(
+            StockPrice, 'stock',
+            [self.complete.id, self.gapped.id, self.empty.id],
+            default_start, overlap_days=3
+        )
+
+        self.assertEqual(starts[self.complete.id], date(2024, 2, 26))
+        self.assertEqual(starts[self.gapped.id], date(2024, 1, 21))
+        self.assertEqual(starts[self.empty.id], default_start)
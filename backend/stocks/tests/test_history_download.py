@@ -0,0 +1,47 @@
+from datetime import date
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from stocks.services.history_download import split_download_frame, download_histories
+
+
+def make_wide_frame(tickers, days=3):
+    """Build a frame shaped like yf.download(group_by='ticker')"""
+    dates = pd.date_range('2024-01-01', periods=days, freq='B')
+    columns = pd.MultiIndex.from_product([tickers, ['Open', 'High', 'Low', 'Close', 'Volume']])
+    return pd.DataFrame(1.0, index=dates, columns=columns)
+
+
+class HistoryDownloadTests(SimpleTestCase):
+    def test_split_download_frame(self):
+        data = make_wide_frame(['AKBNK.IS', 'GARAN.IS'])
+        data.loc[:, 'GARAN.IS'] = float('nan')
+
+        histories = split_download_frame(data, ['AKBNK.IS', 'GARAN.IS', 'ISCTR.IS'])
+
+        self.assertEqual(list(histories), ['AKBNK.IS'])
+        self.assertEqual(list(histories['AKBNK.IS'].columns), ['Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertEqual(histories['AKBNK.IS'].index.name, 'Date')
+
+    @mock.patch('stocks.services.history_download.time.sleep')
+    def test_missing_symbols_are_retried_individually(self, _sleep):
+        start = date(2024, 1, 1)
+        batches = []
+
+        def fake_batch(tickers, start, end):
+            batches.append(list(tickers))
+            return split_download_frame(make_wide_frame([t for t in tickers if t != 'B']), tickers)
+
+        def fake_single(ticker, start, end):
+            return make_wide_frame(['B'])['B'] if ticker == 'B' else pd.DataFrame()
+
+        histories, failed = download_histories(
+            {'A': start, 'B': start, 'C': start}, date(2024, 2, 1), batch_size=2,
+            download_batch=fake_batch, download_single=fake_single
+        )
+
+        self.assertEqual(batches, [['A', 'B'], ['C']])
+        self.assertEqual(sorted(histories), ['A', 'B', 'C'])
+        self.assertEqual(failed, [])
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from stocks.services.ingest_workers import run_pipeline
+from stocks.services.rate_limiter import TokenBucket, call_with_backoff, is_throttle_error
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_bucket_blocks_once_empty(self):
+        bucket = TokenBucket(rate=1000, capacity=2)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertGreater(bucket.acquire(), 0.0)
+
+    @mock.patch('stocks.services.rate_limiter.time.sleep')
+    def test_backoff_retries_only_throttling(self, sleep):
+        calls = []
+
+        def throttled_twice():
+            calls.append(1)
+            if len(calls) < 3:
+                raise Exception("Too Many Requests. Rate limited. Try after a while.")
+            return 'ok'
+
+        self.assertEqual(call_with_backoff(throttled_twice), 'ok')
+        self.assertEqual(sleep.call_count, 2)
+
+        with self.assertRaises(KeyError):
+            call_with_backoff(mock.Mock(side_effect=KeyError('symbol')))
+
+    def test_throttle_detection(self):
+        response_error = Exception('Client Error')
+        response_error.response = mock.Mock(status_code=429)
+        not_found = Exception('429 Client Error')
+        not_found.response = mock.Mock(status_code=404)
+
+        self.assertTrue(is_throttle_error(response_error))
+        self.assertTrue(is_throttle_error(Exception('429 Too Many Requests')))
+        self.assertTrue(is_throttle_error(Exception('HTTP Error 429: for url')))
+        self.assertTrue(is_throttle_error(Exception('Unexpected status code: 429')))
+        self.assertFalse(is_throttle_error(not_found))
+        self.assertFalse(is_throttle_error(Exception('No data for 429 of 500 symbols')))
+        self.assertFalse(is_throttle_error(KeyError('ISGYO429')))
+
+
+class RunPipelineTests(SimpleTestCase):
+    def test_every_item_is_stored_with_payload_or_error(self):
+        stored = {}
+
+        def fetch(item):
+            if item == 3:
+                raise ValueError('boom')
+            return item * 10
+
+        def store(item, payload, error):
+            stored[item] = error if error is not None else payload
+
+        run_pipeline(range(6), fetch, store, workers=3, queue_size=1)
+
+        self.assertEqual({k: v for k, v in stored.items() if k != 3}, {0: 0, 1: 10, 2: 20, 4: 40, 5: 50})
+        self.assertIsInstance(stored[3], ValueError)
@@ -0,0 +1,62 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from stocks.models import IngestJob, IngestRun, Stock, StockPrice
+from stocks.tests.helpers import FakeTicker
+
+
+class FlakyTicker(FakeTicker):
+    failing = set()
+    history_requests = []
+
+    @property
+    def info(self):
+        return {'longName': self.symbol, 'marketCap': 1e9}
+
+    def history(self, start=None, end=None, **kwargs):
+        FlakyTicker.history_requests.append(self.symbol)
+        if self.symbol in FlakyTicker.failing:
+            raise ConnectionError('connection reset')
+        return super().history(start=start, end=end, **kwargs)
+
+
+class ResumeTests(TestCase):
+    def run_command(self, *args):
+        stdout = io.StringIO()
+        with mock.patch('yfinance.Ticker', FlakyTicker):
+            call_command(
+                'load_indices_stock_data', '--load-indices', '--skip-indices', '--no-cache',
+                '--rate-limit', '1000', *args, stdout=stdout, stderr=io.StringIO()
+            )
+        return stdout.getvalue()
+
+    def test_resume_retries_only_failed_stages(self):
+        for symbol in ('THYAO', 'AKBNK', 'GARAN'):
+            Stock.objects.create(symbol=symbol, name=symbol)
+        FlakyTicker.failing = {'AKBNK.IS'}
+        FlakyTicker.history_requests = []
+
+        output = self.run_command('--skip-technicals', '--days', '10')
+        run = IngestRun.objects.get()
+        self.assertEqual(run.status, 'failed')
+        self.assertEqual(run.jobs.get(symbol='AKBNK', stage='prices').status, 'failed')
+        self.assertIn(f'--resume {run.id}', output)
+
+        FlakyTicker.failing = set()
+        FlakyTicker.history_requests = []
+        self.run_command('--resume', str(run.id))
+
+        # Options come from the original run and only the failed stock is fetched again
+        self.assertEqual(FlakyTicker.history_requests, ['AKBNK.IS'])
+        self.assertFalse(IngestJob.objects.filter(stage='technicals').exists())
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(StockPrice.objects.filter(stock__symbol='AKBNK').count(), len(FakeTicker.closes))
+
+    def test_unknown_run(self):
+        stderr = io.StringIO()
+        call_command('load_indices_stock_data', '--resume', 'not-a-run', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("Run 'not-a-run' not found", stderr.getvalue())
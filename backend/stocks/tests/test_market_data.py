@@ -0,0 +1,82 @@
+import io
+from datetime import date
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from stocks.models import StockFundamental, StockPrice, Stock
+from stocks.services.history_download import download_histories
+from stocks.services.market_data import SyntheticProvider, YahooProvider, get_provider
+from stocks.services.rate_limiter import is_throttle_error
+
+
+class SyntheticProviderTests(SimpleTestCase):
+    def test_history_is_deterministic_for_any_range(self):
+        provider = SyntheticProvider(seed=1)
+        wide = provider.ticker('THYAO.IS').history(start='2010-01-01', end='2020-01-01')
+        narrow = SyntheticProvider(seed=1).ticker('THYAO.IS').history(start='2015-03-02', end='2015-04-01')
+
+        self.assertEqual(len(wide), 2608)
+        self.assertTrue(narrow.equals(wide.loc['2015-03-02':'2015-03-31']))
+        self.assertTrue((wide['High'] >= wide[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((wide['Low'] <= wide[['Open', 'Close']].min(axis=1)).all())
+
+        other = provider.ticker('AKBNK.IS').history(start='2015-03-02', end='2015-04-01')
+        self.assertFalse(other['Close'].equals(narrow['Close']))
+
+    def test_info_and_news(self):
+        provider = SyntheticProvider()
+        info = provider.ticker('GARAN.IS').info
+        self.assertEqual(info, provider.info('GARAN.IS'))
+        self.assertGreater(info['marketCap'], 0)
+        self.assertIn('sector', info)
+
+        news = provider.news('GARAN.IS', today=date(2024, 5, 10))
+        self.assertEqual(news, provider.news('GARAN.IS', today=date(2024, 5, 10)))
+        self.assertTrue(all(item['title'] and item['providerPublishTime'] for item in news))
+
+    def test_injected_throttling_is_retryable(self):
+        provider = SyntheticProvider(throttle_rate=0.5)
+        errors = []
+        for _ in range(40):
+            try:
+                provider.ticker('THYAO.IS').info
+            except Exception as e:
+                errors.append(e)
+
+        self.assertEqual(len(errors), provider.throttled)
+        self.assertTrue(10 < len(errors) < 30)
+        self.assertTrue(all(is_throttle_error(e) for e in errors))
+
+    def test_batch_download(self):
+        provider = SyntheticProvider()
+        histories, failed = download_histories(
+            {'THYAO.IS': date(2024, 1, 1), 'AKBNK.IS': date(2024, 1, 1)}, date(2024, 2, 1),
+            provider=provider, pause=0
+        )
+        self.assertEqual(failed, [])
+        self.assertEqual(len(histories['THYAO.IS']), 23)
+        self.assertEqual(provider.requests, 1)
+
+    def test_provider_selection(self):
+        self.assertIsInstance(get_provider('yahoo'), YahooProvider)
+        with override_settings(MARKET_DATA_PROVIDER='synthetic', MARKET_DATA_SYNTHETIC={'seed': 7}):
+            self.assertEqual(get_provider().seed, 7)
+        with self.assertRaises(ValueError):
+            get_provider('bloomberg')
+
+
+class SyntheticIngestTests(TestCase):
+    def test_loader_runs_offline(self):
+        call_command('create_synthetic_stocks', '--count', '3', stdout=io.StringIO())
+        # Without --skip-reference: syncing the real listings would deactivate the synthetic stocks
+        call_command(
+            'load_indices_stock_data', '--provider', 'synthetic', '--skip-indices',
+            '--skip-technicals', '--no-cache', '--no-report', '--days', '30',
+            stdout=io.StringIO(), stderr=io.StringIO()
+        )
+
+        self.assertEqual(Stock.objects.filter(is_active=True).count(), 3)
+        self.assertEqual(StockFundamental.objects.count(), 3)
+        self.assertGreaterEqual(StockPrice.objects.filter(stock__symbol='SYN00001').count(), 20)
+        self.assertTrue(Stock.objects.get(symbol='SYN00002').name.startswith('SYN00002'))
@@ -0,0 +1,93 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import CorporateAction, Index, Sector, Stock, StockIndex, StockPrice
+from stocks.services.market_movers import market_movers
+from stocks.services.quotes import refresh_stock_quotes
+
+
+# Friday and the following Monday
+FRIDAY, MONDAY = date(2024, 1, 5), date(2024, 1, 8)
+
+
+def add_stock(symbol, friday, monday, sector=None):
+    stock = Stock.objects.create(symbol=symbol, name=symbol, sector=sector)
+    for day, close in ((FRIDAY, friday), (MONDAY, monday)):
+        if close is not None:
+            StockPrice.objects.create(
+                stock=stock, date=day, open=close, high=close, low=close, close=close, volume=100
+            )
+    return stock
+
+
+class MarketMoversTests(TestCase):
+    def setUp(self):
+        banks = Sector.objects.create(name='Banks')
+        self.up = add_stock('UP', 10.0, 12.0, sector=banks)
+        self.down = add_stock('DOWN', 10.0, 9.0)
+        self.flat = add_stock('FLAT', 10.0, 10.0)
+        self.small = add_stock('SMALL', 10.0, 10.5, sector=banks)
+        # No bar in the latest session, so not counted
+        add_stock('HALTED', 10.0, None)
+        refresh_stock_quotes()
+
+    def test_movers_across_a_weekend(self):
+        movers = market_movers(limit=2)
+
+        self.assertEqual(movers.session, MONDAY)
+        self.assertEqual([m.symbol for m in movers.gainers], ['UP', 'SMALL'])
+        self.assertEqual([m.symbol for m in movers.losers], ['DOWN', 'FLAT'])
+        self.assertAlmostEqual(movers.gainers[0].change_percent, 20.0)
+        self.assertEqual((movers.advancing, movers.declining, movers.unchanged), (2, 1, 1))
+
+    def test_split_on_session_day(self):
+        # 2-for-1 split: 10 before is 5 after, so 5.5 is +10%
+        StockPrice.objects.filter(stock=self.flat, date=MONDAY).update(close=5.5)
+        CorporateAction.objects.create(
+            stock=self.flat, date=MONDAY, action_type='split', value=2, factor=0.5, price_factor=0.5,
+            volume_factor=2.0
+        )
+
+        movers = market_movers(limit=1)
+
+        self.assertEqual([m.symbol for m in movers.gainers], ['UP'])
+        self.assertEqual((movers.advancing, movers.declining, movers.unchanged), (3, 1, 0))
+
+    def test_filter_by_index_and_sector(self):
+        index = Index.objects.create(name='BIST30', display_name='BIST 30')
+        StockIndex.objects.create(stock=self.down, index=index)
+        StockIndex.objects.create(stock=self.small, index=index)
+
+        by_index = market_movers(index='BIST30')
+        by_sector = market_movers(sector='Banks')
+
+        self.assertEqual([m.symbol for m in by_index.gainers], ['SMALL', 'DOWN'])
+        self.assertEqual((by_index.advancing, by_index.declining), (1, 1))
+        self.assertEqual([m.symbol for m in by_sector.gainers], ['UP', 'SMALL'])
+
+    def test_no_prices(self):
+        StockPrice.objects.all().delete()
+        Stock.objects.all().delete()
+
+        self.assertIsNone(market_movers())
+
+
+class DashboardMoversTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234'))
+        add_stock('UP', 10.0, 11.0)
+        add_stock('DOWN', 10.0, 9.5)
+        refresh_stock_quotes()
+
+    def test_market_overview(self):
+        overview = self.client.get('/api/dashboard/?limit=1').data['data']['market_overview']
+
+        self.assertEqual([m['symbol'] for m in overview['top_gainers']], ['UP'])
+        self.assertEqual([m['symbol'] for m in overview['top_losers']], ['DOWN'])
+        self.assertEqual(overview['market_stats'], {'advancing': 1, 'declining': 1, 'unchanged': 0, 'total_stocks': 2})
+        self.assertEqual(overview['session'], MONDAY.isoformat())
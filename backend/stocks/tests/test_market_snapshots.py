@@ -0,0 +1,136 @@
+import io
+from datetime import date, timedelta
+from unittest import mock
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import MarketSnapshot, Sector, Stock, StockFundamental, StockPrice
+from stocks.services.market_snapshots import compute_snapshots, refresh_market_snapshots
+from stocks.tests.helpers import FakeTicker
+
+
+DAYS = [date(2024, 1, 1) + timedelta(days=i) for i in range(4)]
+
+
+def price_frame(closes_by_stock):
+    rows = [
+        (stock_id, day, close, close, close, 100.0 * (i + 1))
+        for stock_id, closes in closes_by_stock.items()
+        for i, (day, close) in enumerate(zip(DAYS, closes))
+    ]
+    return pd.DataFrame(rows, columns=['stock_id', 'date', 'high', 'low', 'close', 'volume'])
+
+
+class ComputeSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.prices = price_frame({
+            'A': [10.0, 11.0, 12.0, 12.0],
+            'B': [20.0, 19.0, 21.0, 20.0],
+            'C': [5.0, 5.0, 5.0, 4.0],
+        })
+        self.memberships = pd.DataFrame([
+            ('A', 'market', ''), ('B', 'market', ''), ('C', 'market', ''),
+            ('A', 'sector', 'Banks'), ('B', 'sector', 'Banks'), ('C', 'index', 'BIST30'),
+        ], columns=['stock_id', 'scope', 'name'])
+
+    def test_breadth_and_changes(self):
+        caps = pd.DataFrame([('A', DAYS[0], 100.0), ('B', DAYS[0], 300.0)], columns=['stock_id', 'date', 'market_cap'])
+
+        snapshots = compute_snapshots(self.prices, self.memberships, caps).set_index(['scope', 'name', 'date'])
+
+        market = snapshots.loc[('market', '', DAYS[1])]
+        self.assertEqual((market['advancing'], market['declining'], market['unchanged']), (1, 1, 1))
+        self.assertEqual((market['up_volume'], market['down_volume']), (200, 200))
+        self.assertEqual((market['new_highs'], market['new_lows']), (1, 1))
+
+        banks = snapshots.loc[('sector', 'Banks', DAYS[1])]
+        self.assertAlmostEqual(banks['equal_weighted_change'], (10.0 - 5.0) / 2)
+        self.assertAlmostEqual(banks['cap_weighted_change'], (100 * 10.0 - 300 * 5.0) / 400)
+
+        # No caps for the index members, and no row for the first day (no previous close)
+        self.assertTrue(pd.isna(snapshots.loc[('index', 'BIST30', DAYS[3])]['cap_weighted_change']))
+        self.assertNotIn(('market', '', DAYS[0]), snapshots.index)
+
+    def test_new_highs_against_prior_bars_only(self):
+        snapshots = compute_snapshots(self.prices, self.memberships, start=DAYS[3])
+        market = snapshots.set_index('scope').loc['market']
+
+        self.assertEqual(market['date'], DAYS[3])
+        # A repeats its high, B is below its high, C makes a new low
+        self.assertEqual((market['new_highs'], market['new_lows']), (0, 1))
+
+
+class RefreshSnapshotTests(TestCase):
+    def setUp(self):
+        banks = Sector.objects.create(name='Banks', display_name='Banks')
+        self.stock = Stock.objects.create(symbol='AKBNK', name='Akbank', sector=banks)
+        for day, close in zip(DAYS[:3], [10.0, 11.0, 12.1]):
+            StockPrice.objects.create(
+                stock=self.stock, date=day, open=close, high=close, low=close, close=close, volume=1000
+            )
+        StockFundamental.objects.create(stock=self.stock, date=DAYS[0], market_cap=1000000)
+
+    def test_refresh_is_incremental(self):
+        self.assertEqual(refresh_market_snapshots(), 4)  # market and sector, two days
+
+        StockPrice.objects.create(stock=self.stock, date=DAYS[3], open=12.1, high=12.1, low=12.1, close=12.1, volume=1)
+        # The latest stored day is recomputed with the new one
+        self.assertEqual(refresh_market_snapshots(), 4)
+
+        snapshot = MarketSnapshot.objects.get(scope='sector', name='Banks', date=DAYS[2])
+        self.assertAlmostEqual(snapshot.equal_weighted_change, 10.0)
+        self.assertAlmostEqual(snapshot.cap_weighted_change, 10.0)
+        self.assertEqual(snapshot.unchanged, 0)
+        self.assertEqual(MarketSnapshot.objects.get(scope='market', date=DAYS[3]).unchanged, 1)
+
+
+class LoaderSnapshotTests(TestCase):
+    def test_loader_recomputes_from_the_fetch_start(self):
+        Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        # A snapshot newer than every bar the run loads
+        MarketSnapshot.objects.create(scope='market', date=date.today(), members=1)
+
+        with mock.patch('yfinance.Ticker', FakeTicker):
+            call_command(
+                'load_indices_stock_data', '--load-indices', '--skip-indices', '--skip-technicals', '--no-cache',
+                '--rate-limit', '1000', '--days', '10', stdout=io.StringIO(), stderr=io.StringIO()
+            )
+
+        loaded = sorted(StockPrice.objects.values_list('date', flat=True))
+        self.assertEqual(len(loaded), len(FakeTicker.closes))
+        # Every loaded day with a previous bar to compare with
+        self.assertEqual(set(MarketSnapshot.objects.filter(scope='market').values_list('date', flat=True)),
+                         set(loaded[1:]) | {date.today()})
+
+
+class MarketBreadthAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234'))
+        for day, change in zip(DAYS, [1.0, -2.0, 0.5, 3.0]):
+            MarketSnapshot.objects.create(scope='market', date=day, members=2, advancing=1, equal_weighted_change=change)
+            MarketSnapshot.objects.create(scope='sector', name='Banks', date=day, members=1, equal_weighted_change=change)
+        MarketSnapshot.objects.create(scope='sector', name='Energy', date=DAYS[3], members=1, equal_weighted_change=5.0)
+
+    def test_history(self):
+        response = self.client.get('/api/market/breadth/?start_date=2024-01-02&end_date=2024-01-04').data
+
+        self.assertEqual([row['date'] for row in response['data']], DAYS[1:])
+        self.assertEqual([row['equal_weighted_change'] for row in response['data']], [-2.0, 0.5, 3.0])
+        self.assertEqual(response['scope'], 'market')
+
+    def test_sector_history_needs_a_name(self):
+        self.assertEqual(self.client.get('/api/market/breadth/?scope=sector').status_code, 400)
+        rows = self.client.get('/api/market/breadth/?scope=sector&name=Banks&start_date=2024-01-01').data['data']
+        self.assertEqual(len(rows), 4)
+
+    def test_dashboard_sector_performance(self):
+        overview = self.client.get('/api/dashboard/').data['data']['market_overview']
+
+        self.assertEqual([row['sector'] for row in overview['sector_performance']], ['Energy', 'Banks'])
+        self.assertEqual(overview['sector_performance'][1]['change_percent'], 3.0)
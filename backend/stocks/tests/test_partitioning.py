@@ -0,0 +1,91 @@
+import io
+from datetime import date
+from unittest import skipIf, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from stocks.models import Stock, StockPrice, TechnicalIndicator
+from stocks.services.partitioning import (
+    convert_to_partitioned, ensure_partitions, index_definition, list_partitions, partition_name, partition_year,
+    year_bounds
+)
+
+
+class PartitioningTests(SimpleTestCase):
+    def test_partition_names_round_trip(self):
+        table = 'stocks_stockprice'
+        self.assertEqual(partition_name(table, 2024), 'stocks_stockprice_y2024')
+        self.assertEqual(partition_year(table, 'stocks_stockprice_y2024'), 2024)
+        self.assertIsNone(partition_year(table, partition_name(table, None)))
+        self.assertIsNone(partition_year(table, 'stocks_technicalindicator_y2024'))
+
+    def test_year_bounds_are_half_open(self):
+        self.assertEqual(year_bounds(2024), "FOR VALUES FROM ('2024-01-01') TO ('2025-01-01')")
+
+    def test_partitioned_index_definitions_build_on_partitions(self):
+        definition = 'CREATE INDEX stockprice_date_brin ON ONLY public.stocks_stockprice USING brin (date)'
+        self.assertEqual(
+            index_definition(definition),
+            'CREATE INDEX stockprice_date_brin ON public.stocks_stockprice USING brin (date)'
+        )
+
+
+class PartitionCommandTests(TestCase):
+    @skipIf(connection.vendor == 'postgresql', 'partitioning is supported')
+    def test_command_is_a_no_op_without_postgresql(self):
+        stdout = io.StringIO()
+        call_command('partition_tables', '--ensure', stdout=stdout)
+        self.assertIn('needs PostgreSQL', stdout.getvalue())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'partitioning needs PostgreSQL')
+class PostgresPartitioningTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+
+    def add_price(self, day):
+        StockPrice.objects.create(stock=self.stock, date=day, open=1, high=1, low=1, close=1, volume=1)
+
+    def years(self, model):
+        return {partition.year: partition.rows for partition in list_partitions(model)}
+
+    def test_convert_and_ensure_give_every_year_its_partition(self):
+        self.add_price(date(2024, 3, 1))
+        self.assertEqual(convert_to_partitioned(StockPrice), 1)
+        self.assertEqual(min(year for year in self.years(StockPrice) if year), 2024)
+
+        # History older than the first partition lands in the default partition until ensure carves it out
+        self.add_price(date(2019, 5, 2))
+        self.add_price(date(2019, 6, 3))
+        self.assertEqual(ensure_partitions(StockPrice), [partition_name('stocks_stockprice', 2019)])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {partition_name('stocks_stockprice', None)}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f"SELECT COUNT(*) FROM {partition_name('stocks_stockprice', 2019)}")
+            self.assertEqual(cursor.fetchone()[0], 2)
+        self.assertEqual(StockPrice.objects.count(), 3)
+        self.assertEqual(ensure_partitions(StockPrice), [])
+
+    def test_detach_and_attach(self):
+        self.add_price(date(2019, 5, 2))
+        call_command('partition_tables', '--convert', stdout=io.StringIO())
+        self.assertNotIn(2019, self.years(TechnicalIndicator))
+
+        # The indicator table has no 2019 partition, so neither table is touched
+        stderr = io.StringIO()
+        call_command('partition_tables', '--detach', '2019', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn('stocks_technicalindicator has no attached partition for 2019', stderr.getvalue())
+        self.assertIn(2019, self.years(StockPrice))
+
+        call_command('partition_tables', '--detach', '2019', '--tables', 'prices', stdout=io.StringIO())
+        self.assertNotIn(2019, self.years(StockPrice))
+        self.assertEqual(StockPrice.objects.count(), 0)
+
+        stderr = io.StringIO()
+        call_command('partition_tables', '--attach', '2019', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn('archive.stocks_technicalindicator_y2019 does not exist', stderr.getvalue())
+
+        call_command('partition_tables', '--attach', '2019', '--tables', 'prices', stdout=io.StringIO())
+        self.assertEqual(StockPrice.objects.count(), 1)
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import CorporateAction, Index, IndexPrice, Stock, StockPrice, StockPriceRollup
+from stocks.services.price_rollups import auto_interval, build_rollups, load_price_series, refresh_rollups
+
+
+# Monday 2024-01-01 to Sunday 2024-01-14: two weeks, one month
+DAYS = [date(2024, 1, 1) + timedelta(days=i) for i in range(14)]
+
+
+def bar_frame(closes, owner_id=1):
+    return pd.DataFrame({
+        'owner_id': owner_id,
+        'date': DAYS[:len(closes)],
+        'open': closes,
+        'high': [close + 1 for close in closes],
+        'low': [close - 1 for close in closes],
+        'close': closes,
+        'volume': [100.0] * len(closes),
+    })
+
+
+class BuildRollupTests(SimpleTestCase):
+    def test_weekly_and_monthly_candles(self):
+        bars = bar_frame([float(close) for close in range(10, 24)])
+
+        weeks = build_rollups(bars, '1w')
+        self.assertEqual(list(weeks['date']), [DAYS[0], DAYS[7]])
+        self.assertEqual(list(weeks['last_date']), [DAYS[6], DAYS[13]])
+        self.assertEqual(list(weeks['open']), [10.0, 17.0])
+        self.assertEqual(list(weeks['high']), [17.0, 24.0])
+        self.assertEqual(list(weeks['low']), [9.0, 16.0])
+        self.assertEqual(list(weeks['close']), [16.0, 23.0])
+        self.assertEqual(list(weeks['volume']), [700.0, 700.0])
+        self.assertEqual(list(weeks['bars']), [7, 7])
+
+        month = build_rollups(bars, '1mo').iloc[0]
+        self.assertEqual((month['date'], month['open'], month['close'], month['bars']), (DAYS[0], 10.0, 23.0, 14))
+
+    def test_split_inside_a_period_uses_the_last_bar_basis(self):
+        # 2:1 split on the third day: earlier bars are halved, their volume doubled
+        bars = bar_frame([100.0, 100.0, 50.0, 50.0])
+        factors = pd.DataFrame(
+            [(1, DAYS[2], 0.5, 2.0)], columns=['stock_id', 'date', 'price_factor', 'volume_factor']
+        )
+
+        week = build_rollups(bars, '1w', factors).iloc[0]
+
+        self.assertEqual((week['open'], week['high'], week['close']), (50.0, 51.0, 50.0))
+        self.assertEqual(week['volume'], 600.0)
+
+    def test_auto_interval(self):
+        self.assertEqual(auto_interval(date(2024, 1, 1), date(2024, 12, 31)), '1d')
+        self.assertEqual(auto_interval(date(2020, 1, 1), date(2024, 12, 31)), '1w')
+        self.assertEqual(auto_interval(date(2000, 1, 1), date(2024, 12, 31)), '1mo')
+
+
+class RefreshRollupTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        for day, close in zip(DAYS, range(10, 24)):
+            StockPrice.objects.create(stock=self.stock, date=day, open=close, high=close, low=close, close=close, volume=10)
+
+    def test_refresh_rebuilds_from_since(self):
+        self.assertEqual(refresh_rollups('stock'), 3)
+
+        StockPrice.objects.filter(stock=self.stock, date=DAYS[13]).update(close=99)
+        self.assertEqual(refresh_rollups('stock', [self.stock.id], since=DAYS[13]), 3)
+
+        self.assertEqual(StockPriceRollup.objects.get(interval='1w', date=DAYS[7]).close, 99)
+        self.assertEqual(StockPriceRollup.objects.get(interval='1mo', date=DAYS[0]).close, 99)
+        self.assertEqual(StockPriceRollup.objects.count(), 3)
+
+    def test_later_events_adjust_at_read_time(self):
+        refresh_rollups('stock')
+        CorporateAction.objects.create(
+            stock=self.stock, date=date(2024, 2, 1), action_type='split', value=2,
+            factor=0.5, price_factor=0.5, volume_factor=2
+        )
+
+        series = load_price_series(self.stock, '1w')
+
+        self.assertEqual(list(series['close']), [16.0, 23.0])
+        self.assertEqual(list(series['adjusted_close']), [8.0, 11.5])
+
+    def test_index_rollups(self):
+        index = Index.objects.create(name='XU100')
+        IndexPrice.objects.create(index=index, date=DAYS[0], open=1, high=2, low=1, close=2, volume=5)
+
+        self.assertEqual(refresh_rollups('index'), 2)
+        self.assertEqual(index.price_rollups.get(interval='1w').close, 2)
+
+
+class RollupPriceAPITests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234'))
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        start = date.today() - timedelta(days=4 * 365)
+        StockPrice.objects.bulk_create([
+            StockPrice(stock=self.stock, date=start + timedelta(days=i), open=10, high=11, low=9, close=10, volume=1)
+            for i in range(4 * 365)
+        ])
+        refresh_rollups('stock')
+
+    def test_long_range_reads_weekly_candles(self):
+        response = self.client.get('/api/stocks/THYAO/prices/?days=1500&downsample=none').data
+
+        self.assertEqual(response['stats']['interval'], '1w')
+        self.assertLessEqual(len(response['data']), 215)
+        self.assertEqual(set(response['data'][0]), {'date', 'open', 'high', 'low', 'close', 'adjusted_close', 'volume'})
+        self.assertEqual(response['data'][1]['volume'], 7)
+
+    def test_explicit_interval(self):
+        response = self.client.get('/api/stocks/THYAO/prices/?days=1500&interval=1d&downsample=none').data
+        self.assertEqual(response['stats']['interval'], '1d')
+        self.assertEqual(response['stats']['total_points'], 4 * 365)
+
+        self.assertEqual(self.client.get('/api/stocks/THYAO/prices/?interval=2h').status_code, 400)
+
+    def test_detail_range_resolution(self):
+        self.assertEqual(self.client.get('/api/stocks/THYAO/?range=1y').data['data']['price_interval'], '1d')
+
+        detail = self.client.get('/api/stocks/THYAO/?range=3y').data['data']
+        self.assertEqual(detail['price_interval'], '1w')
+        self.assertLessEqual(len(detail['price_history']), 158)
@@ -0,0 +1,42 @@
+from decimal import Decimal
+from django.test import TestCase
+
+from stocks.models import Stock, Index, StockPrice, IndexPrice
+from stocks.services.price_storage import (
+    prepare_price_frame, upsert_stock_prices, upsert_index_prices
+)
+from stocks.tests.helpers import make_history
+
+
+class PriceStorageTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        self.index = Index.objects.create(name='BIST100')
+
+    def test_prepare_drops_incomplete_rows(self):
+        hist = make_history([10.0, 11.0, 12.0])
+        hist.iloc[1, hist.columns.get_loc('Volume')] = float('nan')
+
+        frame = prepare_price_frame(hist)
+
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(list(frame['close']), [10.0, 12.0])
+        self.assertNotIn('adjusted_close', frame.columns)
+
+    def test_insert_then_update_counts(self):
+        result = upsert_stock_prices(self.stock, make_history([10.0, 11.0, 12.0]))
+        self.assertEqual((result.created, result.updated, result.unchanged), (3, 0, 0))
+
+        # Re-sending identical bars writes nothing, a corrected bar is updated
+        result = upsert_stock_prices(self.stock, make_history([10.0, 11.5, 12.0, 13.0]), batch_size=2)
+        self.assertEqual((result.created, result.updated, result.unchanged), (1, 1, 2))
+
+        self.assertEqual(StockPrice.objects.filter(stock=self.stock).count(), 4)
+        corrected = StockPrice.objects.get(stock=self.stock, date='2024-01-02')
+        self.assertEqual(corrected.close, Decimal('11.5'))
+
+    def test_index_prices(self):
+        result = upsert_index_prices(self.index, make_history([100.0, 101.0]))
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(IndexPrice.objects.filter(index=self.index).count(), 2)
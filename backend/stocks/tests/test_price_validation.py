@@ -0,0 +1,138 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from stocks.models import QuarantinedPrice, Stock, StockPrice
+from stocks.services.price_validation import (
+    quarantine_issues, reason_counts, validate_histories, validate_history
+)
+from stocks.services.run_telemetry import load_run_reports
+from stocks.tests.helpers import FakeTicker, make_history
+
+
+class BadBarTicker(FakeTicker):
+    def history(self, start=None, end=None, **kwargs):
+        hist = super().history(start=start, end=end, **kwargs)
+        if self.symbol == 'AKBNK.IS':
+            hist.iloc[2, hist.columns.get_loc('High')] = 9.0
+        return hist
+
+
+class ValidationRuleTests(SimpleTestCase):
+    def test_clean_history_passes(self):
+        hist = make_history([10.0, 10.5, 10.2, 10.4])
+        cleaned, issues = validate_history(hist)
+
+        self.assertTrue(issues.empty)
+        self.assertEqual(len(cleaned), 4)
+        self.assertTrue(cleaned.attrs['validated'])
+
+    def test_row_rules(self):
+        hist = make_history([10.0, 10.1, 10.2, 10.3, 10.4])
+        hist.iloc[1, hist.columns.get_loc('Close')] = float('nan')
+        hist.iloc[2, hist.columns.get_loc('Low')] = -1.0
+        hist.iloc[3, hist.columns.get_loc('Volume')] = 0
+        hist.iloc[4, hist.columns.get_loc('Open')] = 20.0
+
+        cleaned, issues = validate_history(hist)
+
+        self.assertEqual(list(issues['reasons']), [
+            'missing_value', 'non_positive_price', 'zero_volume', 'outside_range'
+        ])
+        self.assertEqual(len(cleaned), 1)
+
+    def test_high_below_low(self):
+        hist = make_history([10.0, 10.1])
+        hist.iloc[1, hist.columns.get_loc('High')] = 9.0
+
+        _, issues = validate_history(hist)
+
+        self.assertEqual(list(issues['reasons']), ['high_below_low'])
+
+    def test_duplicate_date_keeps_last_bar(self):
+        hist = make_history([10.0, 10.1, 10.2])
+        hist = pd.concat([hist.iloc[:2], hist.iloc[[1]].assign(Close=10.15), hist.iloc[2:]])
+
+        cleaned, issues = validate_history(hist)
+
+        self.assertEqual(list(issues['reasons']), ['duplicate_date'])
+        self.assertEqual(list(cleaned['Close']), [10.0, 10.15, 10.2])
+
+    def test_spike_flags_only_the_spike(self):
+        hist = make_history([10.0, 10.1, 30.0, 10.2, 10.3])
+
+        cleaned, issues = validate_history(hist)
+
+        self.assertEqual(list(issues['reasons']), ['price_jump'])
+        self.assertEqual(issues['close'].tolist(), [30.0])
+        self.assertEqual(list(cleaned['Close']), [10.0, 10.1, 10.2, 10.3])
+
+    def test_stale_close_keeps_first_bar(self):
+        hist = make_history([10.0] + [11.0] * 6 + [11.5])
+
+        cleaned, issues = validate_history(hist, stale_run=5)
+
+        self.assertEqual(list(issues['reasons']), ['stale_close'] * 5)
+        self.assertEqual(list(cleaned['Close']), [10.0, 11.0, 11.5])
+
+    def test_batch_is_validated_per_symbol(self):
+        result = validate_histories({
+            'THYAO.IS': make_history([10.0, 10.1]),
+            'AKBNK.IS': make_history([50.0, 50.5]),
+            'XU100.IS': make_history([9000.0, 9050.0], Volume=[0, 0]),
+        }, zero_volume=False)
+
+        # The jump between two symbols' frames is not a price move
+        self.assertTrue(result.issues.empty)
+        self.assertEqual(result.checked, 6)
+
+    def test_reason_counts(self):
+        hist = make_history([10.0, 10.1, 10.2])
+        hist['Volume'] = 0
+
+        _, issues = validate_history(hist)
+
+        self.assertEqual(reason_counts(issues), {'zero_volume': 3})
+
+
+class QuarantineTests(TestCase):
+    def setUp(self):
+        self.report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.report_dir)
+
+    def test_quarantine_upserts(self):
+        hist = make_history([10.0, 10.1])
+        hist['Volume'] = 0
+        _, issues = validate_history(hist)
+
+        self.assertEqual(quarantine_issues('stock', issues, {None: 'THYAO'}), 2)
+        self.assertEqual(quarantine_issues('stock', issues, {None: 'THYAO'}), 2)
+
+        self.assertEqual(QuarantinedPrice.objects.count(), 2)
+        row = QuarantinedPrice.objects.order_by('date').first()
+        self.assertEqual(row.symbol, 'THYAO')
+        self.assertEqual(row.values['volume'], 0.0)
+
+    def test_loader_quarantines_bad_bars(self):
+        for symbol in ('THYAO', 'AKBNK'):
+            Stock.objects.create(symbol=symbol, name=symbol)
+
+        with override_settings(INGEST_REPORT_DIR=self.report_dir), mock.patch('yfinance.Ticker', BadBarTicker):
+            call_command(
+                'load_indices_stock_data', '--load-indices', '--skip-indices', '--skip-technicals',
+                '--no-cache', '--rate-limit', '1000', '--days', '10', stdout=io.StringIO(), stderr=io.StringIO()
+            )
+
+        [row] = QuarantinedPrice.objects.all()
+        self.assertEqual((row.item_type, row.symbol, row.reasons), ('stock', 'AKBNK', 'high_below_low'))
+        self.assertIsNotNone(row.run)
+        self.assertEqual(StockPrice.objects.filter(stock__symbol='AKBNK').count(), 3)
+        self.assertEqual(StockPrice.objects.filter(stock__symbol='THYAO').count(), 4)
+
+        [run] = load_run_reports(self.report_dir)
+        self.assertEqual(run['quarantined'], {'high_below_low': 1})
@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from stocks.models import (
+    CorporateAction, Index, IndexPrice, Portfolio, PortfolioHolding, Stock, StockPrice, StockQuote
+)
+from stocks.services.quotes import refresh_index_quotes, refresh_stock_quotes
+
+
+def add_bars(stock, closes, start=date(2024, 1, 1)):
+    StockPrice.objects.bulk_create([
+        StockPrice(
+            stock=stock, date=start + timedelta(days=i), open=close, high=close, low=close, close=close,
+            adjusted_close=close, volume=1000 + i
+        )
+        for i, close in enumerate(closes)
+    ])
+
+
+class QuoteRefreshTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+
+    def test_latest_bar_and_change(self):
+        add_bars(self.stock, [8.0, 10.0, 11.0])
+        lone = Stock.objects.create(symbol='AKBNK', name='Akbank')
+        add_bars(lone, [5.0])
+
+        self.assertEqual(refresh_stock_quotes(), 2)
+        self.assertEqual(refresh_stock_quotes([self.stock.id]), 1)
+
+        quote = StockQuote.objects.get(stock=self.stock)
+        self.assertEqual(quote.date, date(2024, 1, 3))
+        self.assertEqual(quote.close, Decimal('11.0000'))
+        self.assertEqual(quote.volume, 1002)
+        self.assertEqual(quote.previous_close, Decimal('10.0000'))
+        self.assertEqual(quote.change, Decimal('1.0000'))
+        self.assertEqual(quote.change_percent, Decimal('10.0000'))
+
+        quote = StockQuote.objects.get(stock=lone)
+        self.assertIsNone(quote.previous_close)
+        self.assertIsNone(quote.change_percent)
+
+    def test_previous_close_on_split_basis(self):
+        # 2-for-1 split on the latest bar: 20 before is 10 after
+        add_bars(self.stock, [20.0, 11.0])
+        CorporateAction.objects.create(
+            stock=self.stock, date=date(2024, 1, 2), action_type='split', value=2, factor=0.5, price_factor=0.5,
+            volume_factor=2.0
+        )
+
+        refresh_stock_quotes()
+
+        quote = StockQuote.objects.get(stock=self.stock)
+        self.assertEqual(quote.previous_close, Decimal('10.0000'))
+        self.assertEqual(quote.change_percent, Decimal('10.0000'))
+
+    def test_index_quotes(self):
+        index = Index.objects.create(name='BIST100', display_name='BIST 100')
+        IndexPrice.objects.create(index=index, date=date(2024, 1, 1), open=100, high=100, low=100, close=100, volume=1)
+        IndexPrice.objects.create(index=index, date=date(2024, 1, 2), open=98, high=98, low=98, close=98, volume=1)
+
+        self.assertEqual(refresh_index_quotes(), 1)
+        self.assertEqual(index.quote.change_percent, Decimal('-2.0000'))
+
+
+class QuoteReadPathTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('alice', 'a@a.com', 'pass1234')
+        self.client.force_authenticate(self.user)
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        add_bars(self.stock, [10.0, 12.0])
+        refresh_stock_quotes()
+
+    def test_watchlist_reads_quotes(self):
+        self.client.post('/api/watchlists/', {'name': 'Airlines', 'stocks': ['THYAO']}, format='json')
+
+        # Watchlists, then their items joined with stocks and quotes
+        with self.assertNumQueries(2):
+            [watchlist] = self.client.get('/api/watchlists/').data['data']
+
+        latest = watchlist['stocks'][0]['latest_price']
+        self.assertEqual(latest['price'], 12.0)
+        self.assertEqual(latest['change_percent'], 20.0)
+
+    def test_stock_detail_reads_quote(self):
+        StockPrice.objects.filter(stock=self.stock, date=date(2024, 1, 2)).update(close=99)
+
+        latest = self.client.get('/api/stocks/THYAO/?range=1m&interval=1d').data['data']['latest_price']
+
+        self.assertEqual(latest['date'], '2024-01-02')
+        self.assertEqual(latest['close'], '12.0000')
+        self.assertEqual(latest['adjusted_close'], '12.0000')
+        self.assertEqual(latest['volume'], 1001)
+
+    def test_portfolio_holdings_read_quotes(self):
+        portfolio = Portfolio.objects.create(user=self.user, name='Main')
+        PortfolioHolding.objects.create(portfolio=portfolio, stock=self.stock, quantity=10, average_cost=10)
+
+        detail = self.client.get(f'/api/portfolios/{portfolio.id}/').data['data']
+        [listed] = self.client.get('/api/portfolios/').data['data']
+
+        [holding] = detail['holdings']
+        self.assertEqual(holding['current_price'], 12.0)
+        self.assertEqual(holding['profit_loss'], 20.0)
+        self.assertEqual(detail['summary']['total_value'], 120.0)
+        self.assertEqual(listed['summary']['profit_loss_percent'], 20.0)
+
+    def test_dashboard_reads_quotes(self):
+        index = Index.objects.create(name='BIST100', display_name='BIST 100')
+        IndexPrice.objects.create(index=index, date=date(2024, 1, 1), open=100, high=100, low=100, close=100, volume=1)
+        IndexPrice.objects.create(index=index, date=date(2024, 1, 2), open=98, high=98, low=98, close=98, volume=1)
+        refresh_index_quotes()
+        portfolio = Portfolio.objects.create(user=self.user, name='Main')
+        PortfolioHolding.objects.create(portfolio=portfolio, stock=self.stock, quantity=10, average_cost=10)
+
+        data = self.client.get('/api/dashboard/').data['data']
+
+        [bist100] = data['market_overview']['indices']
+        self.assertEqual(bist100['change_percent'], -2.0)
+        [summary] = data['user_portfolios']
+        self.assertEqual(summary['total_value'], 120.0)
+        self.assertEqual(summary['top_holdings'][0]['symbol'], 'THYAO')
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+from django.test import TestCase
+from django.utils import timezone
+
+from stocks.models import Index, Stock, StockIndex
+from stocks.services.reference_sync import read_stock_list, sync_stocks, sync_index_memberships
+
+
+class ReferenceSyncTests(TestCase):
+    def test_read_stock_list_skips_header(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as handle:
+            handle.write('SYMBOL,NAME\nTHYAO, TÜRK HAVA YOLLARI A.O.\nAKBNK,AKBANK T.A.Ş.\n')
+        self.addCleanup(os.remove, handle.name)
+
+        self.assertEqual(read_stock_list(handle.name), {
+            'THYAO': 'TÜRK HAVA YOLLARI A.O.',
+            'AKBNK': 'AKBANK T.A.Ş.',
+        })
+
+    def test_stock_sync_writes_only_differences(self):
+        Stock.objects.create(symbol='THYAO', name='Old name')
+        Stock.objects.create(symbol='AKBNK', name='Akbank', metadata_updated_at=timezone.now())
+        Stock.objects.create(symbol='DELIST', name='Delisted')
+
+        with self.assertNumQueries(6):
+            result = sync_stocks({'THYAO': 'Turk Hava Yollari', 'AKBNK': 'AKBANK T.A.S.', 'GARAN': 'Garanti'})
+
+        self.assertEqual(result, (1, 1, 1, 1))
+        self.assertEqual(Stock.objects.get(symbol='THYAO').name, 'Turk Hava Yollari')
+        # Names refreshed from Yahoo Finance are not overwritten by the file
+        self.assertEqual(Stock.objects.get(symbol='AKBNK').name, 'Akbank')
+        self.assertFalse(Stock.objects.get(symbol='DELIST').is_active)
+
+        self.assertEqual(sync_stocks({'THYAO': 'Turk Hava Yollari', 'AKBNK': 'x', 'GARAN': 'Garanti'}), (0, 0, 3, 0))
+
+    def test_membership_sync_is_exact(self):
+        thyao = Stock.objects.create(symbol='THYAO', name='THY')
+        akbnk = Stock.objects.create(symbol='AKBNK', name='Akbank')
+        Stock.objects.create(symbol='GARAN', name='Garanti')
+        bist30 = Index.objects.create(name='BIST30')
+        StockIndex.objects.create(stock=thyao, index=bist30)
+        StockIndex.objects.create(stock=akbnk, index=bist30)
+
+        results = sync_index_memberships({'BIST30': ['THYAO', 'GARAN', 'NOPE'], 'BIST100': ['THYAO']})
+
+        self.assertEqual(results['BIST30'], (False, 1, 1, ['NOPE']))
+        self.assertEqual(results['BIST100'], (True, 1, 0, []))
+        self.assertEqual(
+            set(Index.objects.get(name='BIST30').stocks.values_list('symbol', flat=True)), {'THYAO', 'GARAN'}
+        )
+
+        # A second run with the same data writes nothing
+        with self.assertNumQueries(3):
+            results = sync_index_memberships({'BIST30': ['THYAO', 'GARAN', 'NOPE'], 'BIST100': ['THYAO']})
+        self.assertEqual(results['BIST30'], (False, 0, 0, ['NOPE']))
@@ -0,0 +1,132 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from stocks.models import Stock, StockPrice
+from stocks.services.response_cache import ResponseCache, CacheMiss
+from stocks.tests.helpers import FakeTicker, make_history
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_fetch_once_then_serve_from_disk(self):
+        cache = ResponseCache(root=self.root)
+        fetch = mock.Mock(return_value={'longName': 'Turk Hava Yollari'})
+
+        self.assertEqual(cache.info('THYAO.IS', fetch), {'longName': 'Turk Hava Yollari'})
+        self.assertEqual(cache.info('THYAO.IS', fetch), {'longName': 'Turk Hava Yollari'})
+        self.assertEqual(fetch.call_count, 1)
+
+        # An expired entry is fetched again
+        expired = ResponseCache(root=self.root, ttl={'info': -1})
+        expired.info('THYAO.IS', fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_identical_responses_share_one_object(self):
+        cache = ResponseCache(root=self.root)
+        cache.news('AKBNK.IS', lambda: [])
+        cache.news('GARAN.IS', lambda: [])
+
+        objects = [name for _, _, files in os.walk(os.path.join(self.root, 'objects')) for name in files]
+        self.assertEqual(len(objects), 1)
+
+    def test_replay_slices_wider_history_and_raises_on_miss(self):
+        ResponseCache(root=self.root).history(
+            'XU100.IS', lambda: make_history([1.5] * 10), start=date(2024, 1, 1), end=date(2024, 1, 13)
+        )
+
+        replay = ResponseCache(root=self.root, ttl={'history': -1}, replay=True)
+        frame = replay.history('XU100.IS', mock.Mock(), start=date(2024, 1, 3), end=date(2024, 1, 10))
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(frame.index.min().strftime('%Y-%m-%d'), '2024-01-03')
+
+        with self.assertRaises(CacheMiss):
+            replay.history('XU100.IS', mock.Mock(), start=date(2023, 1, 1), end=date(2024, 1, 10))
+
+        # A replay on a later day asks for a later end than was recorded
+        frame = replay.history('XU100.IS', mock.Mock(), start=date(2024, 1, 8), end=date(2024, 1, 20))
+        self.assertEqual(len(frame), 5)
+
+    def test_prune_drops_expired_refs_and_orphaned_objects(self):
+        cache = ResponseCache(root=self.root)
+        expired = time.time() - 60 * 24 * 60 * 60
+        with mock.patch('stocks.services.response_cache.time.time', return_value=expired):
+            cache.info('OLD.IS', lambda: {'longName': 'Old'})
+            cache.info('KEPT.IS', lambda: {'longName': 'Kept'})
+            cache.news('SHARED.IS', lambda: [])
+        cache.news('FRESH.IS', lambda: [])  # Same object as SHARED.IS's expired ref
+        # Past its freshness TTL but within the retention period
+        with mock.patch('stocks.services.response_cache.time.time', return_value=time.time() - 24 * 60 * 60):
+            cache.info('STALE.IS', lambda: {'longName': 'Stale'})
+        for directory, _, names in os.walk(os.path.join(self.root, 'objects')):
+            for name in names:
+                os.utime(os.path.join(directory, name), (expired, expired))
+
+        result = cache.prune(keep=['KEPT.IS'])
+
+        self.assertEqual((result.refs, result.objects), (2, 1))
+        self.assertGreater(result.bytes, 0)
+        replay = ResponseCache(root=self.root, replay=True)
+        self.assertEqual(replay.info('KEPT.IS', mock.Mock()), {'longName': 'Kept'})
+        self.assertEqual(replay.news('FRESH.IS', mock.Mock()), [])
+        self.assertEqual(replay.info('STALE.IS', mock.Mock()), {'longName': 'Stale'})
+        with self.assertRaises(CacheMiss):
+            replay.info('OLD.IS', mock.Mock())
+        self.assertEqual(tuple(cache.prune(keep=['KEPT.IS'])), (0, 0, 0))
+
+
+class OfflineTicker(FakeTicker):
+    @property
+    def info(self):
+        raise AssertionError('network call in replay')
+
+    def history(self, start=None, end=None, **kwargs):
+        raise AssertionError('network call in replay')
+
+
+class LoaderReplayTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings = override_settings(MARKET_DATA_CACHE_DIR=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+
+    def load(self, *args):
+        call_command(
+            'load_indices_stock_data', '--load-indices', '--skip-indices', '--skip-technicals', '--no-report',
+            '--days', '10', '--rate-limit', '1000', *args, stdout=io.StringIO(), stderr=io.StringIO()
+        )
+
+    def test_replay_on_a_later_day(self):
+        with mock.patch('yfinance.Ticker', FakeTicker):
+            self.load()
+        recorded = sorted(StockPrice.objects.values_list('date', flat=True))
+        StockPrice.objects.all().delete()
+
+        class Tomorrow(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime.now(tz) + timedelta(days=1)
+
+        with mock.patch('yfinance.Ticker', OfflineTicker), \
+                mock.patch('stocks.management.commands.load_indices_stock_data.datetime', Tomorrow):
+            self.load('--replay')
+
+        # The replayed window also starts a day later
+        start = (Tomorrow.now() - timedelta(days=10)).date()
+        self.assertEqual(len(recorded), len(FakeTicker.closes))
+        self.assertEqual(
+            sorted(StockPrice.objects.values_list('date', flat=True)), [d for d in recorded if d >= start]
+        )
@@ -0,0 +1,104 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from stocks.models import Stock, StockQuote
+from stocks.services.rate_limiter import call_with_backoff
+from stocks.services.run_telemetry import ItemMetrics, RunTelemetry, find_regressions, load_run_reports
+from stocks.tests.helpers import FakeTicker
+
+
+class ItemMetricsTests(SimpleTestCase):
+    @mock.patch('stocks.services.run_telemetry.time.perf_counter', side_effect=[0.0, 1.0, 3.0, 4.0])
+    def test_nested_phases_are_exclusive(self, perf_counter):
+        metrics = ItemMetrics('stock', 'THYAO')
+        with metrics.time('db'):
+            with metrics.time('parse'):
+                pass
+
+        self.assertEqual(dict(metrics.timings), {'parse': 2.0, 'db': 2.0})
+
+    @mock.patch('stocks.services.rate_limiter.time.sleep')
+    def test_backoff_records_retries(self, sleep):
+        metrics = ItemMetrics('stock', 'THYAO')
+        attempts = []
+
+        def throttled_once():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise Exception('429 Too Many Requests')
+            return 'ok'
+
+        call_with_backoff(throttled_once, metrics=metrics)
+        self.assertEqual(metrics.retries, 1)
+        self.assertGreater(metrics.backoff_wait, 0)
+
+    def test_regressions_compare_against_earlier_runs(self):
+        runs = [
+            {'run_id': str(i), 'status': 'completed', 'rows_per_second': rate}
+            for i, rate in enumerate([100.0, 110.0, 90.0, 60.0])
+        ]
+        self.assertEqual(find_regressions(runs, threshold=0.25), [(runs[3], 100.0)])
+
+    def test_regressions_compare_runs_of_the_same_workload(self):
+        full = {'skip_stocks': False, 'days': 30, 'workers': 1}
+        indices_only = dict(full, skip_stocks=True)
+        runs = [
+            {'run_id': str(i), 'command': 'load_indices_stock_data', 'status': 'completed',
+             'rows_per_second': rate, 'options': options}
+            for i, (rate, options) in enumerate([
+                (100.0, full), (20.0, indices_only), (95.0, dict(full, workers=4)), (25.0, indices_only),
+                (60.0, full),
+            ])
+        ]
+
+        # The slow indices-only runs are neither flagged against nor part of the full loads' baseline
+        self.assertEqual(find_regressions(runs, threshold=0.25), [(runs[4], 97.5)])
+
+
+class RunReportTests(TestCase):
+    def setUp(self):
+        self.report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.report_dir)
+
+    def test_loader_writes_report(self):
+        for symbol in ('THYAO', 'AKBNK'):
+            Stock.objects.create(symbol=symbol, name=symbol)
+
+        with override_settings(INGEST_REPORT_DIR=self.report_dir), mock.patch('yfinance.Ticker', FakeTicker):
+            call_command(
+                'load_indices_stock_data', '--load-indices', '--skip-indices', '--skip-technicals',
+                '--no-cache', '--rate-limit', '1000', '--days', '10', stdout=io.StringIO(), stderr=io.StringIO()
+            )
+
+        [run] = load_run_reports(self.report_dir)
+        self.assertEqual(run['command'], 'load_indices_stock_data')
+        self.assertEqual(run['status'], 'completed')
+        self.assertEqual(run['items'], 2)
+        self.assertEqual(run['rows'], {'inserted': 8, 'updated': 0, 'skipped': 0})
+        self.assertEqual(set(run['phase_latency']), {'network', 'parse', 'db'})
+        self.assertIn('sync_index_memberships', run['stages'])
+        self.assertIn('stock_quotes', run['stages'])
+        self.assertEqual(StockQuote.objects.count(), 2)
+
+        stdout = io.StringIO()
+        call_command('ingest_report', '--dir', self.report_dir, stdout=stdout)
+        header = stdout.getvalue().splitlines()[1]
+        self.assertTrue(header.startswith('📊 load_indices_stock_data (days=10, '), header)
+        self.assertIn('skip_indices', header)
+        self.assertNotIn('rate_limit', header)
+        self.assertTrue(header.endswith(': last 1 runs'), header)
+
+    def test_unfinished_run_is_interrupted(self):
+        telemetry = RunTelemetry('fetch_news', directory=self.report_dir)
+        metrics = telemetry.item('stock', 'THYAO')
+        metrics.add_rows(inserted=3, skipped=1)
+        telemetry.finish_item(metrics)
+
+        [run] = load_run_reports(self.report_dir)
+        self.assertEqual(run['status'], 'interrupted')
+        self.assertEqual(run['rows'], {'inserted': 3, 'updated': 0, 'skipped': 1})
@@ -0,0 +1,77 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from stocks.api.renderers import FastJSONRenderer
+from stocks.models import Stock, StockPrice, TechnicalIndicator
+from stocks.serializers.series_serializers import StockPriceRowSerializer, StockTechnicalRowSerializer
+from stocks.serializers.stock_serializers import StockPriceSerializer, StockTechnicalSerializer
+
+
+class RowSerializerTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        for i in range(3):
+            day = date(2024, 1, 1) + timedelta(days=i)
+            StockPrice.objects.create(
+                stock=self.stock, date=day, open=Decimal('10.5'), high=Decimal('11.1234'), low=10,
+                close=Decimal('1e3'), adjusted_close=Decimal('9.87') if i else None, volume=1000 + i
+            )
+            TechnicalIndicator.objects.create(stock=self.stock, date=day, rsi_14=Decimal('-55.5'), ma_200=None)
+
+    def test_same_output_as_model_serializers(self):
+        prices = StockPrice.objects.order_by('date')
+        technicals = TechnicalIndicator.objects.order_by('date')
+
+        self.assertEqual(StockPriceRowSerializer(prices).data, StockPriceSerializer(prices, many=True).data)
+        self.assertEqual(
+            StockTechnicalRowSerializer(technicals).data, StockTechnicalSerializer(technicals, many=True).data
+        )
+        self.assertEqual(StockPriceRowSerializer(prices.none()).data, [])
+
+    def test_field_subset(self):
+        fields = ['date', 'stock', 'rsi_14', 'nope']
+        rows = StockTechnicalRowSerializer(TechnicalIndicator.objects.all(), fields=fields).data
+
+        self.assertEqual(rows[0], {'date': '2024-01-01', 'stock': self.stock.id, 'rsi_14': '-55.5000'})
+
+    def test_frame_rows(self):
+        frame = pd.DataFrame({
+            'date': [date(2024, 1, 1)], 'open': [10.12345], 'high': [11.0], 'low': [9.99999], 'close': [10.5],
+            'adjusted_close': [10.00005], 'volume': [1234.5],
+        })
+        price = StockPrice(
+            stock=self.stock, date=date(2024, 1, 1), open=Decimal(str(round(10.12345, 4))), high=Decimal('11'),
+            low=Decimal(str(round(9.99999, 4))), close=Decimal('10.5'), adjusted_close=Decimal(str(round(10.00005, 4))),
+            volume=int(round(1234.5))
+        )
+
+        self.assertEqual(StockPriceRowSerializer(frame).data, [StockPriceSerializer(price).data])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_serializers', rows=20, repeat=1, stdout=out, stderr=out)
+
+        self.assertIn('prices', out.getvalue())
+        self.assertNotIn('differs', out.getvalue())
+        self.assertFalse(Stock.objects.filter(symbol='BENCH').exists())
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_bytes_as_json_renderer(self):
+        data = {
+            'status': 'success',
+            'data': [{'date': date(2024, 1, 1), 'close': '10.5000', 'volume': 10, 'name': 'Türk'}],
+            'id': uuid.UUID(int=1),
+            'amount': Decimal('1.25'),
+            'at': datetime(2024, 1, 1, 12, 30, 0, 123456, tzinfo=timezone.utc),
+            'flags': [True, None, 1.5],
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
@@ -0,0 +1,109 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from stocks.services.stage_graph import Stage, critical_path, run_stage_graph, validate_stages
+
+
+class StageGraphTests(SimpleTestCase):
+    def test_independent_stages_overlap(self):
+        stages = [
+            Stage('reference', 'a'),
+            Stage('prices', 'b', depends_on=['reference']),
+            Stage('news', 'c', depends_on=['reference']),
+            Stage('indicators', 'd', depends_on=['prices']),
+        ]
+        both_started = threading.Barrier(2, timeout=5)
+        order = []
+
+        def execute(stage, stop):
+            order.append(stage.name)
+            if stage.name in ('prices', 'news'):
+                # Deadlocks (and breaks the barrier) unless both run at the same time
+                both_started.wait()
+            return True, ''
+
+        results = run_stage_graph(stages, execute, max_parallel=2)
+
+        self.assertEqual({r.status for r in results.values()}, {'succeeded'})
+        self.assertEqual(order[0], 'reference')
+        self.assertEqual(order[-1], 'indicators')
+
+    def test_failure_skips_only_dependents(self):
+        stages = [
+            Stage('prices', 'a'),
+            Stage('indicators', 'b', depends_on=['prices']),
+            Stage('news', 'c'),
+        ]
+
+        def execute(stage, stop):
+            if stage.name == 'prices':
+                raise RuntimeError('provider down')
+            return True, ''
+
+        results = run_stage_graph(stages, execute)
+
+        self.assertEqual(results['prices'].status, 'failed')
+        self.assertEqual(results['prices'].output, 'provider down')
+        self.assertEqual(results['indicators'].status, 'skipped')
+        self.assertEqual(results['news'].status, 'succeeded')
+
+    def test_after_orders_without_depending(self):
+        stages = [
+            Stage('index_prices', 'a'),
+            Stage('stock_data', 'b', after=['index_prices']),
+            Stage('news', 'c', after=['stock_data']),
+        ]
+        order = []
+
+        def execute(stage, stop):
+            order.append(stage.name)
+            return stage.name != 'index_prices', ''
+
+        results = run_stage_graph(stages, execute, max_parallel=3)
+
+        self.assertEqual(order, ['index_prices', 'stock_data', 'news'])
+        self.assertEqual(results['index_prices'].status, 'failed')
+        self.assertEqual(results['news'].status, 'succeeded')
+
+    def test_fail_fast_cancels_running_and_pending(self):
+        stages = [
+            Stage('prices', 'a'),
+            Stage('news', 'b'),
+            Stage('indicators', 'c', depends_on=['news']),
+        ]
+        news_started = threading.Event()
+
+        def execute(stage, stop):
+            if stage.name == 'prices':
+                news_started.wait(5)
+                return False, 'boom'
+            news_started.set()
+            # Runs until told to stop
+            return not stop.wait(5), ''
+
+        results = run_stage_graph(stages, execute, max_parallel=2, fail_fast=True)
+
+        self.assertEqual(results['prices'].status, 'failed')
+        self.assertEqual(results['news'].status, 'cancelled')
+        self.assertEqual(results['indicators'].status, 'cancelled')
+
+    def test_validation(self):
+        with self.assertRaisesMessage(ValueError, 'cycle'):
+            validate_stages([Stage('a', 'x', depends_on=['b']), Stage('b', 'y', depends_on=['a'])])
+        with self.assertRaisesMessage(ValueError, 'unknown stages: missing'):
+            validate_stages([Stage('a', 'x', depends_on=['missing'])])
+        with self.assertRaisesMessage(ValueError, 'cycle'):
+            validate_stages([Stage('a', 'x', depends_on=['b']), Stage('b', 'y', after=['a'])])
+
+    def test_critical_path(self):
+        stages = [
+            Stage('reference', 'a'),
+            Stage('prices', 'b', depends_on=['reference']),
+            Stage('news', 'c', depends_on=['reference']),
+        ]
+        results = run_stage_graph(stages, lambda stage, stop: (True, ''))
+        results = {name: r._replace(elapsed={'reference': 1.0, 'prices': 5.0, 'news': 2.0}[name])
+                   for name, r in results.items()}
+
+        self.assertEqual(critical_path(stages, results), (6.0, ['reference', 'prices']))
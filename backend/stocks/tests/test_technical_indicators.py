@@ -0,0 +1,136 @@
+import io
+import math
+from datetime import date, timedelta
+
+import pandas as pd
+from django.test import TestCase
+
+from stocks.management.commands.load_indices_stock_data import Command
+from stocks.models import CorporateAction, IndicatorState, Stock, StockPrice, TechnicalIndicator
+from stocks.services.price_storage import upsert_stock_prices
+from stocks.services.technical_indicators import (
+    INDICATOR_FIELDS, bulk_upsert_indicators, recalculate_indicators, update_indicators
+)
+
+
+# Columns the legacy per-stock calculation fills
+PER_STOCK_FIELDS = [
+    field for field in INDICATOR_FIELDS if field not in ('stochastic_k', 'stochastic_d', 'cci_14', 'atr_14')
+]
+
+
+def add_prices(stock, start, closes, skip=()):
+    """Store one bar per day for closes, leaving out the day offsets in skip"""
+    StockPrice.objects.bulk_create([
+        StockPrice(
+            stock=stock, date=start + timedelta(days=offset),
+            open=close, high=close + 1, low=close - 1, close=close, volume=1000,
+        )
+        for offset, close in enumerate(closes) if offset not in skip
+    ])
+
+
+def stored_indicators(stock):
+    return {
+        row['date']: row
+        for row in TechnicalIndicator.objects.filter(stock=stock).values('date', *INDICATOR_FIELDS)
+    }
+
+
+class TechnicalIndicatorEngineTests(TestCase):
+    def setUp(self):
+        self.thyao = Stock.objects.create(symbol='THYAO', name='Turk Hava Yollari')
+        self.akbnk = Stock.objects.create(symbol='AKBNK', name='Akbank')
+        self.short = Stock.objects.create(symbol='NEW', name='Newly Listed')
+
+        add_prices(self.thyao, date(2023, 1, 1), [100 + 10 * math.sin(i / 7) + i / 20 for i in range(260)])
+        # Starts later and has a suspension gap, so its bars do not line up with THYAO
+        add_prices(self.akbnk, date(2023, 2, 15), [30 + 3 * math.cos(i / 5) for i in range(240)], skip=range(100, 110))
+        add_prices(self.short, date(2023, 6, 1), [10.0 + i for i in range(50)])
+
+    def test_panel_matches_per_stock_calculation(self):
+        # Both paths read split-adjusted prices
+        CorporateAction.objects.create(
+            stock=self.thyao, date=date(2023, 6, 1), action_type='split', value=2, factor=0.5, price_factor=0.5,
+            volume_factor=2.0
+        )
+        command = Command(stdout=io.StringIO(), stderr=io.StringIO())
+        for stock in (self.thyao, self.akbnk):
+            command._calculate_technical_indicators(stock)
+        expected = {stock: stored_indicators(stock) for stock in (self.thyao, self.akbnk)}
+        TechnicalIndicator.objects.all().delete()
+
+        processed, created, updated = recalculate_indicators()
+
+        self.assertEqual((processed, created, updated), (3, 92, 0))
+        self.assertFalse(TechnicalIndicator.objects.filter(stock=self.short).exists())
+        for stock, rows in expected.items():
+            actual = stored_indicators(stock)
+            self.assertEqual(actual.keys(), rows.keys())
+            for day, row in rows.items():
+                for field in PER_STOCK_FIELDS:
+                    self.assertAlmostEqual(float(actual[day][field]), float(row[field]), places=3, msg=field)
+
+    def test_ohlc_indicators(self):
+        recalculate_indicators([self.thyao.id])
+        prices = pd.DataFrame(list(
+            StockPrice.objects.filter(stock=self.thyao).order_by('date').values('date', 'high', 'low', 'close')
+        )).set_index('date').astype(float)
+        last = TechnicalIndicator.objects.filter(stock=self.thyao).latest('date')
+        window = prices.iloc[-14:]
+
+        stochastic_k = 100 * (window['close'].iloc[-1] - window['low'].min()) / (window['high'].max() - window['low'].min())
+        typical = (window['high'] + window['low'] + window['close']) / 3
+        cci = (typical.iloc[-1] - typical.mean()) / (0.015 * (typical - typical.mean()).abs().mean())
+        previous_close = prices['close'].shift(1).iloc[-14:]
+        true_range = pd.concat([
+            window['high'] - window['low'],
+            (window['high'] - previous_close).abs(),
+            (window['low'] - previous_close).abs(),
+        ], axis=1).max(axis=1)
+
+        self.assertAlmostEqual(float(last.stochastic_k), stochastic_k, places=3)
+        self.assertAlmostEqual(float(last.cci_14), cci, places=3)
+        self.assertAlmostEqual(float(last.atr_14), true_range.mean(), places=3)
+        self.assertIsNotNone(last.stochastic_d)
+
+    def test_rerun_updates_in_place(self):
+        recalculate_indicators([self.thyao.id])
+        self.assertEqual(recalculate_indicators([self.thyao.id]), (1, 0, 61))
+
+    def test_upsert_counts_created_rows(self):
+        recalculate_indicators([self.thyao.id])
+        rows = TechnicalIndicator.objects.filter(stock=self.thyao).order_by('-date')
+        latest = pd.DataFrame(list(rows.values('stock_id', 'date', *INDICATOR_FIELDS)[:2]))
+        new_day = latest.iloc[[0]].assign(date=latest['date'].max() + timedelta(days=1))
+
+        self.assertEqual(bulk_upsert_indicators(pd.concat([latest, new_day], ignore_index=True)), (1, 2))
+
+    def test_incremental_update_matches_full_recalculation(self):
+        update_indicators()
+        self.assertEqual(IndicatorState.objects.get(stock=self.thyao).last_date, date(2023, 9, 17))
+
+        # Only the new bars are computed and inserted
+        add_prices(self.thyao, date(2023, 9, 18), [110 + math.sin(i) for i in range(5)])
+        self.assertEqual(update_indicators(), (1, 5, 0))
+        incremental = stored_indicators(self.thyao)
+
+        TechnicalIndicator.objects.all().delete()
+        recalculate_indicators()
+        full = stored_indicators(self.thyao)
+
+        self.assertEqual(incremental.keys(), full.keys())
+        for day, row in full.items():
+            for field in INDICATOR_FIELDS:
+                self.assertAlmostEqual(float(incremental[day][field]), float(row[field]), places=3, msg=field)
+
+    def test_revised_price_drops_carried_state(self):
+        update_indicators()
+        hist = pd.DataFrame(
+            {'Open': [99.0], 'High': [100.0], 'Low': [98.0], 'Close': [99.0], 'Volume': [1000]},
+            index=pd.DatetimeIndex(['2023-08-01'], name='Date'),
+        )
+        upsert_stock_prices(self.thyao, hist)
+
+        self.assertFalse(IndicatorState.objects.filter(stock=self.thyao).exists())
+        self.assertTrue(IndicatorState.objects.filter(stock=self.akbnk).exists())
@@ -0,0 +1,58 @@
+import io
+import threading
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from stocks.models import Stock
+from stocks.services.ticker_metadata import TickerMetadata
+from stocks.tests.helpers import FakeTicker
+
+
+class CountingTicker(FakeTicker):
+    info_requests = 0
+
+    @property
+    def info(self):
+        CountingTicker.info_requests += 1
+        return {'longName': 'Turk Hava Yollari A.O.', 'sector': 'Industrials', 'marketCap': 1e9}
+
+
+class TickerMetadataTests(SimpleTestCase):
+    def test_concurrent_requests_fetch_once(self):
+        metadata = TickerMetadata()
+        fetch = mock.Mock(return_value={'longName': 'Akbank'})
+
+        threads = [threading.Thread(target=metadata.get, args=('AKBNK.IS', fetch)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(metadata.requests, 1)
+
+
+class StockMetadataRefreshTests(TestCase):
+    def load(self, *args):
+        with mock.patch('yfinance.Ticker', CountingTicker):
+            call_command(
+                'load_indices_stock_data', '--symbol', 'THYAO', '--no-cache', '--rate-limit', '1000',
+                '--skip-technicals', *args, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+
+    def test_fresh_metadata_and_fundamentals_skip_info(self):
+        Stock.objects.create(symbol='THYAO', name='THYAO')
+        CountingTicker.info_requests = 0
+
+        self.load()
+        self.assertEqual(CountingTicker.info_requests, 1)
+        self.assertEqual(Stock.objects.get(symbol='THYAO').name, 'Turk Hava Yollari A.O.')
+
+        # Same day: fundamentals stored and metadata fresh, so no info request
+        self.load()
+        self.assertEqual(CountingTicker.info_requests, 1)
+
+        self.load('--metadata-max-age', '0')
+        self.assertEqual(CountingTicker.info_requests, 2)
@@ -14,6 +14,7 @@ from .api.portfolio_api import (
     PortfolioTransactionAPIView, PortfolioPerformanceAPIView
 )
 from .api.dashboard_api import DashboardAPIView
+from .api.market_api import MarketBreadthAPIView
 
 from rest_framework_simplejwt.views import TokenRefreshView
 from .api.auth_views import LoginView, RegisterView, LogoutView, UserProfileView
@@ -26,6 +27,7 @@ urlpatterns = [
     path('indices/', IndexListAPIView.as_view(), name='index-list'),
     path('stocks/', StockListAPIView.as_view(), name='stock-list'),
     path('stocks/<str:symbol>/', StockDetailAPIView.as_view(), name='stock-detail'),
+    path('stocks/<str:symbol>/prices/', StockPriceAPIView.as_view(), name='stock-prices'),
     path('stocks/<str:symbol>/technical/', StockTechnicalAPIView.as_view(), name='stock-technical'),
     
     # News
@@ -47,6 +49,7 @@ urlpatterns = [
     
     # Dashboard
     path('dashboard/', DashboardAPIView.as_view(), name='dashboard'),
+    path('market/breadth/', MarketBreadthAPIView.as_view(), name='market-breadth'),
 
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/register/', RegisterView.as_view(), name='register'),